@@ -4,6 +4,7 @@
 import os
 import sys
 import argparse
+import multiprocessing
 from dotenv import load_dotenv
 
 # Add the src directory to the Python path
@@ -16,6 +17,8 @@ from src.utils.translator import DeepseekTranslator
 from src.utils.vocabulary_extractor import VocabularyExtractor
 from src.api.api_service import start_api_server
 from src.utils.translator_factory import TranslatorFactory
+from src.utils.single_flight import get_default_single_flight
+from src.utils.document_diff import DocumentDiff, document_units, get_default_document_store
 
 def main():
     """
@@ -55,10 +58,16 @@ def main():
     parser.add_argument('--translate-engine', type=str,
                         choices=[
                             'auto', 'deepseek', 'openrouter',  # 向后兼容的选项
-                            'deepseek-reasoner', 'deepseek-chat', 'openrouter-deepseek'  # 新的模型选项
+                            'deepseek-reasoner', 'deepseek-chat', 'openrouter-deepseek',  # 新的模型选项
+                            'routed'  # 按块复杂度在聊天模型和推理模型之间选择
                         ],
                         default='auto', help='翻译引擎选择')
+    parser.add_argument('--deadline', type=float, default=0,
+                        help='翻译时间限制（秒），预计超时时改用更快的模型，超时后未翻译的块保留原文；0表示不限制')
     parser.add_argument('--compare', action='store_true', help='比较所有提取方法的结果')
+    parser.add_argument('--no-cache', action='store_true', help='不使用文本提取缓存，强制重新提取')
+    parser.add_argument('--no-incremental', action='store_true',
+                        help='重新翻译全文，不复用同名文档上一版本中未改动段落的翻译')
     parser.add_argument('--create-pdf', action='store_true', help='将处理后的图片转回PDF')
     parser.add_argument('--output-pdf', type=str, help='输出PDF文件路径 (默认为原文件名.pdf)')
     args = parser.parse_args()
@@ -87,7 +96,7 @@ def main():
         # Process the PDF file
         try:
             print(f"处理PDF文件: {args.pdf}")
-            pdf_processor = PDFProcessor(args.pdf, args.margin)
+            pdf_processor = PDFProcessor(args.pdf, args.margin, use_cache=not args.no_cache)
             
             # Convert PDF to images with note space
             image_paths = pdf_processor.convert_to_images_with_notes(args.output)
@@ -130,6 +139,13 @@ def main():
                 text_path = os.path.join(args.output, 'extracted_text.txt')
                 with open(text_path, 'w', encoding='utf-8') as f:
                     f.write(text)
+                for method, pages in pdf_processor.get_page_method_summary().items():
+                    if method == args.extract_method:
+                        print(f"  {method}: {len(pages)} 页")
+                    else:
+                        print(f"  {method}: 第 {', '.join(map(str, pages))} 页")
+                for entry in pdf_processor.get_timed_out_pages():
+                    print(f"警告: 第 {entry['page']} 页提取超时，已改用 {entry['method']} 提取")
                 print(f"已提取文本并保存到 {text_path}")
             
             # Translate text if requested
@@ -137,11 +153,89 @@ def main():
                 print(f"正在使用 {args.translate_engine} 引擎翻译文本...")
                 # 根据用户选择的引擎创建翻译器
                 translator = TranslatorFactory.create_translator(args.translate_engine)
-                translation = translator.translate(text)
+                
+                # 同名文档用同一模型翻译过时，只翻译修订后有改动的段落
+                document_store = None
+                if not args.no_incremental and \
+                        os.getenv('INCREMENTAL_TRANSLATION_ENABLED', 'True').lower() in ('true', '1', 't'):
+                    document_store = get_default_document_store()
+                document_name = os.path.basename(args.pdf)
+                previous = None
+                if document_store is not None:
+                    previous = document_store.load(document_name, translator.model_name, translator.PROMPT_VERSION)
+                
+                revision = None
+                if previous is not None:
+                    revision = DocumentDiff(previous['units'], text)
+                    translation = translator.translate_revision(revision, deadline=args.deadline)
+                    units = translator.last_revision_units
+                else:
+                    translation = translator.translate(text, deadline=args.deadline)
+                    units = document_units(text, translation)
                 translation_path = os.path.join(args.output, 'translation.txt')
                 with open(translation_path, 'w', encoding='utf-8') as f:
                     f.write(translation)
                 print(f"翻译完成并保存到 {translation_path}")
+                if revision is not None:
+                    report = revision.report()
+                    print(f"  增量翻译: 复用上一版本 {report['reused_percent']:.0f}% 的内容 "
+                          f"({report['reused_paragraphs']}/{report['paragraphs']} 段), "
+                          f"翻译 {report['translated_paragraphs']} 段; 未改动 {report['unchanged']} 段, "
+                          f"修改 {report['changed']} 段, "
+                          f"新增 {report['added']} 段, 删除 {report['removed']} 段")
+                if document_store is not None:
+                    if translator.last_deadline_report and translator.last_deadline_report['partial_chunks']:
+                        print("  部分段落超时未翻译，本次结果不作为增量翻译的基础版本")
+                    else:
+                        document_store.save(document_name, translator.model_name, translator.PROMPT_VERSION, units)
+                if translator.memory is not None:
+                    stats = translator.memory.get_stats()
+                    print(f"  翻译记忆: 命中 {stats['hits']} 块, 未命中 {stats['misses']} 块, "
+                          f"共 {stats['entries']} 条记录")
+                if translator.last_reuse_report:
+                    reuse = translator.last_reuse_report
+                    print(f"  句子复用: {reuse['reused_sentences']}/{reuse['sentences']} 句, "
+                          f"节省约 {reuse['tokens_saved']} tokens")
+                if getattr(translator, 'last_routing', None):
+                    routing = translator.last_routing
+                    print(f"  模型路由: {routing['strong_chunks']}/{routing['chunks']} 块使用 {routing['strong_model']}")
+                    for decision in routing['decisions']:
+                        print(f"    第 {decision['chunk']} 块: {decision['model']}, 复杂度 {decision['score']:.2f} "
+                              f"(平均句长 {decision['mean_sentence_words']:.0f} 词, "
+                              f"长词 {decision['rare_word_ratio']:.0%}, 公式/表格标记 "
+                              f"{decision['math_ratio']:.0%}/{decision['table_ratio']:.0%})")
+                if translator.last_deadline_report:
+                    report = translator.last_deadline_report
+                    print(f"  时间限制: {report['deadline']:.0f} 秒, 实际 {report['elapsed']:.1f} 秒, "
+                          f"{report['degraded_chunks']}/{report['chunks']} 块降级, "
+                          f"{report['partial_chunks']} 块未翻译")
+                    for entry in report['degraded']:
+                        print(f"    第 {entry['chunk']} 块: {', '.join(entry['actions'])}"
+                              + (f" ({entry['model']})" if entry['model'] else ""))
+                if translator.hedger is not None and translator.hedger.hedged:
+                    hedging = translator.hedger.get_stats()
+                    print(f"  请求对冲: {hedging['hedged']}/{hedging['calls']} 次请求发送了对冲, "
+                          f"其中备用服务商先返回 {hedging['hedge_wins']} 次")
+                coalescing = get_default_single_flight().get_stats()
+                if coalescing['coalesced']:
+                    print(f"  请求合并: {coalescing['coalesced']}/{coalescing['calls']} 次请求与进行中的相同请求合并")
+                if translator.batcher is not None and translator.batcher.batches:
+                    batching = translator.batcher.get_stats()
+                    print(f"  短块合并: {batching['batched_requests']} 个短块合并为 "
+                          f"{batching['batches'] - batching['fallbacks']} 次请求, "
+                          f"减少 {batching['round_trips_saved']} 次往返")
+                if hasattr(translator, 'get_health'):
+                    for backend_name, health in translator.get_health().items():
+                        print(f"  {backend_name}: {health['state']}, 错误率 {health['error_rate']:.0%}, "
+                              f"共 {health['requests']} 次请求")
+                for row in translator.usage.rows():
+                    cost = f"${row['cost']:.4f}" if row['cost'] is not None else "未知"
+                    print(f"  {row['model']} {row['stage']}: {row['calls']} 次调用, 输入 {row['prompt_tokens']} tokens "
+                          f"(缓存命中 {row['cache_hit_tokens']}), 输出 {row['completion_tokens']} tokens "
+                          f"(推理 {row['reasoning_tokens']}), 平均 {row['mean_latency']:.1f} 秒, 费用 {cost}")
+                usage_path = os.path.join(args.output, 'usage.csv')
+                translator.usage.write_csv(usage_path)
+                print(f"  API用量已保存到 {usage_path}")
             
             # Extract vocabulary if requested
             if args.vocabulary:
@@ -164,4 +258,6 @@ def main():
             parser.print_help()
 
 if __name__ == "__main__":
+    # 打包后的可执行文件中启动文本提取工作进程所需
+    multiprocessing.freeze_support()
     main() 
\ No newline at end of file
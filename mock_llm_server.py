@@ -0,0 +1,396 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+本地模拟大模型服务器，兼容 /v1/chat/completions 接口（包括流式输出），
+用于在无法访问DeepSeek或OpenRouter的环境（CI、离线基准测试机）中测试和测量性能
+
+用法：
+    python mock_llm_server.py --port 5002 --latency lognormal:0.8,0.5 --tokens-per-second 60
+    然后在 .env 中设置 MOCK_LLM_URL=http://127.0.0.1:5002，所有模型都会改为请求该服务器
+
+支持：
+    - 可配置的首token延迟分布和输出速度
+    - 按比例注入429和5xx错误
+    - 按请求的 max_tokens 截断回复（finish_reason="length"），以及续写被截断的回复
+    - 录制真实API的响应（--record 文件 --upstream 地址）并在之后回放（--replay 文件）
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import math
+import random
+import hashlib
+import argparse
+import threading
+import requests
+from flask import Flask, Response, request, jsonify, stream_with_context
+
+# 添加项目根目录到路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.utils.text_utils import estimate_tokens
+
+# 创建Flask应用
+app = Flask(__name__)
+
+# 服务器配置，由命令行参数设置
+config = {
+    'latency': lambda: 0.0,
+    'tokens_per_second': 0.0,
+    'rate_429': 0.0,
+    'rate_5xx': 0.0,
+    'retry_after': 1.0,
+    'upstream': None,
+    'record_path': None,
+}
+
+# 录制或回放的响应，键为请求的哈希
+recordings = {}
+recordings_lock = threading.Lock()
+
+# 已经见过的系统提示词，再次出现时按前缀缓存命中计算用量
+seen_prefixes = set()
+
+# 请求统计
+stats = {'requests': 0, 'streamed': 0, 'truncated': 0, 'injected_429': 0, 'injected_5xx': 0,
+         'replayed': 0, 'recorded': 0}
+
+def parse_distribution(spec):
+    """
+    解析延迟分布
+
+    Args:
+        spec (str): 分布描述，例如 "fixed:0.5"、"uniform:0.2,1.0"、"normal:0.8,0.2"、
+                    "lognormal:0.8,0.5"（中位数, sigma）、"exponential:0.5"（均值）
+
+    Returns:
+        callable: 每次调用返回一个延迟（秒）
+    """
+    name, _, args = spec.partition(":")
+    values = [float(value) for value in args.split(",") if value]
+
+    if name == "fixed":
+        return lambda: values[0]
+    if name == "uniform":
+        return lambda: random.uniform(values[0], values[1])
+    if name == "normal":
+        return lambda: max(0.0, random.gauss(values[0], values[1]))
+    if name == "lognormal":
+        return lambda: random.lognormvariate(math.log(values[0]), values[1])
+    if name == "exponential":
+        return lambda: random.expovariate(1 / values[0])
+    raise ValueError(f"未知的延迟分布: {spec}")
+
+def request_key(payload):
+    """
+    计算请求的哈希，用于录制和回放
+
+    Args:
+        payload (dict): 请求内容
+
+    Returns:
+        str: 请求的哈希
+    """
+    parts = [payload.get('model'), payload.get('messages'), payload.get('temperature'), payload.get('max_tokens')]
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+
+def load_recordings(path):
+    """
+    读取录制的响应
+
+    Args:
+        path (str): JSONL文件路径
+    """
+    if not path or not os.path.exists(path):
+        return
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                recordings[entry['key']] = entry['content']
+    print(f"已加载 {len(recordings)} 条录制的响应")
+
+def english_paragraphs(text):
+    """
+    取出提示词中的英文段落
+
+    Args:
+        text (str): 用户消息
+
+    Returns:
+        list: 英文段落
+    """
+    paragraphs = []
+    for paragraph in re.split(r'\n\s*\n', text):
+        letters = len(re.findall(r'[A-Za-z]', paragraph))
+        if letters >= 3 and letters > len(re.findall(r'[一-鿿]', paragraph)):
+            paragraphs.append(paragraph.strip())
+    return paragraphs
+
+def synthesize_vocabulary(text):
+    """
+    生成模拟的词汇解析
+    """
+    words = []
+    for word in re.findall(r"[A-Za-z][A-Za-z'-]{6,}", text):
+        if word.lower() not in words:
+            words.append(word.lower())
+    lines = [f"{i}. {word}：模拟释义 - 例句：This is an example of {word}." for i, word in enumerate(words[:8], 1)]
+    return "重点词汇解析：\n" + "\n".join(lines)
+
+def synthesize_content(messages):
+    """
+    根据提示词的格式生成模拟回复，保证各模型的解析方法都能正常解析
+
+    Args:
+        messages (list): 请求的消息
+
+    Returns:
+        str: 回复内容
+    """
+    # 续写被截断的回复：生成原请求的完整回复，返回已输出部分之后的内容
+    if len(messages) >= 3 and messages[-2].get('role') == 'assistant':
+        partial = messages[-2].get('content', '')
+        content = synthesize_content(messages[:-2])
+        return content[len(partial):] if content.startswith(partial) else content
+
+    user_message = messages[-1]['content'] if messages else ""
+
+    # 逐段编号翻译
+    if "以下是按顺序编号的英文片段" in user_message:
+        numbered = user_message.split("请严格按照以下格式回复", 1)[0]
+        segments = re.findall(r'^\[(\d+)\] (.*)$', numbered, re.MULTILINE)
+        return "\n".join(f"[{number}] 【模拟译文】{segment}" for number, segment in segments)
+
+    # 词汇提取
+    if "提取重要词汇" in user_message:
+        return synthesize_vocabulary(user_message.split("请仅提取重点词汇", 1)[0])
+
+    source = user_message.split("原文：", 1)[-1].split("===开始翻译===", 1)[0]
+    translation = "\n\n".join(f"【模拟译文】{paragraph}" for paragraph in english_paragraphs(source))
+
+    # Deepseek Reasoner 的格式化回复
+    if "===开始翻译===" in user_message:
+        return (f"===开始翻译===\n{translation}\n===结束翻译===\n\n"
+                f"===开始词汇解析===\n{synthesize_vocabulary(source)}\n===结束词汇解析===")
+    return translation
+
+def fetch_upstream(payload):
+    """
+    向真实API请求（非流式）并录制回复
+
+    Args:
+        payload (dict): 请求内容
+
+    Returns:
+        str: 回复内容
+    """
+    upstream_payload = dict(payload, stream=False)
+    response = requests.post(
+        config['upstream'].rstrip('/') + request.path,
+        headers={"Content-Type": "application/json", "Authorization": request.headers.get('Authorization', '')},
+        json=upstream_payload,
+        timeout=300
+    )
+    response.raise_for_status()
+    content = response.json()["choices"][0]["message"]["content"]
+
+    key = request_key(payload)
+    with recordings_lock:
+        recordings[key] = content
+        if config['record_path']:
+            with open(config['record_path'], 'a', encoding='utf-8') as f:
+                f.write(json.dumps({'key': key, 'model': payload.get('model'), 'content': content}, ensure_ascii=False) + "\n")
+        stats['recorded'] += 1
+    return content
+
+def split_deltas(content):
+    """
+    把回复拆分成流式输出的增量，每个增量约一个词或几个汉字
+    """
+    return re.findall(r'\s*[A-Za-z0-9\'-]+|\s*[一-鿿]{1,2}|\s*[^\sA-Za-z0-9一-鿿]|\s+', content)
+
+def truncate(content, max_tokens):
+    """
+    按 max_tokens 截断回复，与真实API一样在超出时以 finish_reason="length" 结束
+
+    Returns:
+        tuple: (回复内容, finish_reason)
+    """
+    if not max_tokens or estimate_tokens(content) <= max_tokens:
+        return content, 'stop'
+
+    deltas = []
+    tokens = 0
+    for delta in split_deltas(content):
+        tokens += estimate_tokens(delta)
+        if tokens > max_tokens:
+            break
+        deltas.append(delta)
+    return "".join(deltas), 'length'
+
+def usage(payload, content):
+    """
+    估算请求的token用量，格式与DeepSeek相同；系统提示词之前出现过时记为缓存命中
+    """
+    messages = payload.get('messages', [])
+    prompt_tokens = sum(estimate_tokens(message.get('content', '')) for message in messages)
+    completion_tokens = estimate_tokens(content)
+
+    cache_hit_tokens = 0
+    if messages and messages[0].get('role') == 'system':
+        prefix = messages[0].get('content', '')
+        with recordings_lock:
+            if prefix in seen_prefixes:
+                cache_hit_tokens = estimate_tokens(prefix)
+            seen_prefixes.add(prefix)
+
+    return {
+        'prompt_tokens': prompt_tokens,
+        'completion_tokens': completion_tokens,
+        'total_tokens': prompt_tokens + completion_tokens,
+        'prompt_cache_hit_tokens': cache_hit_tokens,
+        'prompt_cache_miss_tokens': prompt_tokens - cache_hit_tokens,
+    }
+
+def stream_response(payload, content, reasoning, finish_reason='stop'):
+    """
+    以SSE格式逐个输出增量，速度由 tokens_per_second 控制
+    """
+    created = int(time.time())
+
+    def chunk(delta, finish_reason=None):
+        return event({'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}]})
+
+    def event(fields):
+        return "data: " + json.dumps(dict({
+            'id': 'mock-stream',
+            'object': 'chat.completion.chunk',
+            'created': created,
+            'model': payload.get('model'),
+        }, **fields), ensure_ascii=False) + "\n\n"
+
+    def generate():
+        # 推理模型先输出几段思考过程
+        if reasoning:
+            for _ in range(3):
+                yield chunk({'reasoning_content': "思考中。"})
+
+        for delta in split_deltas(content):
+            if config['tokens_per_second']:
+                time.sleep(estimate_tokens(delta) / config['tokens_per_second'])
+            yield chunk({'content': delta})
+        yield chunk({}, finish_reason=finish_reason)
+        if (payload.get('stream_options') or {}).get('include_usage'):
+            yield event({'choices': [], 'usage': usage(payload, content)})
+        yield "data: [DONE]\n\n"
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream')
+
+@app.route('/v1/chat/completions', methods=['POST'])
+@app.route('/api/v1/chat/completions', methods=['POST'])
+def chat_completions():
+    """兼容OpenAI格式的对话补全接口"""
+    payload = request.get_json(force=True)
+    stats['requests'] += 1
+
+    # 注入错误
+    roll = random.random()
+    if roll < config['rate_429']:
+        stats['injected_429'] += 1
+        response = jsonify({'error': {'message': 'Rate limit exceeded (mock)', 'type': 'rate_limit'}})
+        response.headers['Retry-After'] = str(config['retry_after'])
+        return response, 429
+    if roll < config['rate_429'] + config['rate_5xx']:
+        stats['injected_5xx'] += 1
+        return jsonify({'error': {'message': 'Internal server error (mock)', 'type': 'server_error'}}), \
+            random.choice([500, 502, 503])
+
+    # 录制的响应优先，其次转发到真实API，最后生成模拟回复
+    key = request_key(payload)
+    with recordings_lock:
+        content = recordings.get(key)
+    if content is not None:
+        stats['replayed'] += 1
+    elif config['upstream']:
+        try:
+            content = fetch_upstream(payload)
+        except requests.RequestException as e:
+            return jsonify({'error': {'message': f'Upstream error: {str(e)}', 'type': 'upstream_error'}}), 502
+    else:
+        content = synthesize_content(payload.get('messages', []))
+
+    # 首token延迟
+    time.sleep(config['latency']())
+
+    content, finish_reason = truncate(content, payload.get('max_tokens'))
+    if finish_reason == 'length':
+        stats['truncated'] += 1
+
+    model = payload.get('model') or ''
+    if payload.get('stream'):
+        stats['streamed'] += 1
+        return stream_response(payload, content, 'reasoner' in model or 'r1' in model, finish_reason)
+
+    if config['tokens_per_second']:
+        time.sleep(estimate_tokens(content) / config['tokens_per_second'])
+
+    return jsonify({
+        'id': 'mock-completion',
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': model,
+        'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': finish_reason}],
+        'usage': usage(payload, content),
+    })
+
+@app.route('/stats', methods=['GET'])
+def server_stats():
+    """请求统计"""
+    return jsonify(stats)
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="本地模拟大模型服务器")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址")
+    parser.add_argument("--port", type=int, default=5002, help="监听端口")
+    parser.add_argument("--latency", default="fixed:0.2",
+                        help="首token延迟分布，例如 fixed:0.5、uniform:0.2,1.0、normal:0.8,0.2、"
+                             "lognormal:0.8,0.5、exponential:0.5")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="输出速度（0表示立即输出）")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="返回429的比例")
+    parser.add_argument("--rate-5xx", type=float, default=0.0, help="返回5xx的比例")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="429响应的Retry-After（秒）")
+    parser.add_argument("--upstream", help="录制时转发到的真实API地址，例如 https://api.deepseek.com")
+    parser.add_argument("--record", help="把真实API的响应追加保存到该JSONL文件（需要 --upstream）")
+    parser.add_argument("--replay", help="从该JSONL文件回放录制的响应")
+    parser.add_argument("--seed", type=int, help="随机种子，使延迟和错误注入可复现")
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    if args.record and not args.upstream:
+        parser.error("--record 需要同时指定 --upstream")
+
+    config.update(
+        latency=parse_distribution(args.latency),
+        tokens_per_second=args.tokens_per_second,
+        rate_429=args.rate_429,
+        rate_5xx=args.rate_5xx,
+        retry_after=args.retry_after,
+        upstream=args.upstream,
+        record_path=args.record,
+    )
+    load_recordings(args.replay)
+    load_recordings(args.record)
+
+    print("启动模拟大模型服务器...")
+    print(f"在 .env 中设置 MOCK_LLM_URL=http://{args.host}:{args.port} 让所有模型使用该服务器")
+    app.run(host=args.host, port=args.port, threaded=True)
+
+if __name__ == '__main__':
+    main()
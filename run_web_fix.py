@@ -9,7 +9,9 @@ import os
 import sys
 import time
 import json
+import math
 import threading
+import multiprocessing
 from flask import Flask, render_template, request, jsonify, send_from_directory, url_for, redirect, Blueprint, send_file
 from werkzeug.utils import secure_filename
 
@@ -21,6 +23,13 @@ if current_dir not in sys.path:
 # 直接导入PDFProcessor和TranslatorFactory，避免导入错误
 from src.utils.pdf_processor import PDFProcessor
 from src.utils.translator_factory import TranslatorFactory
+from src.utils.async_runtime import run_sync
+from src.utils.single_flight import get_default_single_flight
+from src.utils.hedging import get_default_hedger
+from src.utils.micro_batch import get_default_micro_batcher
+from src.utils.usage_ledger import UsageLedger
+from src.utils.document_diff import (DocumentDiff, get_default_document_store, is_document_id, new_document_id,
+                                     rebuild_vocabulary)
 
 # 创建Flask应用
 app = Flask(__name__, 
@@ -42,6 +51,13 @@ if not os.path.exists(app.config['UPLOAD_FOLDER']):
 # 任务状态字典
 tasks = {}
 
+# 限时翻译中各块降级方式的说明
+DEADLINE_ACTIONS = {
+    'fast_model': '改用更快的模型',
+    'extra_provider': '改用备用服务商',
+    'partial': '超出时间限制，保留原文',
+}
+
 def allowed_file(filename):
     """检查文件是否是允许的类型"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() == 'pdf'
@@ -64,6 +80,11 @@ def upload_file():
         return jsonify({'error': '未选择文件'}), 400
     
     # 检查是否是允许的文件类型
+    # 上传修订版时带上上一版本的文档编号，只翻译改动的段落
+    document_id = request.form.get('document_id', '').strip().lower()
+    if document_id and not is_document_id(document_id):
+        return jsonify({'error': '文档编号无效'}), 400
+    
     if file and allowed_file(file.filename):
         filename = secure_filename(file.filename)
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
@@ -75,6 +96,7 @@ def upload_file():
             'status': 'uploaded',
             'file': filepath,
             'filename': filename,
+            'document_id': document_id or new_document_id(),
             'created': time.time(),
             'task_id': task_id  # 显式存储ID，方便传递
         }
@@ -82,6 +104,7 @@ def upload_file():
         return jsonify({
             'success': True,
             'task_id': task_id,
+            'document_id': tasks[task_id]['document_id'],
             'message': '文件上传成功',
             'next': url_for('process', task_id=task_id)
         })
@@ -104,6 +127,14 @@ def api_process():
     task_id = data.get('task_id')
     extract_method = data.get('extract_method', PDFProcessor.EXTRACT_METHOD_IMAGE)
     translator_type = data.get('translator_type', TranslatorFactory.MODEL_AUTO)
+    use_cache = data.get('use_cache', True)
+    # 翻译的时间限制（秒），0表示不限制
+    try:
+        deadline = float(data.get('deadline') or os.getenv('TRANSLATION_DEADLINE', 0))
+    except (TypeError, ValueError):
+        deadline = None
+    if deadline is None or not math.isfinite(deadline) or deadline < 0:
+        return jsonify({'error': '时间限制必须是不小于0的秒数'}), 400
     
     if task_id not in tasks:
         return jsonify({'error': '任务不存在'}), 404
@@ -113,7 +144,7 @@ def api_process():
     # 启动处理线程
     thread = threading.Thread(
         target=process_pdf_thread,
-        args=(task_id, task['file'], extract_method, translator_type),
+        args=(task_id, task['file'], extract_method, translator_type, use_cache, deadline),
         daemon=True
     )
     thread.start()
@@ -136,7 +167,7 @@ def api_debug():
         'routes': [str(rule) for rule in app.url_map.iter_rules()]
     })
 
-def process_pdf_thread(task_id, pdf_path, extract_method, translator_type):
+def process_pdf_thread(task_id, pdf_path, extract_method, translator_type, use_cache=True, deadline=0):
     """后台处理PDF线程"""
     try:
         task = tasks[task_id]
@@ -159,7 +190,7 @@ def process_pdf_thread(task_id, pdf_path, extract_method, translator_type):
         task['progress'].append("步骤1/5: 正在处理PDF并转换为图片...")
         task['current_step'] = 1
         
-        pdf_processor = PDFProcessor(pdf_path)
+        pdf_processor = PDFProcessor(pdf_path, use_cache=use_cache)
         image_paths = pdf_processor.convert_to_images_with_notes(task_output_dir)
         
         task['image_paths'] = image_paths
@@ -177,15 +208,66 @@ def process_pdf_thread(task_id, pdf_path, extract_method, translator_type):
         
         task['extracted_text'] = text
         task['text_path'] = text_path
+        task['timed_out_pages'] = pdf_processor.get_timed_out_pages()
+        task['page_methods'] = pdf_processor.get_page_method_summary()
+        if len(task['page_methods']) > 1:
+            summary = ', '.join(f"{method} {len(pages)} 页" for method, pages in task['page_methods'].items())
+            task['progress'].append(f"⚠️ 部分页面使用了备用提取方法: {summary}")
+        if task['timed_out_pages']:
+            pages = ', '.join(str(entry['page']) for entry in task['timed_out_pages'])
+            task['progress'].append(f"⚠️ 第 {pages} 页提取超时，已改用备用方法提取")
         task['progress'].append(f"✓ 文本提取完成，已保存到 {os.path.basename(text_path)}")
         
         # 步骤3: 翻译文本
+        vocabulary = None
+        previous = None
+        revision = None
+        units = None
+        # 上传时给出的文档编号用同一模型翻译过时，只翻译修订后有改动的段落
+        document_store = get_default_document_store() \
+            if os.getenv('INCREMENTAL_TRANSLATION_ENABLED', 'True').lower() in ('true', '1', 't') else None
+        document_id = task.get('document_id') or new_document_id()
+        # 与上一版本重合的内容低于该比例时按新文档完整翻译
+        min_reuse_percent = float(os.getenv('DOCUMENT_REUSE_MIN_PERCENT', 30))
+        # 翻译和词汇提取的API用量记录到同一个账本
+        usage = UsageLedger()
         task['progress'].append("步骤3/5: 正在翻译文本...")
         task['current_step'] = 3
         
         try:
-            translator = TranslatorFactory.create_translator(translator_type)
-            translation = translator.translate(text)
+            translator = TranslatorFactory.create_translator(translator_type, usage=usage)
+            if document_store is not None:
+                previous = document_store.load(document_id, translator.model_name, translator.PROMPT_VERSION)
+            if previous is not None:
+                revision = DocumentDiff(previous['units'], text)
+                if revision.report()['reused_percent'] < min_reuse_percent:
+                    task['progress'].append(f"  与上一版本重合的内容只有 {revision.report()['reused_percent']:.0f}%，"
+                                            f"按新文档完整翻译")
+                    previous = None
+                    revision = None
+            
+            if revision is not None:
+                translation = run_sync(translator.translate_revision_async(revision, deadline))
+                task['partial_translation'] = translation
+                units = translator.last_translation_units
+            else:
+                # 流式翻译，已生成的译文实时保存到任务中供页面轮询显示；
+                # 所有任务的翻译请求共享同一个事件循环，而不是各自占用线程
+                task['partial_translation'] = ""
+                def append_translation(delta):
+                    task['partial_translation'] += delta
+                
+                if hasattr(translator, 'translate_with_vocabulary_async'):
+                    # 模型在同一次回复中给出翻译和词汇解析，不必再单独请求词汇
+                    translation, vocabulary = run_sync(
+                        translator.translate_with_vocabulary_async(text, append_translation, deadline)
+                    )
+                else:
+                    for delta in translator.translate_stream(text, deadline):
+                        append_translation(delta)
+                    translation = task['partial_translation']
+                task['stream_metrics'] = translator.last_stream_metrics
+                units = translator.last_translation_units
             
             translation_path = os.path.join(task_output_dir, f'{pdf_basename}_translation.txt')
             with open(translation_path, 'w', encoding='gbk', errors='replace') as f:
@@ -194,6 +276,36 @@ def process_pdf_thread(task_id, pdf_path, extract_method, translator_type):
             task['translation'] = translation
             task['translation_path'] = translation_path
             task['progress'].append(f"✓ 翻译完成，已保存到 {os.path.basename(translation_path)}")
+            if revision is not None:
+                task['revision'] = revision.report()
+                task['progress'].append(f"  增量翻译: 复用上一版本 {task['revision']['reused_percent']:.0f}% 的内容"
+                                        f"（{task['revision']['reused_paragraphs']}/{task['revision']['paragraphs']} 段），"
+                                        f"翻译了 {task['revision']['translated_paragraphs']} 段")
+            else:
+                task['progress'].append(f"  首token {translator.last_stream_metrics['time_to_first_token'] or 0:.1f}秒，"
+                                        f"总耗时 {translator.last_stream_metrics['total_time']:.1f}秒")
+            task['translation_reuse'] = translator.last_reuse_report
+            if getattr(translator, 'last_routing', None):
+                routing = translator.last_routing
+                task['routing'] = routing
+                task['progress'].append(f"  模型路由: {routing['strong_chunks']}/{routing['chunks']} 块使用 "
+                                        f"{routing['strong_model']}，其余使用 {routing['fast_model']}")
+            if translator.last_deadline_report:
+                report = translator.last_deadline_report
+                task['deadline'] = report
+                task['progress'].append(f"  时间限制 {report['deadline']:.0f}秒，实际 {report['elapsed']:.0f}秒，"
+                                        f"{report['degraded_chunks']}/{report['chunks']} 块降级")
+                for entry in report['degraded']:
+                    actions = '、'.join(DEADLINE_ACTIONS[action] for action in entry['actions'])
+                    task['progress'].append(f"  ⚠️ 第 {entry['chunk']} 块: {actions}"
+                                            + (f" ({entry['model']})" if entry['model'] else ""))
+            if translator.last_reuse_report and translator.last_reuse_report['reused_sentences']:
+                reuse = translator.last_reuse_report
+                task['progress'].append(f"  翻译记忆复用 {reuse['reused_sentences']}/{reuse['sentences']} 句，"
+                                        f"节省约 {reuse['tokens_saved']} tokens")
+            if translator.last_reuse_report and translator.last_reuse_report['truncated_chunks']:
+                task['progress'].append(f"  ⚠️ {translator.last_reuse_report['truncated_chunks']} 块的回复"
+                                        f"达到长度上限后仍被截断，译文不完整")
             
             # 步骤5: 生成翻译图片和PDF
             task['progress'].append("步骤5/5: 正在生成翻译PDF...")
@@ -430,9 +542,17 @@ def process_pdf_thread(task_id, pdf_path, extract_method, translator_type):
         
         try:
             # 使用翻译器的词汇提取功能
-            translator = TranslatorFactory.create_translator(translator_type)
-            if hasattr(translator, 'extract_vocabulary'):
-                vocabulary = translator.extract_vocabulary(text)
+            translator = TranslatorFactory.create_translator(translator_type, usage=usage)
+            if vocabulary is not None:
+                task['progress'].append("  词汇解析已随翻译一并生成")
+            elif revision is not None and previous.get('vocabulary'):
+                # 只为改动的段落提取词汇；上一版本的词汇只保留仍出现在新版本中的
+                changed_text = "\n\n".join("\n\n".join(run) for run in revision.changed_runs())
+                added = run_sync(translator.extract_vocabulary_async(changed_text)) if changed_text else ""
+                vocabulary = rebuild_vocabulary(previous['vocabulary'], text, added)
+                task['progress'].append("  未改动段落的词汇沿用上一版本")
+            elif hasattr(translator, 'extract_vocabulary_async'):
+                vocabulary = run_sync(translator.extract_vocabulary_async(text))
             else:
                 # 使用通用的词汇提取器
                 from src.utils.vocabulary_extractor import VocabularyExtractor
@@ -449,6 +569,24 @@ def process_pdf_thread(task_id, pdf_path, extract_method, translator_type):
         except Exception as e:
             task['progress'].append(f"❌ 词汇提取失败: {str(e)}")
         
+        # 保存这一版本的逐段翻译，修订后重新上传时只需翻译改动的段落
+        if document_store is not None and units is not None:
+            if task.get('deadline') and task['deadline']['partial_chunks']:
+                task['progress'].append("  部分段落超时未翻译，本次结果不作为增量翻译的基础版本")
+            else:
+                document_store.save(document_id, translator.model_name, translator.PROMPT_VERSION, units, vocabulary)
+                task['progress'].append(f"  文档编号 {document_id}，上传修订版时填写该编号即可只翻译改动的段落")
+        
+        # 保存API用量，按模型和步骤汇总
+        task['usage'] = usage.as_dict()
+        usage_path = os.path.join(task_output_dir, f'{pdf_basename}_usage.csv')
+        usage.write_csv(usage_path)
+        task['usage_path'] = usage_path
+        total = task['usage']['total']
+        task['progress'].append(f"  API用量: {total['calls']} 次调用，输入 {total['prompt_tokens']} tokens"
+                                f"（缓存命中 {total['cache_hit_rate']:.0%}），输出 {total['completion_tokens']} tokens，"
+                                f"费用约 ${total['cost']:.4f}")
+        
         # 处理完成
         task['status'] = 'completed'
         task['completed'] = time.time()
@@ -478,7 +616,27 @@ def api_task_status(task_id):
         'total_steps': task.get('total_steps', 4),
         'has_translation': 'translation' in task,
         'has_vocabulary': 'vocabulary' in task,
-        'image_count': len(task.get('image_paths', [])) if 'image_paths' in task else 0
+        'image_count': len(task.get('image_paths', [])) if 'image_paths' in task else 0,
+        'timed_out_pages': task.get('timed_out_pages', []),
+        'page_methods': task.get('page_methods', {}),
+        'translation_reuse': task.get('translation_reuse'),
+        'partial_translation': task.get('partial_translation', ''),
+        'stream_metrics': task.get('stream_metrics'),
+        'usage': task.get('usage'),
+        'routing': task.get('routing'),
+        'deadline': task.get('deadline'),
+        'revision': task.get('revision'),
+        'document_id': task.get('document_id'),
+        'usage_csv_url': url_for('download_file', task_id=task_id, file_type='usage') if 'usage_path' in task else None
+    })
+
+@app.route('/api/stats', methods=['GET'])
+def api_stats():
+    """获取所有任务共享的API请求统计"""
+    return jsonify({
+        'coalescing': get_default_single_flight().get_stats(),
+        'hedging': get_default_hedger().get_stats(),
+        'batching': get_default_micro_batcher().get_stats()
     })
 
 @app.route('/result/<task_id>', methods=['GET'])
@@ -671,6 +829,10 @@ def download_file(task_id, file_type):
         # 下载词汇表
         file_path = task.get('vocabulary_path')
         filename = os.path.basename(file_path) if file_path else 'vocabulary.txt'
+    elif file_type == 'usage':
+        # 下载API用量统计
+        file_path = task.get('usage_path')
+        filename = os.path.basename(file_path) if file_path else 'usage.csv'
     elif file_type == 'pdf':
         # 下载导出的PDF
         file_path = task.get('export_pdf')
@@ -746,6 +908,9 @@ def debug_info():
     })
 
 if __name__ == '__main__':
+    # 打包后的可执行文件中启动文本提取工作进程所需
+    multiprocessing.freeze_support()
+    
     host = os.environ.get('HOST', '0.0.0.0')
     port = int(os.environ.get('PORT', 5000))
     debug = os.environ.get('DEBUG', 'True').lower() in ('true', '1', 't')
@@ -7,7 +7,6 @@ import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 from PIL import Image, ImageTk
 import threading
-from dotenv import load_dotenv
 
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -213,6 +212,7 @@ class PDFGUI:
             TranslatorFactory.MODEL_DEEPSEEK_REASONER,
             TranslatorFactory.MODEL_DEEPSEEK_CHAT,
             TranslatorFactory.MODEL_OPENROUTER_DEEPSEEK,
+            TranslatorFactory.MODEL_ROUTED,
         ]
         translator_combo.pack(side=tk.LEFT, padx=5)
     
@@ -475,8 +475,13 @@ class PDFGUI:
             translator_type = self.translator_var.get()
             translator = TranslatorFactory.create_translator(translator_type)
             
-            # 翻译文本，如果是auto模式会自动尝试不同的翻译器
-            translation = translator.translate(text)
+            # 流式翻译，译文边生成边显示
+            self.root.after(0, lambda: self._update_translation_text(""))
+            parts = []
+            for delta in translator.translate_stream(text):
+                parts.append(delta)
+                self.root.after(0, lambda delta=delta: self._append_translation_text(delta))
+            translation = "".join(parts)
             
             # Save the translation
             translation_path = os.path.join(self.output_dir, 'translation.txt')
@@ -484,8 +489,11 @@ class PDFGUI:
                 f.write(translation)
             
             # Update UI in the main thread
-            self.root.after(0, lambda: self._update_translation_text(translation))
-            self.root.after(0, lambda: self._update_status(f"翻译完成并保存到 {translation_path}"))
+            metrics = translator.last_stream_metrics
+            self.root.after(0, lambda: self._update_status(
+                f"翻译完成并保存到 {translation_path}（首token {metrics['time_to_first_token'] or 0:.1f}秒，"
+                f"总耗时 {metrics['total_time']:.1f}秒）"
+            ))
             
         except Exception as e:
             error_msg = str(e)
@@ -509,6 +517,13 @@ class PDFGUI:
         self.translation_text.insert(tk.END, text)
         self.notebook.select(0)  # Switch to translation tab
     
+    def _append_translation_text(self, text):
+        """
+        Append streamed text to the translation text widget.
+        """
+        self.translation_text.insert(tk.END, text)
+        self.translation_text.see(tk.END)
+    
     def extract_vocabulary(self):
         """
         Extract vocabulary from the extracted text.
@@ -1231,13 +1246,18 @@ class PDFGUI:
             self._update_progress(progress_text, "第3步/4: 正在翻译文本...", progress_bar, (current_step / total_steps) * 100)
             
             # 翻译文本
+            vocabulary = None
             try:
                 # 根据用户选择的翻译引擎创建翻译器
                 translator_type = self.translator_var.get()
                 translator = TranslatorFactory.create_translator(translator_type)
                 
-                # 翻译文本，如果是auto模式会自动尝试不同的翻译器
-                translation = translator.translate(text)
+                if hasattr(translator, 'translate_with_vocabulary'):
+                    # 模型在同一次回复中给出翻译和词汇解析，不必再单独请求词汇
+                    translation, vocabulary = translator.translate_with_vocabulary(text)
+                else:
+                    # 翻译文本，如果是auto模式会自动尝试不同的翻译器
+                    translation = translator.translate(text)
                 
                 # Save the translation
                 translation_path = os.path.join(self.output_dir, 'translation.txt')
@@ -1302,8 +1322,15 @@ class PDFGUI:
             
             # 提取词汇
             try:
-                # 直接传递文本内容和进度窗口信息
-                self._extract_vocabulary_thread(text, progress_text, progress_window)
+                if vocabulary and "重点词汇解析" in vocabulary:
+                    # 词汇解析已随翻译一并生成
+                    with open(vocabulary_path, 'w', encoding='utf-8') as f:
+                        f.write(vocabulary)
+                    self.root.after(0, lambda: self._update_vocabulary_text(vocabulary))
+                    self._update_progress(progress_text, f"✓ 词汇解析已随翻译一并生成，已保存到 {vocabulary_path}")
+                else:
+                    # 直接传递文本内容和进度窗口信息
+                    self._extract_vocabulary_thread(text, progress_text, progress_window)
                 # 由于_extract_vocabulary_thread会自行更新进度，这里无需额外更新
                 current_step += 1
             except Exception as e:
@@ -1398,8 +1425,8 @@ class PDFGUI:
         检查并重新加载API密钥
         """
         try:
-            # 重新加载.env文件
-            load_dotenv(override=True)
+            # 重新加载.env文件，之后创建的翻译器使用新的密钥
+            TranslatorFactory.reload_config()
             
             # 检查API密钥
             deepseek_key = os.getenv('DEEPSEEK_API_KEY', '')
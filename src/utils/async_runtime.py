@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+import threading
+
+_loop = None
+_loop_lock = threading.Lock()
+
+def get_event_loop():
+    """
+    Get the shared background event loop, starting its thread on first use.
+
+    All coroutines submitted through run_sync run on this one loop, so
+    concurrent tasks share its HTTP sessions and per-provider semaphores.
+
+    Returns:
+        asyncio.AbstractEventLoop: Running background event loop
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="async-runtime", daemon=True).start()
+        return _loop
+
+def run_sync(coroutine, timeout=None):
+    """
+    Run a coroutine on the shared background loop and wait for its result.
+
+    Lets blocking callers (GUI and web worker threads) use the async API.
+
+    Args:
+        coroutine: Coroutine to run
+        timeout (float): Maximum seconds to wait (None waits forever)
+
+    Returns:
+        The coroutine's result
+    """
+    loop = get_event_loop()
+    try:
+        running_loop = asyncio.get_running_loop()
+    except RuntimeError:
+        running_loop = None
+    if running_loop is loop:
+        coroutine.close()
+        raise RuntimeError("run_sync cannot be called from the shared event loop; await the coroutine instead")
+
+    return asyncio.run_coroutine_threadsafe(coroutine, loop).result(timeout)
+
+def iterate_sync(async_iterable):
+    """
+    Iterate an async iterable from blocking code, running it on the shared background loop.
+
+    Args:
+        async_iterable: Async iterable, e.g. an async generator
+
+    Yields:
+        Items produced by the async iterable
+    """
+    iterator = async_iterable.__aiter__()
+
+    async def next_item():
+        return await iterator.__anext__()
+
+    try:
+        while True:
+            try:
+                yield run_sync(next_item())
+            except StopAsyncIteration:
+                return
+    finally:
+        # 调用方提前结束迭代时关闭异步生成器，取消仍在进行的请求
+        if hasattr(iterator, 'aclose'):
+            async def close():
+                await iterator.aclose()
+            run_sync(close())
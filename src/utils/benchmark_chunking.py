@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+基准测试脚本，比较原来按3000字符分块与按token预算分块所需的API调用次数
+"""
+
+import os
+import sys
+import random
+import argparse
+
+# 添加项目根目录到路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.append(project_root)
+
+# 分块不调用API，没有配置密钥时使用占位值
+os.environ.setdefault('DEEPSEEK_API_KEY', 'benchmark')
+os.environ.setdefault('OPENROUTER_API_KEY', 'benchmark')
+
+from src.utils.text_utils import estimate_tokens
+from src.utils.translator_factory import TranslatorFactory
+
+SAMPLE_SENTENCES = [
+    "Chicago's West Loop was once the city's meatpacking district, but people still travel there to buy beef.",
+    "Prices have risen steadily over the past year, driven by drought and a shrinking national herd.",
+    "Ranchers say it will take years to rebuild their stocks, even if feed costs fall.",
+    "Economists warn that new tariffs on imports would push prices higher still.",
+    "The department's latest figures show that wholesale beef prices are at a record high.",
+    "Consumers have so far been willing to pay more, but restaurants report thinner margins.",
+    "Some analysts expect demand to soften as shoppers switch to chicken and pork.",
+    "In the meantime, burger chains are experimenting with smaller patties and blended recipes.",
+]
+
+def legacy_split_text(text, max_chunk_size=3000):
+    """
+    原来的分块方式：按段落合并，每块不超过3000字符，超长段落不拆分
+
+    Args:
+        text (str): 要分割的文本
+        max_chunk_size (int): 每块的最大字符数
+
+    Returns:
+        list: 文本块列表
+    """
+    if not text or len(text) <= max_chunk_size:
+        return [text]
+
+    chunks = []
+    current_chunk = ""
+    for paragraph in text.split("\n\n"):
+        if len(current_chunk) + len(paragraph) > max_chunk_size:
+            if current_chunk:
+                chunks.append(current_chunk)
+            current_chunk = paragraph
+        else:
+            current_chunk = current_chunk + "\n\n" + paragraph if current_chunk else paragraph
+    if current_chunk:
+        chunks.append(current_chunk)
+    return chunks
+
+def create_corpus(paragraph_count, seed=0):
+    """
+    生成段落长度各不相同的英文语料，其中包含少量超长段落
+
+    Args:
+        paragraph_count (int): 段落数
+        seed (int): 随机种子
+
+    Returns:
+        str: 语料文本
+    """
+    rng = random.Random(seed)
+    paragraphs = []
+    for _ in range(paragraph_count):
+        # 大多数段落2~8句，约5%为超过3000字符的长段落
+        sentence_count = rng.randint(35, 50) if rng.random() < 0.05 else rng.randint(2, 8)
+        paragraphs.append(" ".join(rng.choice(SAMPLE_SENTENCES) for _ in range(sentence_count)))
+    return "\n\n".join(paragraphs)
+
+def load_corpus(args):
+    """
+    根据命令行参数读取或生成语料
+
+    Args:
+        args (argparse.Namespace): 命令行参数
+
+    Returns:
+        tuple: (语料名称, 语料文本)
+    """
+    if args.text:
+        with open(args.text, encoding='utf-8') as f:
+            return args.text, f.read()
+    if args.pdf:
+        from src.utils.pdf_processor import PDFProcessor
+        return args.pdf, PDFProcessor(args.pdf).extract_text()
+    return f"合成语料 ({args.paragraphs} 段)", create_corpus(args.paragraphs)
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="分块API调用次数基准测试")
+    parser.add_argument("--text", help="要测试的英文文本文件")
+    parser.add_argument("--pdf", help="要测试的PDF文件")
+    parser.add_argument("--paragraphs", type=int, default=400, help="合成语料的段落数")
+    args = parser.parse_args()
+
+    name, text = load_corpus(args)
+    legacy_chunks = legacy_split_text(text)
+    oversize = sum(1 for chunk in legacy_chunks if len(chunk) > 3000)
+
+    print(f"语料: {name}, {len(text)} 字符, 约 {estimate_tokens(text)} tokens")
+    print(f"原分块方式 (3000字符): {len(legacy_chunks)} 次调用, 其中 {oversize} 块超过3000字符\n")
+    print(f"{'模型':>22} {'每块预算(tokens)':>16} {'调用次数':>8} {'最大块(tokens)':>14} {'减少':>8}")
+
+    for model_type in [TranslatorFactory.MODEL_DEEPSEEK_REASONER,
+                       TranslatorFactory.MODEL_DEEPSEEK_CHAT,
+                       TranslatorFactory.MODEL_OPENROUTER_DEEPSEEK]:
+        translator = TranslatorFactory.create_translator(model_type)
+        chunks = translator._split_text(text)
+        reduction = 1 - len(chunks) / len(legacy_chunks)
+        print(f"{translator.name:>22} {translator._chunk_token_budget():>16} {len(chunks):>8} "
+              f"{max(estimate_tokens(chunk) for chunk in chunks):>14} {reduction:>8.0%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+基准测试脚本，测量pdfminer和pdfplumber按页并行提取随工作进程数的扩展性
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+# 添加项目根目录到路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.append(project_root)
+
+from reportlab.pdfgen import canvas
+from reportlab.lib.pagesizes import letter
+
+from src.utils.pdf_processor import PDFProcessor
+
+SAMPLE_PARAGRAPH = (
+    "Artificial intelligence is intelligence demonstrated by machines, as opposed to human "
+    "or animal intelligence. The field draws heavily from computer science and mathematics. "
+    "Major applications include natural language processing, machine learning and robotics."
+)
+
+def create_synthetic_pdf(path, page_count, lines_per_page=45):
+    """
+    生成一个每页都布满文本的测试PDF
+
+    Args:
+        path (str): 输出PDF路径
+        page_count (int): 页数
+        lines_per_page (int): 每页文本行数
+    """
+    c = canvas.Canvas(path, pagesize=letter)
+    words = SAMPLE_PARAGRAPH.split()
+
+    for page in range(page_count):
+        y = letter[1] - 50
+        for line in range(lines_per_page):
+            offset = (page + line) % len(words)
+            c.drawString(40, y, " ".join((words[offset:] + words[:offset])[:14]))
+            y -= 15
+        c.showPage()
+
+    c.save()
+
+def worker_counts(max_workers):
+    """
+    生成 1, 2, 4, ... 直到 max_workers 的工作进程数序列
+
+    Args:
+        max_workers (int): 最大工作进程数
+
+    Returns:
+        list: 工作进程数列表
+    """
+    counts = []
+    workers = 1
+    while workers < max_workers:
+        counts.append(workers)
+        workers *= 2
+    counts.append(max_workers)
+    return counts
+
+def run_benchmark(pdf_path, methods, max_workers, repeat):
+    """
+    对每种提取方法和工作进程数计时并打印结果
+
+    Args:
+        pdf_path (str): PDF文件路径
+        methods (list): 要测试的提取方法
+        max_workers (int): 最大工作进程数
+        repeat (int): 每组配置的重复次数（取最小值）
+    """
+    page_count = PDFProcessor(pdf_path)._count_pages()
+    print(f"PDF: {pdf_path} ({page_count} 页), CPU核心数: {os.cpu_count()}")
+
+    for method in methods:
+        print(f"\n{'='*20} {method} {'='*20}")
+        print(f"{'进程数':>8} {'耗时(秒)':>10} {'页/秒':>10} {'加速比':>8}")
+
+        baseline = None
+        for workers in worker_counts(max_workers):
+            processor = PDFProcessor(pdf_path, max_workers=workers, use_cache=False)
+            durations = []
+            for _ in range(repeat):
+                start_time = time.perf_counter()
+                processor.extract_text(method)
+                durations.append(time.perf_counter() - start_time)
+
+            duration = min(durations)
+            baseline = baseline or duration
+            print(f"{workers:>8} {duration:>10.2f} {page_count / duration:>10.1f} {baseline / duration:>8.2f}")
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="按页并行文本提取基准测试")
+    parser.add_argument("--pdf", help="要测试的PDF文件 (默认生成合成PDF)")
+    parser.add_argument("--pages", type=int, default=200, help="合成PDF的页数")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1, help="最大工作进程数")
+    parser.add_argument("--repeat", type=int, default=1, help="每组配置的重复次数")
+    parser.add_argument("--methods", nargs="+",
+                        default=[PDFProcessor.EXTRACT_METHOD_PDFMINER, PDFProcessor.EXTRACT_METHOD_PDFPLUMBER],
+                        choices=[PDFProcessor.EXTRACT_METHOD_PDFMINER, PDFProcessor.EXTRACT_METHOD_PDFPLUMBER],
+                        help="要测试的提取方法")
+    args = parser.parse_args()
+
+    if args.pdf:
+        run_benchmark(args.pdf, args.methods, args.max_workers, args.repeat)
+        return
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pdf_path = os.path.join(temp_dir, "synthetic.pdf")
+        print(f"正在生成 {args.pages} 页合成PDF...")
+        create_synthetic_pdf(pdf_path, args.pages)
+        run_benchmark(pdf_path, args.methods, args.max_workers, args.repeat)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+基准测试脚本，使用本地HTTPS模拟服务比较裸requests.post与连接池会话的单次请求延迟
+"""
+
+import os
+import sys
+import ssl
+import json
+import time
+import argparse
+import datetime
+import tempfile
+import threading
+import statistics
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 添加项目根目录到路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.append(project_root)
+
+import requests
+
+from src.utils.http_pool import HTTPSessionPool
+
+class ChatCompletionHandler(BaseHTTPRequestHandler):
+    """
+    模拟 /v1/chat/completions 接口，立即返回固定的翻译结果
+    """
+    # 使用HTTP/1.1以支持keep-alive
+    protocol_version = "HTTP/1.1"
+    # 头部和正文分两次写出，避免Nagle算法与延迟确认叠加带来的约40ms延迟
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        """处理POST请求"""
+        length = int(self.headers.get('Content-Length', 0))
+        self.rfile.read(length)
+
+        body = json.dumps({
+            "choices": [{"message": {"role": "assistant", "content": "翻译：测试"}}]
+        }).encode('utf-8')
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """关闭访问日志"""
+        pass
+
+def create_self_signed_cert(temp_dir):
+    """
+    为localhost生成自签名证书
+
+    Args:
+        temp_dir (str): 证书输出目录
+
+    Returns:
+        tuple: (证书路径, 私钥路径)
+    """
+    # cryptography 是 pdfminer.six 的依赖
+    from cryptography import x509
+    from cryptography.x509.oid import NameOID
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    import ipaddress
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(x509.SubjectAlternativeName([
+            x509.DNSName("localhost"),
+            x509.IPAddress(ipaddress.ip_address("127.0.0.1")),
+        ]), critical=False)
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .sign(key, hashes.SHA256())
+    )
+
+    cert_path = os.path.join(temp_dir, "cert.pem")
+    key_path = os.path.join(temp_dir, "key.pem")
+    with open(cert_path, "wb") as f:
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, "wb") as f:
+        f.write(key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.TraditionalOpenSSL,
+            serialization.NoEncryption()
+        ))
+
+    return cert_path, key_path
+
+def start_server(cert_path, key_path):
+    """
+    在后台线程中启动本地HTTPS服务
+
+    Args:
+        cert_path (str): 证书路径
+        key_path (str): 私钥路径
+
+    Returns:
+        tuple: (服务器对象, 接口URL)
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ChatCompletionHandler)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert_path, key_path)
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"https://localhost:{server.server_address[1]}/v1/chat/completions"
+
+def measure(post, url, cert_path, requests_count):
+    """
+    依次发送请求并记录每次的延迟
+
+    Args:
+        post (callable): 发送POST请求的函数
+        url (str): 接口URL
+        cert_path (str): 用于校验的证书路径
+        requests_count (int): 请求次数
+
+    Returns:
+        list: 每次请求的延迟（毫秒）
+    """
+    payload = {"model": "deepseek-chat", "messages": [{"role": "user", "content": "hello"}]}
+    latencies = []
+    for _ in range(requests_count):
+        start_time = time.perf_counter()
+        response = post(url, json=payload, timeout=30, verify=cert_path)
+        response.json()
+        latencies.append((time.perf_counter() - start_time) * 1000)
+    return latencies
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="HTTP连接池基准测试")
+    parser.add_argument("--requests", type=int, default=200, help="每种方式的请求次数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cert_path, key_path = create_self_signed_cert(temp_dir)
+        server, url = start_server(cert_path, key_path)
+        print(f"本地HTTPS模拟服务: {url}")
+
+        pool = HTTPSessionPool()
+        results = {
+            "requests.post": measure(requests.post, url, cert_path, args.requests),
+            "连接池会话": measure(pool.get_session(url).post, url, cert_path, args.requests),
+        }
+        server.shutdown()
+
+    print(f"\n{'方式':>14} {'平均(ms)':>10} {'中位数(ms)':>12} {'p95(ms)':>10}")
+    for name, latencies in results.items():
+        latencies = sorted(latencies)
+        p95 = latencies[int(len(latencies) * 0.95) - 1]
+        print(f"{name:>14} {statistics.mean(latencies):>10.2f} {statistics.median(latencies):>12.2f} {p95:>10.2f}")
+
+    saved = statistics.mean(results["requests.post"]) - statistics.mean(results["连接池会话"])
+    print(f"\n连接池平均每次请求节省 {saved:.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+基准测试脚本，比较大型扫描PDF在普通缓冲读取和内存映射两种方式下的内存占用(RSS)和首页提取时间
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+# 添加项目根目录到路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.append(project_root)
+
+import numpy as np
+from PIL import Image
+from reportlab.pdfgen import canvas
+from reportlab.lib.pagesizes import letter
+
+from src.utils.pdf_processor import PDFProcessor
+
+def create_synthetic_scan(path, size_mb, page_width=2550, page_height=3300):
+    """
+    生成一个由随机噪声图片组成的“扫描版”PDF，每页附带一行不可见文本层
+
+    Args:
+        path (str): 输出PDF路径
+        size_mb (int): 目标文件大小（MB）
+        page_width (int): 每页图片宽度（像素）
+        page_height (int): 每页图片高度（像素）
+    """
+    c = canvas.Canvas(path, pagesize=letter)
+    rng = np.random.default_rng(0)
+    target_bytes = size_mb * 1024 * 1024
+    written_bytes = 0
+    page = 0
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        while written_bytes < target_bytes:
+            # 随机噪声几乎无法压缩，每页图片内容不同以避免被合并
+            noise = rng.integers(0, 256, (page_height, page_width), dtype=np.uint8)
+            image_path = os.path.join(temp_dir, f"page_{page}.jpg")
+            Image.fromarray(noise).save(image_path, quality=95)
+            written_bytes += os.path.getsize(image_path)
+
+            c.drawImage(image_path, 0, 0, width=letter[0], height=letter[1])
+            text = c.beginText(40, letter[1] - 50)
+            text.setTextRenderMode(3)  # 不可见文本，模拟OCR文本层
+            text.textLine(f"Scanned page {page + 1} of a large synthetic document.")
+            c.drawText(text)
+            c.showPage()
+
+            os.remove(image_path)
+            page += 1
+            if page % 10 == 0:
+                print(f"  已生成 {page} 页 ({written_bytes / 1024 / 1024:.0f} MB)")
+
+        c.save()
+
+def peak_rss_mb():
+    """
+    获取当前进程的峰值常驻内存
+
+    Returns:
+        float: 峰值RSS（MB），无法获取时返回None
+    """
+    # Linux的ru_maxrss会继承自父进程，优先读取本进程的VmHWM
+    if os.path.exists('/proc/self/status'):
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+
+    try:
+        import resource
+    except ImportError:
+        # Windows没有resource模块
+        return None
+
+    # macOS以字节为单位
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 / 1024
+
+def run_child(pdf_path, use_mmap):
+    """
+    在子进程中测量首页提取时间和峰值内存，并以JSON格式输出
+
+    Args:
+        pdf_path (str): PDF文件路径
+        use_mmap (bool): 是否使用内存映射，否则按原来的方式把路径直接交给PdfReader
+    """
+    from PyPDF2 import PdfReader
+
+    baseline_rss = peak_rss_mb()
+    start_time = time.perf_counter()
+
+    if use_mmap:
+        PDFProcessor.MMAP_THRESHOLD_BYTES = 0
+        processor = PDFProcessor(pdf_path, use_cache=False, page_timeout=0)
+        first_page_text = processor._extract_pages_with_pypdf2([0])[0].text
+    else:
+        # PdfReader收到路径时会把整个文件读入内存
+        first_page_text = PdfReader(pdf_path).pages[0].extract_text()
+
+    first_page_time = time.perf_counter() - start_time
+
+    print(json.dumps({
+        'first_page_seconds': first_page_time,
+        'peak_rss_mb': peak_rss_mb(),
+        'baseline_rss_mb': baseline_rss,
+        'first_page_chars': len(first_page_text),
+    }))
+
+def run_benchmark(pdf_path):
+    """
+    分别以缓冲读取和内存映射方式在独立子进程中运行测量并打印结果
+
+    Args:
+        pdf_path (str): PDF文件路径
+    """
+    size_mb = os.path.getsize(pdf_path) / 1024 / 1024
+    print(f"PDF: {pdf_path} ({size_mb:.0f} MB)")
+    print(f"{'方式':>10} {'首页耗时(秒)':>14} {'峰值RSS(MB)':>14} {'提取前RSS(MB)':>16}")
+
+    for mode in ['buffered', 'mmap']:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child', mode, '--pdf', pdf_path],
+            capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+
+        peak = result['peak_rss_mb']
+        baseline = result['baseline_rss_mb']
+        print(f"{mode:>10} {result['first_page_seconds']:>14.3f} "
+              f"{peak if peak is None else round(peak):>14} {baseline if baseline is None else round(baseline):>16}")
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="大型PDF内存映射基准测试")
+    parser.add_argument("--pdf", help="要测试的PDF文件 (默认生成合成扫描PDF)")
+    parser.add_argument("--size-mb", type=int, default=500, help="合成扫描PDF的目标大小（MB）")
+    parser.add_argument("--child", choices=['buffered', 'mmap'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.pdf, args.child == 'mmap')
+        return
+
+    if args.pdf:
+        run_benchmark(args.pdf)
+        return
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pdf_path = os.path.join(temp_dir, "synthetic_scan.pdf")
+        print(f"正在生成约 {args.size_mb} MB 的合成扫描PDF...")
+        create_synthetic_scan(pdf_path, args.size_mb)
+        run_benchmark(pdf_path)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import math
+
+from .text_utils import split_sentences
+
+# 数学公式的标记：运算符、希腊字母、LaTeX命令、小数和百分数
+_MATH_PATTERN = re.compile(r'[=<>±×÷∑∫√≈≠≤≥∞∂∆∇πσμλθ^]|\\[a-zA-Z]+|\$|\b\d+\.\d+\b|\b\d+%')
+# 表格行：用制表符、竖线或多个空格分隔的多个单元格
+_TABLE_PATTERN = re.compile(r'\t|\||\S {3,}\S')
+_WORD_PATTERN = re.compile(r"[A-Za-z][A-Za-z'-]*")
+
+class ChunkRouter:
+    """
+    Classifies text chunks as simple or dense, so that simple narrative
+    chunks go to a fast model and dense ones to a reasoning model.
+
+    A chunk's density score (0 to 1) combines its mean sentence length,
+    its share of long words (a proxy for rare, technical vocabulary) and
+    its math or table markers. In each document, the highest-scoring chunks
+    are sent to the reasoning model, up to the configured share of chunks
+    and only if their score reaches the minimum.
+    """
+
+    def __init__(self, reasoner_share=None, min_score=None):
+        """
+        Initialize ChunkRouter.
+
+        Args:
+            reasoner_share (float): Maximum share of a document's chunks sent to the
+                                    reasoning model (defaults to ROUTER_REASONER_SHARE or 0.3)
+            min_score (float): Minimum density score for the reasoning model
+                               (defaults to ROUTER_MIN_SCORE or 0.4)
+        """
+        self.reasoner_share = reasoner_share if reasoner_share is not None else \
+            float(os.getenv('ROUTER_REASONER_SHARE', 0.3))
+        self.min_score = min_score if min_score is not None else float(os.getenv('ROUTER_MIN_SCORE', 0.4))
+
+    @staticmethod
+    def features(chunk):
+        """
+        Measure the features used to score a chunk.
+
+        Args:
+            chunk (str): Text chunk
+
+        Returns:
+            dict: mean_sentence_words, rare_word_ratio, math_ratio and table_ratio
+        """
+        words = _WORD_PATTERN.findall(chunk)
+        sentences = [sentence for paragraph in chunk.split("\n\n") for sentence in split_sentences(paragraph)]
+        lines = [line for line in chunk.splitlines() if line.strip()]
+
+        return {
+            'mean_sentence_words': len(words) / len(sentences) if sentences else 0.0,
+            'rare_word_ratio': sum(1 for word in words if len(word) >= 10) / len(words) if words else 0.0,
+            'math_ratio': len(_MATH_PATTERN.findall(chunk)) / max(1, len(words)),
+            'table_ratio': sum(1 for line in lines if _TABLE_PATTERN.search(line)) / len(lines) if lines else 0.0,
+        }
+
+    @staticmethod
+    def score(features):
+        """
+        Combine a chunk's features into a density score.
+
+        Args:
+            features (dict): Result of features()
+
+        Returns:
+            float: Score between 0 (plain narrative) and 1 (dense)
+        """
+        # 每项特征按经验范围归一化到0到1：句子15词以下为简单，40词以上为极长
+        sentence = min(1.0, max(0.0, (features['mean_sentence_words'] - 15) / 25))
+        rare = min(1.0, features['rare_word_ratio'] / 0.2)
+        markers = max(min(1.0, features['math_ratio'] / 0.05), min(1.0, features['table_ratio'] / 0.3))
+        return 0.35 * sentence + 0.35 * rare + 0.3 * markers
+
+    def plan(self, chunks):
+        """
+        Decide which chunks of a document go to the reasoning model.
+
+        Args:
+            chunks (list): Text chunks of one document
+
+        Returns:
+            list: One dict per chunk with dense (bool), score and the features
+        """
+        decisions = []
+        for chunk in chunks:
+            features = self.features(chunk)
+            decisions.append(dict(features, score=self.score(features), dense=False))
+
+        # 向上取整，只有一块的文档在足够复杂时也能使用推理模型
+        quota = math.ceil(self.reasoner_share * len(chunks))
+        ranked = sorted(range(len(chunks)), key=lambda i: decisions[i]['score'], reverse=True)
+        for i in ranked[:quota]:
+            if decisions[i]['score'] >= self.min_score:
+                decisions[i]['dense'] = True
+        return decisions
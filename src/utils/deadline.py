@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import threading
+
+from .text_utils import estimate_tokens
+
+class DeadlineSchedule:
+    """
+    Time budget for translating one document.
+
+    Each chunk is assessed right before it is sent: the tokens of the chunks
+    that are not finished yet are divided by the throughput observed so far
+    (finished tokens per second of elapsed time, so it already reflects the
+    concurrency), and the estimate is compared with the time left. Until the
+    first chunk finishes, a configured per-request throughput is assumed.
+
+    The translator decides how to degrade a chunk that is at risk; every
+    degradation is recorded and reported per chunk.
+    """
+
+    # 评估结果
+    ON_TRACK = 'on_track'
+    AT_RISK = 'at_risk'
+    EXPIRED = 'expired'
+
+    # 降级方式
+    FAST_MODEL = 'fast_model'
+    EXTRA_PROVIDER = 'extra_provider'
+    PARTIAL = 'partial'
+
+    def __init__(self, seconds, chunks, tokens_per_second=None, safety_factor=None):
+        """
+        Initialize DeadlineSchedule.
+
+        Args:
+            seconds (float): Time budget from now
+            chunks (list): Text chunks of the document
+            tokens_per_second (float): Assumed source tokens per second of one request before any
+                                       chunk has finished (defaults to DEADLINE_TOKENS_PER_SECOND or 40)
+            safety_factor (float): Multiplier applied to the estimate before comparing it with the
+                                   time left (defaults to DEADLINE_SAFETY_FACTOR or 1.2)
+        """
+        self.seconds = seconds
+        self.tokens_per_second = tokens_per_second if tokens_per_second is not None else \
+            float(os.getenv('DEADLINE_TOKENS_PER_SECOND', 40))
+        self.safety_factor = safety_factor if safety_factor is not None else \
+            float(os.getenv('DEADLINE_SAFETY_FACTOR', 1.2))
+        self.start = time.monotonic()
+
+        self._tokens = [estimate_tokens(chunk) for chunk in chunks]
+        self._pending = set(range(len(chunks)))
+        self._finished_tokens = 0
+        self._degraded = {}
+        self._lock = threading.Lock()
+
+    def elapsed(self):
+        """
+        Get the time since the schedule was created.
+
+        Returns:
+            float: Seconds
+        """
+        return time.monotonic() - self.start
+
+    def remaining(self):
+        """
+        Get the time left before the deadline.
+
+        Returns:
+            float: Seconds, negative once the deadline has passed
+        """
+        return self.seconds - self.elapsed()
+
+    def estimate(self, concurrency):
+        """
+        Estimate the time needed for the chunks that are not finished yet.
+
+        Args:
+            concurrency (int): Concurrent requests, used only before any chunk has finished
+
+        Returns:
+            float: Seconds
+        """
+        with self._lock:
+            pending_tokens = sum(self._tokens[i] for i in self._pending)
+            finished_tokens = self._finished_tokens
+        elapsed = self.elapsed()
+
+        if finished_tokens and elapsed > 0:
+            return pending_tokens / (finished_tokens / elapsed)
+        return pending_tokens / (self.tokens_per_second * max(1, concurrency))
+
+    def assess(self, concurrency):
+        """
+        Decide whether the remaining work still fits in the budget.
+
+        Args:
+            concurrency (int): Concurrent requests of the translator
+
+        Returns:
+            str: ON_TRACK, AT_RISK, or EXPIRED once the deadline has passed
+        """
+        remaining = self.remaining()
+        if remaining <= 0:
+            return self.EXPIRED
+        if self.estimate(concurrency) * self.safety_factor > remaining:
+            return self.AT_RISK
+        return self.ON_TRACK
+
+    def finish(self, index):
+        """
+        Record that a chunk has been processed.
+
+        Args:
+            index (int): Chunk index
+        """
+        with self._lock:
+            if index in self._pending:
+                self._pending.discard(index)
+                self._finished_tokens += self._tokens[index]
+
+    def degrade(self, index, action, model=None):
+        """
+        Record a degradation of a chunk.
+
+        Args:
+            index (int): Chunk index
+            action (str): FAST_MODEL, EXTRA_PROVIDER or PARTIAL
+            model (str): Name of the model that processed the chunk instead, if any
+        """
+        with self._lock:
+            entry = self._degraded.setdefault(index, {'chunk': index + 1, 'actions': [], 'model': None})
+            entry['actions'].append(action)
+            if model is not None:
+                entry['model'] = model
+            entry['elapsed'] = self.elapsed()
+
+    def report(self):
+        """
+        Get the outcome of the schedule.
+
+        Returns:
+            dict: deadline, elapsed, met, chunks, degraded_chunks, partial_chunks and
+                  degraded (one entry per degraded chunk, in chunk order)
+        """
+        with self._lock:
+            degraded = [dict(entry, actions=list(entry['actions'])) for _, entry in sorted(self._degraded.items())]
+        elapsed = self.elapsed()
+        return {
+            'deadline': self.seconds,
+            'elapsed': elapsed,
+            'met': elapsed <= self.seconds,
+            'chunks': len(self._tokens),
+            'degraded_chunks': len(degraded),
+            'partial_chunks': sum(1 for entry in degraded if self.PARTIAL in entry['actions']),
+            'degraded': degraded,
+        }
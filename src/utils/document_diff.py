@@ -0,0 +1,452 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import json
+import time
+import uuid
+import difflib
+import hashlib
+import threading
+import unicodedata
+
+# 弯引号和各种破折号统一为ASCII字符
+_PUNCTUATION = str.maketrans({'\u2018': "'", '\u2019': "'", '\u201c': '"', '\u201d': '"',
+                              '\u2013': '-', '\u2014': '-', '\u00ad': ''})
+
+def split_paragraphs(text):
+    """
+    Split extracted text into paragraphs at blank lines.
+
+    Args:
+        text (str): Extracted text
+
+    Returns:
+        list: Non-empty paragraphs, stripped
+    """
+    return [paragraph.strip() for paragraph in re.split(r'\n\s*\n', text or '') if paragraph.strip()]
+
+def normalize_paragraph(paragraph):
+    """
+    Normalize a paragraph so that differences caused only by text extraction
+    (line breaks, hyphenation at line ends, repeated spaces, ligatures, quote
+    styles and letter case) disappear.
+
+    Args:
+        paragraph (str): Paragraph text
+
+    Returns:
+        str: Normalized text
+    """
+    paragraph = unicodedata.normalize('NFKC', paragraph).translate(_PUNCTUATION)
+    paragraph = re.sub(r'(\w)-\s*\n\s*(\w)', r'\1\2', paragraph)
+    return re.sub(r'\s+', ' ', paragraph).strip().lower()
+
+def pair_paragraphs(paragraphs, translation):
+    """
+    Split the translation of consecutive paragraphs into per-paragraph units.
+
+    Args:
+        paragraphs (list): Source paragraphs, in order
+        translation (str): Their translation
+
+    Returns:
+        list: One unit per paragraph if the translation has as many paragraphs as the source,
+              otherwise a single unit covering all of them. A unit is a dict with
+              paragraphs (list) and translation (str).
+    """
+    translated = split_paragraphs(translation)
+    if len(translated) == len(paragraphs):
+        return [{'paragraphs': [paragraph], 'translation': text} for paragraph, text in zip(paragraphs, translated)]
+    return [{'paragraphs': list(paragraphs), 'translation': translation.strip()}]
+
+def chunk_units(text, chunks, translations):
+    """
+    Build the translated units of text that was translated chunk by chunk.
+
+    Each chunk's translation is paired with the chunk's own paragraphs, so a
+    translation whose paragraph count differs from its source only merges the
+    paragraphs of that chunk into one unit. Consecutive chunks holding pieces
+    of one long paragraph become a single unit for that paragraph.
+
+    Args:
+        text (str): Extracted text that was split into chunks
+        chunks (list): Chunks, in order
+        translations (list): Translation of each chunk, optionally starting with the "翻译：" heading
+
+    Returns:
+        list: Translated units, see pair_paragraphs
+    """
+    paragraphs = split_paragraphs(text)
+    translations = [re.sub(r'^\s*翻译：', '', translation or '').strip() for translation in translations]
+    units = []
+    start = 0
+    pending = []
+    for chunk, translation in zip(chunks, translations):
+        pending.append((chunk, translation))
+        source = normalize_paragraph(" ".join(piece for piece, _ in pending))
+        covered = ""
+        end = start
+        while end < len(paragraphs) and len(covered) < len(source):
+            covered = (covered + " " + normalize_paragraph(paragraphs[end])).strip()
+            end += 1
+
+        if covered == source:
+            if len(pending) == 1:
+                units.extend(pair_paragraphs(paragraphs[start:end], translation))
+            else:
+                units.append({'paragraphs': paragraphs[start:end],
+                              'translation': "\n\n".join(piece for _, piece in pending)})
+            start = end
+            pending = []
+        elif end != start + 1 or not covered.startswith(source):
+            break
+
+    if start == len(paragraphs) and not pending:
+        return units
+    # 块与段落对不上时（例如文本在分块后被改动）退回整篇作为一个单元
+    return pair_paragraphs(paragraphs, "\n\n".join(translations)) if paragraphs else []
+
+def rebuild_vocabulary(previous, text, added=""):
+    """
+    Build the vocabulary of a revised document from the previous version's.
+
+    Entries of the previous vocabulary ("1. term：meaning - example") are kept
+    only if their term still appears in the new text, so terms of deleted
+    paragraphs are dropped. The entries of the vocabulary extracted from the
+    changed paragraphs follow, terms already listed are not repeated, and all
+    entries are renumbered.
+
+    Args:
+        previous (str): Vocabulary of the previous version
+        text (str): Extracted text of the new version
+        added (str): Vocabulary extracted from the changed paragraphs
+
+    Returns:
+        str: Vocabulary of the new version
+    """
+    normalized = normalize_paragraph(text)
+    entries = {}
+    for source, check in ((previous, True), (added, False)):
+        for term, lines in _vocabulary_entries(source):
+            key = normalize_paragraph(term)
+            if key in entries:
+                continue
+            if check and not re.search(r'(?<!\w)' + re.escape(key), normalized):
+                continue
+            entries[key] = lines
+
+    numbered = []
+    for number, lines in enumerate(entries.values(), 1):
+        numbered.append(re.sub(r'^\s*\d+\.\s*', f"{number}. ", lines[0]))
+        numbered.extend(lines[1:])
+    return "重点词汇解析：\n" + "\n".join(numbered) if numbered else ""
+
+def _vocabulary_entries(vocabulary):
+    """
+    Split a vocabulary into numbered entries.
+
+    Returns:
+        list: (term, lines) of each entry; lines before the first entry are skipped
+    """
+    entries = []
+    for line in (vocabulary or '').splitlines():
+        match = re.match(r'^\s*\d+\.\s*\[?([^：:\]]+?)\]?\s*[：:]', line)
+        if match:
+            entries.append((match.group(1), [line]))
+        elif entries and line.strip():
+            entries[-1][1].append(line)
+    return entries
+
+
+class DocumentDiff:
+    """
+    Alignment of a revised document with the translated units of its previous
+    version.
+
+    Paragraphs are matched in order by the hash of their normalized text, with
+    difflib's sequence matcher, so only differences introduced by text
+    extraction are ignored. Inside each replaced region, a new paragraph is
+    paired with the most similar old one by fuzzy matching: it counts as
+    changed if the similarity reaches the threshold, and as added otherwise.
+    Changed paragraphs are translated again; their unchanged sentences can
+    still come from the sentence-level translation memory.
+
+    A previous unit's translation is reused when all of its paragraphs are
+    matched to consecutive paragraphs of the new version. Everything else is
+    grouped into runs of consecutive paragraphs that need a translation.
+    """
+
+    def __init__(self, units, text, similarity=None):
+        """
+        Initialize DocumentDiff and align the documents.
+
+        Args:
+            units (list): Translated units of the previous version, see pair_paragraphs
+            text (str): Extracted text of the new version
+            similarity (float): Minimum similarity for pairing an edited paragraph with its previous
+                                version instead of counting it as added and the old one as removed
+                                (defaults to DOCUMENT_DIFF_SIMILARITY or 0.5)
+        """
+        self.similarity = similarity or float(os.getenv('DOCUMENT_DIFF_SIMILARITY', 0.5))
+        self.units = units or []
+        self.paragraphs = split_paragraphs(text)
+
+        old = [normalize_paragraph(paragraph) for unit in self.units for paragraph in unit['paragraphs']]
+        new = [normalize_paragraph(paragraph) for paragraph in self.paragraphs]
+        self.status = ['added'] * len(new)
+        self.matches = self._align(old, new)
+        self.removed = len(old) - len(self.matches) - self.status.count('changed')
+
+        # 起始段落序号到 (段落数, 复用的翻译)
+        self.reused = {}
+        start = 0
+        for unit in self.units:
+            count = len(unit['paragraphs'])
+            targets = [self.matches[i] for i in range(start, start + count) if i in self.matches]
+            if len(targets) == count and targets == list(range(targets[0], targets[0] + count)):
+                self.reused[targets[0]] = (count, unit['translation'])
+            start += count
+
+        self.runs = []
+        i = 0
+        while i < len(self.paragraphs):
+            if i in self.reused:
+                i += self.reused[i][0]
+                continue
+            end = i + 1
+            while end < len(self.paragraphs) and end not in self.reused:
+                end += 1
+            self.runs.append((i, end))
+            i = end
+
+    def _align(self, old, new):
+        """
+        Match the paragraphs of the two versions.
+
+        Args:
+            old (list): Normalized paragraphs of the previous version
+            new (list): Normalized paragraphs of the new version
+
+        Returns:
+            dict: Index in the previous version to index in the new version
+        """
+        matches = {}
+        old_keys = [hashlib.sha1(paragraph.encode('utf-8')).hexdigest() for paragraph in old]
+        new_keys = [hashlib.sha1(paragraph.encode('utf-8')).hexdigest() for paragraph in new]
+
+        matcher = difflib.SequenceMatcher(None, old_keys, new_keys, autojunk=False)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == 'equal':
+                for offset in range(i2 - i1):
+                    matches[i1 + offset] = j1 + offset
+                    self.status[j1 + offset] = 'unchanged'
+            elif tag == 'replace':
+                candidates = list(range(i1, i2))
+                for j in range(j1, j2):
+                    best, best_score = None, 0.0
+                    for i in candidates:
+                        pair = difflib.SequenceMatcher(None, old[i], new[j], autojunk=False)
+                        if pair.real_quick_ratio() <= best_score or pair.quick_ratio() <= best_score:
+                            continue
+                        score = pair.ratio()
+                        if score > best_score:
+                            best, best_score = i, score
+
+                    if best_score >= self.similarity:
+                        candidates.remove(best)
+                        self.status[j] = 'changed'
+        return matches
+
+    def changed_runs(self):
+        """
+        Get the paragraphs that need a translation.
+
+        Returns:
+            list: Runs of consecutive paragraphs, each a list of paragraph texts
+        """
+        return [self.paragraphs[start:end] for start, end in self.runs]
+
+    def splice(self, run_chunks, run_translations):
+        """
+        Combine the reused translations with the translations of the changed runs.
+
+        Args:
+            run_chunks (list): Chunks each run returned by changed_runs was split into, in order
+            run_translations (list): Translation of each of those chunks
+
+        Returns:
+            tuple: (translation of the new version, translated units of the new version)
+        """
+        pieces = []
+        units = []
+        runs = dict(zip((start for start, _ in self.runs), zip(self.runs, run_chunks, run_translations)))
+
+        i = 0
+        while i < len(self.paragraphs):
+            if i in self.reused:
+                count, translation = self.reused[i]
+                pieces.append(translation)
+                units.append({'paragraphs': self.paragraphs[i:i + count], 'translation': translation})
+                i += count
+            else:
+                (start, end), chunks, translations = runs[i]
+                pieces.append("\n\n".join(translation.strip() for translation in translations))
+                units.extend(chunk_units("\n\n".join(self.paragraphs[start:end]), chunks, translations))
+                i = end
+        return "\n\n".join(pieces), units
+
+    def report(self):
+        """
+        Get the alignment and reuse statistics.
+
+        Returns:
+            dict: paragraph counts by status (unchanged, changed, added, removed),
+                  reused and translated paragraphs, reused and total characters, and reused_percent
+        """
+        reused = [i + offset for i, (count, _) in self.reused.items() for offset in range(count)]
+        total_chars = sum(len(paragraph) for paragraph in self.paragraphs)
+        reused_chars = sum(len(self.paragraphs[i]) for i in reused)
+        return {
+            'paragraphs': len(self.paragraphs),
+            'unchanged': self.status.count('unchanged'),
+            'changed': self.status.count('changed'),
+            'added': self.status.count('added'),
+            'removed': self.removed,
+            'reused_paragraphs': len(reused),
+            'translated_paragraphs': len(self.paragraphs) - len(reused),
+            'reused_chars': reused_chars,
+            'total_chars': total_chars,
+            'reused_percent': 100.0 * reused_chars / total_chars if total_chars else 0.0,
+        }
+
+
+def new_document_id():
+    """
+    Create the identifier of a newly uploaded document.
+
+    Returns:
+        str: Random 32-digit hex id; the user gives it back when uploading a revised version
+    """
+    return uuid.uuid4().hex
+
+def is_document_id(value):
+    """
+    Check whether a value is an identifier created by new_document_id.
+
+    Args:
+        value (str): Value given by the user
+
+    Returns:
+        bool: Whether the value is a 32-digit hex id
+    """
+    return isinstance(value, str) and re.fullmatch(r'[0-9a-f]{32}', value) is not None
+
+
+class DocumentStore:
+    """
+    Translated versions of documents, one JSON file per document and model,
+    so that a revised upload only needs its changed paragraphs translated.
+
+    Documents are identified by an id the user keeps (see new_document_id),
+    not by file name, so unrelated uploads never count as revisions of each other.
+    """
+
+    def __init__(self, directory=None):
+        """
+        Initialize DocumentStore.
+
+        Args:
+            directory (str): Directory of the version files
+                             (defaults to DOCUMENT_HISTORY_DIR or ~/.pdf_assistant/documents)
+        """
+        self.directory = directory or os.getenv('DOCUMENT_HISTORY_DIR') or os.path.join(
+            os.path.expanduser('~'), '.pdf_assistant', 'documents'
+        )
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _path(self, document, model, prompt_version):
+        """
+        Get the file that stores a document's latest version.
+
+        Args:
+            document (str): Document id, see new_document_id
+            model (str): Model identifier
+            prompt_version (int): Version of the prompt template
+
+        Returns:
+            str: File path
+        """
+        digest = hashlib.sha256()
+        for part in (document, model, str(prompt_version)):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return os.path.join(self.directory, f"{digest.hexdigest()[:32]}.json")
+
+    def load(self, document, model, prompt_version):
+        """
+        Load the latest translated version of a document.
+
+        Args:
+            document (str): Document id
+            model (str): Model identifier
+            prompt_version (int): Version of the prompt template
+
+        Returns:
+            dict: document, model, prompt_version, updated, units and vocabulary,
+                  or None if the document has not been translated with this model
+        """
+        path = self._path(document, model, prompt_version)
+        with self._lock:
+            if not os.path.exists(path):
+                return None
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                return None
+
+    def save(self, document, model, prompt_version, units, vocabulary=None):
+        """
+        Save the translated version of a document, replacing the previous one.
+
+        Args:
+            document (str): Document id
+            model (str): Model identifier
+            prompt_version (int): Version of the prompt template
+            units (list): Translated units, see pair_paragraphs
+            vocabulary (str): Vocabulary of the version
+        """
+        path = self._path(document, model, prompt_version)
+        record = {
+            'document': document,
+            'model': model,
+            'prompt_version': prompt_version,
+            'updated': time.time(),
+            'units': units,
+            'vocabulary': vocabulary,
+        }
+        with self._lock:
+            # 先写临时文件再替换，避免中断时留下不完整的记录
+            with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(record, f, ensure_ascii=False)
+            os.replace(path + '.tmp', path)
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+def get_default_document_store():
+    """
+    Get the process-wide document store, creating it on first use.
+
+    Returns:
+        DocumentStore: Shared document store
+    """
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = DocumentStore()
+        return _default_store
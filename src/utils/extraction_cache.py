@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import hashlib
+import sqlite3
+import threading
+
+class ExtractionCache:
+    """
+    Persistent cache of normalized page text, stored in a local SQLite database.
+
+    Entries are keyed by PDF content hash, page number, extraction method and
+    normalizer version, so re-processing an unchanged PDF skips extraction.
+    """
+
+    def __init__(self, db_path=None):
+        """
+        Initialize ExtractionCache.
+
+        Args:
+            db_path (str): Path to the SQLite database file
+                           (defaults to EXTRACTION_CACHE_PATH or ~/.pdf_assistant/extraction_cache.db)
+        """
+        self.db_path = db_path or os.getenv('EXTRACTION_CACHE_PATH') or os.path.join(
+            os.path.expanduser('~'), '.pdf_assistant', 'extraction_cache.db'
+        )
+
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir, exist_ok=True)
+
+        # Web和GUI会在多个线程中共享同一个缓存对象
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            """CREATE TABLE IF NOT EXISTS documents (
+                pdf_hash TEXT PRIMARY KEY,
+                page_count INTEGER NOT NULL
+            )"""
+        )
+        self._connection.execute(
+            """CREATE TABLE IF NOT EXISTS pages (
+                pdf_hash TEXT NOT NULL,
+                method TEXT NOT NULL,
+                normalizer_version INTEGER NOT NULL,
+                page_number INTEGER NOT NULL,
+                text TEXT NOT NULL,
+                source_method TEXT,
+                PRIMARY KEY (pdf_hash, method, normalizer_version, page_number)
+            )"""
+        )
+        self._connection.commit()
+
+    @staticmethod
+    def hash_file(path, block_size=1024 * 1024):
+        """
+        Compute the SHA-256 hash of a file's content.
+
+        Args:
+            path (str): Path to the file
+            block_size (int): Read size in bytes
+
+        Returns:
+            str: Hex digest of the file content
+        """
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(block_size), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def get_page_count(self, pdf_hash):
+        """
+        Get the stored page count of a PDF.
+
+        Args:
+            pdf_hash (str): PDF content hash
+
+        Returns:
+            int: Page count, or None if the PDF is unknown
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT page_count FROM documents WHERE pdf_hash = ?", (pdf_hash,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_page_count(self, pdf_hash, page_count):
+        """
+        Store the page count of a PDF.
+
+        Args:
+            pdf_hash (str): PDF content hash
+            page_count (int): Number of pages
+        """
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO documents (pdf_hash, page_count) VALUES (?, ?)",
+                (pdf_hash, page_count)
+            )
+            self._connection.commit()
+
+    def get_pages(self, pdf_hash, method, normalizer_version):
+        """
+        Get all cached pages of a PDF for one extraction method.
+
+        Args:
+            pdf_hash (str): PDF content hash
+            method (str): Extraction method
+            normalizer_version (int): Version of the text normalizer
+
+        Returns:
+            dict: Mapping of zero-based page number to a (text, source_method) tuple,
+                  where source_method is the method that actually produced the text
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT page_number, text, source_method FROM pages "
+                "WHERE pdf_hash = ? AND method = ? AND normalizer_version = ?",
+                (pdf_hash, method, normalizer_version)
+            ).fetchall()
+        return {
+            page_number: (text, source_method or method)
+            for page_number, text, source_method in rows
+        }
+
+    def put_pages(self, pdf_hash, method, normalizer_version, page_texts):
+        """
+        Store normalized page text.
+
+        Args:
+            pdf_hash (str): PDF content hash
+            method (str): Extraction method
+            normalizer_version (int): Version of the text normalizer
+            page_texts (dict): Mapping of zero-based page number to a
+                               (text, source_method) tuple
+        """
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO pages "
+                "(pdf_hash, method, normalizer_version, page_number, text, source_method) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(pdf_hash, method, normalizer_version, page_number, text, source_method)
+                 for page_number, (text, source_method) in page_texts.items()]
+            )
+            self._connection.commit()
+
+    def clear(self):
+        """
+        Remove all cached entries.
+        """
+        with self._lock:
+            self._connection.execute("DELETE FROM pages")
+            self._connection.execute("DELETE FROM documents")
+            self._connection.commit()
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+def get_default_cache():
+    """
+    Get the process-wide extraction cache, creating it on first use.
+
+    Returns:
+        ExtractionCache: Shared cache instance
+    """
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ExtractionCache()
+        return _default_cache
@@ -0,0 +1,245 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import asyncio
+import threading
+from collections import deque
+
+class LatencyTracker:
+    """
+    Rolling window of recent latencies for one provider and request kind.
+    """
+
+    def __init__(self, window=200, min_samples=20):
+        """
+        Initialize LatencyTracker.
+
+        Args:
+            window (int): Number of recent latencies kept
+            min_samples (int): Samples needed before a percentile is reported
+        """
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        """
+        Record one latency.
+
+        Args:
+            seconds (float): Latency in seconds
+        """
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, percent):
+        """
+        Get a percentile of the recent latencies.
+
+        Args:
+            percent (float): Percentile between 0 and 100
+
+        Returns:
+            float: Latency in seconds, or None if there are too few samples
+        """
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            samples = sorted(self._samples)
+        index = min(len(samples) - 1, int(len(samples) * percent / 100))
+        return samples[index]
+
+
+class Hedger:
+    """
+    Sends a duplicate request to an alternate provider when the primary one
+    is slower than its recent latency percentile, and keeps whichever
+    answers first.
+
+    A request that loses is recorded with the time it had taken when the
+    winner answered, a lower bound of its latency, so slow requests that get
+    hedged still raise the percentile instead of dropping out of it.
+
+    Extra requests are capped at a fraction of all hedgeable calls, so a
+    provider that is slow across the board cannot double the API cost.
+    """
+
+    def __init__(self, percentile=None, budget=None, min_delay=None, initial_delay=None):
+        """
+        Initialize Hedger.
+
+        Args:
+            percentile (float): Latency percentile after which a hedge is sent
+                                (defaults to HEDGE_PERCENTILE or 95)
+            budget (float): Maximum extra requests as a share of all calls
+                            (defaults to HEDGE_BUDGET or 0.1)
+            min_delay (float): Minimum seconds to wait before hedging
+                               (defaults to HEDGE_MIN_DELAY or 1)
+            initial_delay (float): Seconds to wait before enough latencies are known
+                                   (defaults to HEDGE_INITIAL_DELAY or 30)
+        """
+        self.percentile = percentile or float(os.getenv('HEDGE_PERCENTILE', 95))
+        self.budget = budget if budget is not None else float(os.getenv('HEDGE_BUDGET', 0.1))
+        self.min_delay = min_delay or float(os.getenv('HEDGE_MIN_DELAY', 1))
+        self.initial_delay = initial_delay or float(os.getenv('HEDGE_INITIAL_DELAY', 30))
+
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.budget_denied = 0
+        self.alternate_busy = 0
+        self._trackers = {}
+        self._lock = threading.Lock()
+
+    def _tracker(self, key):
+        """
+        Get the latency tracker of a provider and request kind.
+        """
+        with self._lock:
+            tracker = self._trackers.get(key)
+            if tracker is None:
+                tracker = LatencyTracker()
+                self._trackers[key] = tracker
+            return tracker
+
+    def hedge_delay(self, key):
+        """
+        Get how long to wait for a provider before sending a hedge.
+
+        Args:
+            key (str): Provider and request kind
+
+        Returns:
+            float: Seconds to wait
+        """
+        latency = self._tracker(key).percentile(self.percentile)
+        if latency is None:
+            return self.initial_delay
+        return max(self.min_delay, latency)
+
+    def _start_call(self):
+        """
+        Count a hedgeable call.
+        """
+        with self._lock:
+            self.calls += 1
+
+    def _take_budget(self):
+        """
+        Reserve one extra request if the budget allows it.
+
+        Returns:
+            bool: Whether a hedge may be sent
+        """
+        with self._lock:
+            if self.hedged + 1 > self.budget * self.calls:
+                self.budget_denied += 1
+                return False
+            self.hedged += 1
+            return True
+
+    def _finish_hedge(self, alternate_won):
+        """
+        Count the outcome of a hedged call.
+        """
+        with self._lock:
+            if alternate_won:
+                self.hedge_wins += 1
+
+    async def run(self, key, primary, alternate_key, alternate, discard=None, alternate_ready=None):
+        """
+        Await a request, hedging it with the alternate provider if it is slow.
+
+        Args:
+            key (str): Primary provider and request kind
+            primary (callable): Returns a coroutine sending the request to the primary provider
+            alternate_key (str): Alternate provider and request kind
+            alternate (callable): Returns a coroutine sending the request to the alternate provider
+            discard (callable): Returns a coroutine releasing a losing result that also completed
+            alternate_ready (callable): Returns whether the alternate provider can take a request
+                                        now; no hedge is sent while it returns False
+
+        Returns:
+            The result of whichever request succeeded first
+        """
+        self._start_call()
+        start = time.monotonic()
+        primary_task = asyncio.ensure_future(primary())
+        tasks = {primary_task: (key, start)}
+
+        try:
+            delay = self.hedge_delay(key)
+            done, _ = await asyncio.wait({primary_task}, timeout=delay)
+            if not done and alternate_ready is not None and not alternate_ready():
+                with self._lock:
+                    self.alternate_busy += 1
+            elif not done and self._take_budget():
+                print(f"[DEBUG] 请求超过 {delay:.1f} 秒未返回，向备用服务商发送对冲请求")
+                tasks[asyncio.ensure_future(alternate())] = (alternate_key, time.monotonic())
+
+            pending = set(tasks)
+            winner = None
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if winner is None and not task.cancelled() and task.exception() is None:
+                        winner = task
+                    elif task is not winner and discard is not None and not task.cancelled() \
+                            and task.exception() is None:
+                        await discard(task.result())
+
+            if winner is None:
+                # 所有请求都失败时，抛出主请求的错误
+                return primary_task.result()
+
+            now = time.monotonic()
+            for task, (task_key, task_start) in tasks.items():
+                # 未完成的请求记录到目前为止的耗时，作为其延迟的下限；失败的请求不记录
+                if task is winner or not task.done() or (not task.cancelled() and task.exception() is None):
+                    self._tracker(task_key).record(now - task_start)
+            if len(tasks) > 1:
+                self._finish_hedge(winner is not primary_task)
+            return winner.result()
+        finally:
+            # 取消仍未完成的请求
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def get_stats(self):
+        """
+        Get hedging statistics.
+
+        Returns:
+            dict: calls, hedged, hedge_wins, budget_denied, alternate_busy (hedges skipped because
+                  the alternate provider was at its concurrency limit), extra_call_rate and hedge_win_rate
+        """
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'hedged': self.hedged,
+                'hedge_wins': self.hedge_wins,
+                'budget_denied': self.budget_denied,
+                'alternate_busy': self.alternate_busy,
+                'extra_call_rate': self.hedged / self.calls if self.calls else 0.0,
+                'hedge_win_rate': self.hedge_wins / self.hedged if self.hedged else 0.0,
+            }
+
+
+_default_hedger = None
+_default_hedger_lock = threading.Lock()
+
+def get_default_hedger():
+    """
+    Get the process-wide hedger, creating it on first use.
+
+    Returns:
+        Hedger: Shared hedger
+    """
+    global _default_hedger
+    with _default_hedger_lock:
+        if _default_hedger is None:
+            _default_hedger = Hedger()
+        return _default_hedger
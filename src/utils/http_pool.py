@@ -0,0 +1,248 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import socket
+import asyncio
+import threading
+from urllib.parse import urlsplit
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+
+class KeepAliveAdapter(HTTPAdapter):
+    """
+    HTTP adapter that enables TCP keep-alive on pooled connections, so idle
+    connections to the API survive between chunks instead of being dropped by NAT.
+    """
+
+    def __init__(self, keep_alive=True, **kwargs):
+        """
+        Initialize KeepAliveAdapter.
+
+        Args:
+            keep_alive (bool): Whether to enable TCP keep-alive on new connections
+            **kwargs: Arguments passed to HTTPAdapter (pool_connections, pool_maxsize, ...)
+        """
+        self.keep_alive = keep_alive
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        """
+        Create the pool manager, adding keep-alive socket options.
+        """
+        if self.keep_alive:
+            socket_options = [(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1),
+                              (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+            kwargs['socket_options'] = socket_options
+        super().init_poolmanager(*args, **kwargs)
+
+
+class HTTPSessionPool:
+    """
+    Registry of connection-pooled HTTP sessions, one pool per provider base URL.
+
+    Each base URL gets a single thread-safe adapter holding its connection pool.
+    Every thread gets its own Session mounted on that shared adapter, so cookies
+    and other session state are never shared between threads while TCP/TLS
+    connections are reused by all of them.
+    """
+
+    def __init__(self, pool_size=None, keep_alive=None):
+        """
+        Initialize HTTPSessionPool.
+
+        Args:
+            pool_size (int): Maximum pooled connections per base URL
+                             (defaults to HTTP_POOL_SIZE or 10)
+            keep_alive (bool): Whether to keep connections alive between requests
+                               (defaults to HTTP_KEEP_ALIVE or True)
+        """
+        if pool_size is None:
+            pool_size = int(os.getenv('HTTP_POOL_SIZE', 10))
+        if keep_alive is None:
+            keep_alive = os.getenv('HTTP_KEEP_ALIVE', 'True').lower() in ('true', '1', 't')
+
+        self.pool_size = pool_size
+        self.keep_alive = keep_alive
+
+        self._lock = threading.Lock()
+        self._adapters = {}
+        self._local = threading.local()
+        # aiohttp会话绑定到创建它的事件循环，按 (事件循环, 基础URL) 保存
+        self._async_sessions = {}
+
+    @staticmethod
+    def base_url(url):
+        """
+        Get the scheme and host part of a URL, which identifies a provider.
+
+        Args:
+            url (str): Request URL
+
+        Returns:
+            str: Base URL, e.g. "https://api.deepseek.com"
+        """
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+    def _get_adapter(self, base_url):
+        """
+        Get the shared adapter of a base URL, creating it on first use.
+
+        Args:
+            base_url (str): Provider base URL
+
+        Returns:
+            KeepAliveAdapter: Adapter holding the provider's connection pool
+        """
+        with self._lock:
+            adapter = self._adapters.get(base_url)
+            if adapter is None:
+                adapter = KeepAliveAdapter(
+                    keep_alive=self.keep_alive,
+                    pool_connections=1,
+                    pool_maxsize=self.pool_size,
+                    pool_block=False
+                )
+                self._adapters[base_url] = adapter
+            return adapter
+
+    def get_session(self, url):
+        """
+        Get the calling thread's session for the provider serving a URL.
+
+        Args:
+            url (str): Request URL
+
+        Returns:
+            requests.Session: Session whose connections are pooled per provider
+        """
+        base_url = self.base_url(url)
+
+        sessions = getattr(self._local, 'sessions', None)
+        if sessions is None:
+            sessions = self._local.sessions = {}
+
+        session = sessions.get(base_url)
+        if session is None:
+            session = requests.Session()
+            session.mount(base_url, self._get_adapter(base_url))
+            if not self.keep_alive:
+                session.headers['Connection'] = 'close'
+            sessions[base_url] = session
+
+        return session
+
+    def get_async_session(self, url):
+        """
+        Get the running event loop's aiohttp session for the provider serving a URL.
+
+        Must be called from a coroutine. Sessions of closed event loops are dropped.
+
+        Args:
+            url (str): Request URL
+
+        Returns:
+            aiohttp.ClientSession: Session whose connections are pooled per provider
+        """
+        loop = asyncio.get_running_loop()
+        key = (loop, self.base_url(url))
+
+        with self._lock:
+            for stale_key in [k for k in self._async_sessions if k[0].is_closed()]:
+                del self._async_sessions[stale_key]
+
+            session = self._async_sessions.get(key)
+            if session is None or session.closed:
+                connector = aiohttp.TCPConnector(
+                    limit_per_host=self.pool_size,
+                    force_close=not self.keep_alive
+                )
+                session = aiohttp.ClientSession(connector=connector)
+                self._async_sessions[key] = session
+
+        return session
+
+    async def close_async(self):
+        """
+        Close the running event loop's aiohttp sessions.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            sessions = [session for key, session in self._async_sessions.items() if key[0] is loop]
+            self._async_sessions = {key: session for key, session in self._async_sessions.items()
+                                    if key[0] is not loop}
+        for session in sessions:
+            await session.close()
+
+    def close(self):
+        """
+        Close all pooled connections.
+        """
+        with self._lock:
+            for adapter in self._adapters.values():
+                adapter.close()
+            self._adapters.clear()
+        self._local = threading.local()
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+def get_default_pool():
+    """
+    Get the process-wide session pool, creating it on first use.
+
+    Returns:
+        HTTPSessionPool: Shared session pool
+    """
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = HTTPSessionPool()
+        return _default_pool
+
+def get_session(url):
+    """
+    Get the calling thread's pooled session for the provider serving a URL.
+
+    Args:
+        url (str): Request URL
+
+    Returns:
+        requests.Session: Session whose connections are pooled per provider
+    """
+    return get_default_pool().get_session(url)
+
+def get_async_session(url):
+    """
+    Get the running event loop's pooled aiohttp session for the provider serving a URL.
+
+    Args:
+        url (str): Request URL
+
+    Returns:
+        aiohttp.ClientSession: Session whose connections are pooled per provider
+    """
+    return get_default_pool().get_async_session(url)
+
+def resolve_api_url(url):
+    """
+    Get the URL a chat completions request should actually be sent to.
+
+    When MOCK_LLM_URL is set (see mock_llm_server.py), every provider is
+    redirected to that local OpenAI-compatible server, so the whole pipeline
+    can be tested and benchmarked offline.
+
+    Args:
+        url (str): Provider's chat completions URL
+
+    Returns:
+        str: The mock server's chat completions URL if configured, otherwise url
+    """
+    mock_url = os.getenv('MOCK_LLM_URL')
+    if mock_url:
+        return mock_url.rstrip('/') + '/v1/chat/completions'
+    return url
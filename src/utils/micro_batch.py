@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import asyncio
+import threading
+
+class _Batch:
+    """
+    Segments collected for one batched request.
+    """
+
+    def __init__(self):
+        """
+        Initialize an empty batch.
+        """
+        self.segments = []
+        self.tokens = 0
+        self.requests = 0
+        self.closed = False
+        self.task = None
+        self.full_async = None
+
+
+class MicroBatcher:
+    """
+    Packs the segments of short requests arriving close together into one
+    numbered request.
+
+    The first request of a key opens a batch and waits a short window for
+    others with the same key; the batch is sent when the window ends or it
+    is full. Each caller gets back the translations of its own segments.
+    A batch holding a single request is not sent, and a batch whose response
+    cannot be split back into segments is dropped; in both cases the callers
+    send their requests on their own as before.
+    """
+
+    def __init__(self, window=None, max_segments=None, max_tokens=None):
+        """
+        Initialize MicroBatcher.
+
+        Args:
+            window (float): Seconds a batch waits for more requests (defaults to BATCH_WINDOW or 0.05)
+            max_segments (int): Maximum segments in one batch (defaults to BATCH_MAX_SEGMENTS or 20)
+            max_tokens (int): Maximum source tokens in one batch (defaults to BATCH_MAX_TOKENS or 1500)
+        """
+        self.window = window if window is not None else float(os.getenv('BATCH_WINDOW', 0.05))
+        self.max_segments = max_segments or int(os.getenv('BATCH_MAX_SEGMENTS', 20))
+        self.max_tokens = max_tokens or int(os.getenv('BATCH_MAX_TOKENS', 1500))
+
+        self.requests = 0
+        self.batches = 0
+        self.batched_requests = 0
+        self.fallbacks = 0
+        self._batches = {}
+        self._lock = threading.Lock()
+
+    def _join(self, key, segments, tokens):
+        """
+        Add segments to the open batch of a key, opening a new one if needed.
+        Caller must hold the lock.
+
+        Returns:
+            tuple: (batch, offset of the segments in the batch, whether the caller opened the batch)
+        """
+        self.requests += 1
+        batch = self._batches.get(key)
+        if batch is not None and (len(batch.segments) + len(segments) > self.max_segments or
+                                  batch.tokens + tokens > self.max_tokens):
+            # 放不下时先发送当前批次
+            self._close(key, batch)
+            batch = None
+
+        opened = batch is None
+        if opened:
+            batch = _Batch()
+            self._batches[key] = batch
+
+        offset = len(batch.segments)
+        batch.segments.extend(segments)
+        batch.tokens += tokens
+        batch.requests += 1
+        if len(batch.segments) >= self.max_segments or batch.tokens >= self.max_tokens:
+            self._close(key, batch)
+        return batch, offset, opened
+
+    def _close(self, key, batch):
+        """
+        Stop adding to a batch and wake up its sender. Caller must hold the lock.
+        """
+        if self._batches.get(key) is batch:
+            del self._batches[key]
+        batch.closed = True
+        if batch.full_async is not None:
+            batch.full_async.set()
+
+    def _count(self, batch, results):
+        """
+        Count a sent batch.
+        """
+        with self._lock:
+            self.batches += 1
+            if results is None:
+                self.fallbacks += 1
+            else:
+                self.batched_requests += batch.requests
+
+    async def call_async(self, key, segments, tokens, send):
+        """
+        Translate segments as part of a batch.
+
+        Args:
+            key (str): Batch key; only requests with the same key share a batch
+            segments (list): Segments of this request
+            tokens (int): Estimated source tokens of the segments
+            send (callable): Returns a coroutine sending a list of segments,
+                             returning their translations or None
+
+        Returns:
+            list: Translations of this request's segments, or None if the
+                  caller should send the request on its own
+        """
+        key = (asyncio.get_running_loop(), key)
+        with self._lock:
+            batch, offset, opened = self._join(key, segments, tokens)
+            if opened:
+                batch.full_async = asyncio.Event()
+                if batch.closed:
+                    batch.full_async.set()
+                batch.task = asyncio.ensure_future(self._send_async(key, batch, send))
+
+        # 批次作为单独的任务发送，一个调用方被取消不影响其他调用方
+        results = await asyncio.shield(batch.task)
+        return None if results is None else results[offset:offset + len(segments)]
+
+    async def _send_async(self, key, batch, send):
+        """
+        Wait for a batch to fill up or its window to end, then send it.
+        """
+        try:
+            await asyncio.wait_for(batch.full_async.wait(), self.window)
+        except asyncio.TimeoutError:
+            pass
+        with self._lock:
+            self._close(key, batch)
+
+        if batch.requests == 1:
+            return None
+        results = await send(list(batch.segments))
+        self._count(batch, results)
+        return results
+
+    def get_stats(self):
+        """
+        Get batching statistics.
+
+        Returns:
+            dict: requests, batches, batched_requests (requests answered by a batch),
+                  fallbacks (batches that could not be split) and round_trips_saved
+        """
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'batches': self.batches,
+                'batched_requests': self.batched_requests,
+                'fallbacks': self.fallbacks,
+                'round_trips_saved': self.batched_requests - self.batches,
+            }
+
+
+_default_batcher = None
+_default_batcher_lock = threading.Lock()
+
+def get_default_micro_batcher():
+    """
+    Get the process-wide micro-batcher, creating it on first use.
+
+    Returns:
+        MicroBatcher: Shared micro-batcher
+    """
+    global _default_batcher
+    with _default_batcher_lock:
+        if _default_batcher is None:
+            _default_batcher = MicroBatcher()
+        return _default_batcher
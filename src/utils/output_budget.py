@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import time
+import atexit
+import threading
+
+class OutputBudget:
+    """
+    Per-request max_tokens, sized from the estimated input tokens and the
+    output-to-input ratio learned for each model and stage.
+
+    Every completed call updates an exponentially weighted mean of the ratio
+    and of its mean deviation, in the same way TCP estimates round-trip
+    times; a request gets the tokens the mean plus a few deviations predict
+    for its input, plus a fixed margin, but never more than the model's
+    configured max_tokens. Until a model and stage have been seen, requests
+    keep the configured max_tokens.
+
+    The ratios are saved to a JSON file so that they survive restarts. The
+    file is rewritten at most once per SAVE_INTERVAL and once more at exit,
+    so recording a call never waits for the disk.
+    """
+
+    # 两次保存之间至少间隔的秒数，其余的更新在退出时保存
+    SAVE_INTERVAL = 60
+
+    def __init__(self, path=None, smoothing=None, deviations=None, margin=None, min_tokens=None):
+        """
+        Initialize OutputBudget and load the saved ratios.
+
+        Args:
+            path (str): File of the learned ratios
+                        (defaults to OUTPUT_RATIO_FILE or ~/.pdf_assistant/output_ratios.json)
+            smoothing (float): Weight of a new sample in the moving averages
+                               (defaults to OUTPUT_RATIO_SMOOTHING or 0.2)
+            deviations (float): Mean deviations added to the mean ratio
+                                (defaults to OUTPUT_BUDGET_DEVIATIONS or 2)
+            margin (int): Tokens added to every budget (defaults to OUTPUT_BUDGET_MARGIN or 64)
+            min_tokens (int): Smallest budget of a request (defaults to OUTPUT_BUDGET_MIN_TOKENS or 256)
+        """
+        self.path = path or os.getenv('OUTPUT_RATIO_FILE') or os.path.join(
+            os.path.expanduser('~'), '.pdf_assistant', 'output_ratios.json'
+        )
+        self.smoothing = smoothing if smoothing is not None else float(os.getenv('OUTPUT_RATIO_SMOOTHING', 0.2))
+        self.deviations = deviations if deviations is not None else float(os.getenv('OUTPUT_BUDGET_DEVIATIONS', 2))
+        self.margin = margin if margin is not None else int(os.getenv('OUTPUT_BUDGET_MARGIN', 64))
+        self.min_tokens = min_tokens if min_tokens is not None else int(os.getenv('OUTPUT_BUDGET_MIN_TOKENS', 256))
+
+        # "模型 步骤" 到 {'ratio', 'deviation', 'samples'}
+        self._ratios = {}
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self._last_save = time.monotonic()
+        self._load()
+        atexit.register(self.save)
+
+    @staticmethod
+    def _key(model, stage):
+        """
+        Get the key of a model and stage.
+
+        Args:
+            model (str): Model identifier
+            stage (str): Pipeline stage, e.g. "translation" or "vocabulary"
+
+        Returns:
+            str: Key
+        """
+        return f"{model} {stage}"
+
+    def max_tokens(self, model, stage, input_tokens, ceiling):
+        """
+        Get the max_tokens of a request.
+
+        Args:
+            model (str): Model identifier
+            stage (str): Pipeline stage
+            input_tokens (int): Estimated tokens of the request's messages
+            ceiling (int): Configured max_tokens of the model
+
+        Returns:
+            int: Output budget of the request
+        """
+        with self._lock:
+            entry = self._ratios.get(self._key(model, stage))
+        if entry is None:
+            return ceiling
+
+        ratio = entry['ratio'] + self.deviations * entry['deviation']
+        budget = int(input_tokens * ratio) + self.margin
+        return max(min(self.min_tokens, ceiling), min(budget, ceiling))
+
+    def record(self, model, stage, input_tokens, output_tokens):
+        """
+        Learn from a completed call.
+
+        Args:
+            model (str): Model identifier
+            stage (str): Pipeline stage
+            input_tokens (int): Estimated tokens of the request's messages
+            output_tokens (int): Completion tokens of the reply, including reasoning tokens
+        """
+        if input_tokens <= 0:
+            return
+
+        sample = output_tokens / input_tokens
+        with self._lock:
+            entry = self._ratios.get(self._key(model, stage))
+            if entry is None:
+                entry = {'ratio': sample, 'deviation': sample / 2, 'samples': 0}
+                self._ratios[self._key(model, stage)] = entry
+            else:
+                # 先用旧均值更新偏差，再更新均值
+                entry['deviation'] += self.smoothing * (abs(sample - entry['ratio']) - entry['deviation'])
+                entry['ratio'] += self.smoothing * (sample - entry['ratio'])
+            entry['samples'] += 1
+            self._dirty = True
+            due = time.monotonic() - self._last_save >= self.SAVE_INTERVAL
+
+        if due:
+            self.save()
+
+    def ratios(self):
+        """
+        Get the learned ratios.
+
+        Returns:
+            dict: "model stage" to ratio, deviation and samples
+        """
+        with self._lock:
+            return {key: dict(entry) for key, entry in self._ratios.items()}
+
+    def _load(self):
+        """
+        Load the saved ratios, ignoring a missing or damaged file.
+        """
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._ratios = json.load(f)
+        except (OSError, ValueError):
+            self._ratios = {}
+
+    def save(self):
+        """
+        Save the ratios if they changed since the last save.
+        """
+        # 写文件期间不占用 _lock，记录新样本不需要等待；_save_lock 保证较旧的快照不会覆盖较新的
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                data = json.dumps(self._ratios, ensure_ascii=False, indent=2)
+                self._dirty = False
+                self._last_save = time.monotonic()
+
+            try:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                # 先写临时文件再替换，避免中断时留下不完整的文件
+                with open(self.path + '.tmp', 'w', encoding='utf-8') as f:
+                    f.write(data)
+                os.replace(self.path + '.tmp', self.path)
+            except OSError as e:
+                print(f"[DEBUG] 保存输出比例失败: {str(e)}")
+
+
+_default_budget = None
+_default_budget_lock = threading.Lock()
+
+def get_default_output_budget():
+    """
+    Get the process-wide output budget, creating it on first use.
+
+    Returns:
+        OutputBudget: Shared output budget
+    """
+    global _default_budget
+    with _default_budget_lock:
+        if _default_budget is None:
+            _default_budget = OutputBudget()
+        return _default_budget
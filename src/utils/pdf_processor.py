@@ -3,19 +3,33 @@
 
 import os
 import io
+import mmap
 import tempfile
 import cv2
 import numpy as np
 import re
+import time
+import multiprocessing
+from collections import deque, namedtuple
+from contextlib import contextmanager
+from multiprocessing.connection import wait
 from PIL import Image
 from PyPDF2 import PdfReader
 import pdfplumber
-from pdfminer.high_level import extract_text as pdfminer_extract_text
+from pdfminer.converter import TextConverter
+from pdfminer.layout import LAParams
+from pdfminer.pdfinterp import PDFResourceManager, PDFPageInterpreter
+from pdfminer.pdfpage import PDFPage
 from pdf2image import convert_from_path
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
 import pytesseract
 
+from .extraction_cache import ExtractionCache, get_default_cache
+
+# 单页提取结果：规范化文本、实际使用的提取方法、是否因超时而降级
+PageText = namedtuple('PageText', ['text', 'method', 'timed_out'])
+
 class PDFProcessor:
     """
     Class for processing PDF files - converting to images with note space,
@@ -29,16 +43,64 @@ class PDFProcessor:
     EXTRACT_METHOD_OCR = 'ocr'
     EXTRACT_METHOD_IMAGE = 'image'  # 新增：使用图片提取文本
     
-    def __init__(self, pdf_path, note_margin_width_percentage=30):
+    # 页数少于该值时不启动进程池，避免进程启动开销超过收益
+    PARALLEL_MIN_PAGES = 8
+    # 每个工作进程分配的页批次数，批次越多负载越均衡
+    BATCHES_PER_WORKER = 4
+    
+    # 超时页面降级OCR时使用的低分辨率
+    FALLBACK_OCR_DPI = 100
+    
+    # 超过该大小的PDF通过内存映射交给解析器，避免整个文件被读入每个进程的内存
+    MMAP_THRESHOLD_BYTES = 32 * 1024 * 1024
+    
+    # 提取失败页面的逐页备用链
+    FALLBACK_CHAINS = {
+        EXTRACT_METHOD_PDFMINER: [EXTRACT_METHOD_PDFPLUMBER, EXTRACT_METHOD_PYPDF2],
+        EXTRACT_METHOD_PDFPLUMBER: [EXTRACT_METHOD_PYPDF2],
+    }
+    # 超时页面的备用链，跳过同样昂贵的版面分析，文本层为空时使用低分辨率OCR
+    TIMEOUT_FALLBACK_CHAIN = [EXTRACT_METHOD_PYPDF2, EXTRACT_METHOD_OCR]
+    
+    # 页面方法汇总中所有方法都失败的页面使用的键
+    PAGE_METHOD_FAILED = 'failed'
+    
+    # 未配置 EXTRACTION_PAGE_TIMEOUT 时单页提取的时间预算（秒）
+    DEFAULT_PAGE_TIMEOUT = 60
+    
+    # 文本规范化规则的版本号，修改 _normalize_text 后需递增以使旧缓存失效
+    NORMALIZER_VERSION = 1
+    
+    def __init__(self, pdf_path, note_margin_width_percentage=30, max_workers=None,
+                 use_cache=True, cache=None, page_timeout=None):
         """
         Initialize PDFProcessor.
         
         Args:
             pdf_path (str): Path to the PDF file
             note_margin_width_percentage (int): Percentage of the image width to be used for notes
+            max_workers (int): Number of worker processes for per-page extraction
+                               (defaults to the number of CPU cores)
+            use_cache (bool): Whether to read and fill the extraction cache
+            cache (ExtractionCache): Cache to use (defaults to the shared cache)
+            page_timeout (float): Time budget in seconds for extracting a single page with
+                                  pdfminer or pdfplumber in a killable worker process
+                                  (defaults to EXTRACTION_PAGE_TIMEOUT or DEFAULT_PAGE_TIMEOUT;
+                                  0 disables the watchdog)
         """
         self.pdf_path = pdf_path
         self.note_margin_width_percentage = note_margin_width_percentage
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.use_cache = use_cache
+        self._cache = cache
+        if page_timeout is None:
+            page_timeout = float(os.getenv('EXTRACTION_PAGE_TIMEOUT') or self.DEFAULT_PAGE_TIMEOUT)
+        # 默认开启看门狗，单个异常页面最多让文档的提取延迟一个时间预算；设为0时关闭
+        self.page_timeout = page_timeout or None
+        self._pdf_hash = None
+        
+        # 最近一次提取中每页的实际提取方法和超时标记
+        self.page_report = []
         
         if not os.path.exists(pdf_path):
             raise FileNotFoundError(f"PDF file not found: {pdf_path}")
@@ -81,60 +143,27 @@ class PDFProcessor:
         Returns:
             str: Extracted text using PyPDF2
         """
-        reader = PdfReader(self.pdf_path)
-        text = ""
-        
-        for page in reader.pages:
-            page_text = page.extract_text()
-            if page_text:
-                # Post-process the text to fix spacing issues
-                page_text = self._normalize_text(page_text)
-                text += page_text + "\n\n"
-        
-        return text
+        return self._join_pages(self._extract_pages(self.EXTRACT_METHOD_PYPDF2))
     
     def _extract_text_with_pdfplumber(self):
         """
         Extract text from PDF using pdfplumber.
+        Pages that fail fall back to PyPDF2 one by one.
         
         Returns:
             str: Extracted text using pdfplumber
         """
-        text = ""
-        try:
-            with pdfplumber.open(self.pdf_path) as pdf:
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        # Post-process the text to fix spacing issues
-                        page_text = self._normalize_text(page_text)
-                        text += page_text + "\n\n"
-                        
-            return text
-        except Exception as e:
-            print(f"Error with pdfplumber extraction: {e}")
-            # Fallback to PyPDF2 if pdfplumber fails
-            return self._extract_text_with_pypdf2()
+        return self._join_pages(self._extract_pages(self.EXTRACT_METHOD_PDFPLUMBER))
     
     def _extract_text_with_pdfminer(self):
         """
         Extract text from PDF using pdfminer.six.
+        Pages that fail fall back to pdfplumber, then PyPDF2, one by one.
         
         Returns:
             str: Extracted text using pdfminer.six
         """
-        try:
-            # Extract text with pdfminer
-            text = pdfminer_extract_text(self.pdf_path)
-            
-            # Post-process the text to fix spacing issues
-            text = self._normalize_text(text)
-            
-            return text
-        except Exception as e:
-            print(f"Error with pdfminer extraction: {e}")
-            # Fallback to pdfplumber if pdfminer fails
-            return self._extract_text_with_pdfplumber()
+        return self._join_pages(self._extract_pages(self.EXTRACT_METHOD_PDFMINER))
     
     def _extract_text_from_images(self):
         """
@@ -145,50 +174,7 @@ class PDFProcessor:
             str: Extracted text from PDF images
         """
         try:
-            # Convert PDF to images
-            images = convert_from_path(self.pdf_path, dpi=300)
-            
-            # Extract text from each image
-            full_text = ""
-            for i, img in enumerate(images):
-                # Convert to OpenCV format for QR detection
-                cv_image = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
-                
-                # Check if the image has a QR code and crop if needed
-                if self.has_qr_code(cv_image):
-                    print(f"QR code detected in page {i+1}, cropping for text extraction")
-                    cv_image = self.crop_image_at_qr_code(cv_image)
-                
-                # Convert back to PIL Image
-                pil_image = Image.fromarray(cv2.cvtColor(cv_image, cv2.COLOR_BGR2RGB))
-                
-                # Create a temporary file for the image
-                with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as temp_file:
-                    temp_path = temp_file.name
-                    pil_image.save(temp_path)
-                
-                # Extract text from the image
-                # Use basic pytesseract without full OCR processing
-                try:
-                    img_text = pytesseract.image_to_string(
-                        pil_image, 
-                        lang='eng',
-                        config='--psm 1'  # Automatic page segmentation with OSD
-                    )
-                    
-                    # Clean up the temporary file
-                    os.unlink(temp_path)
-                    
-                    # Post-process the text
-                    img_text = self._normalize_text(img_text)
-                    full_text += img_text + "\n\n"
-                except Exception as e:
-                    print(f"Error extracting text from image {i+1}: {e}")
-                    # Skip this image and continue with the next one
-                    continue
-            
-            return full_text.strip()
-            
+            return self._join_pages(self._extract_pages(self.EXTRACT_METHOD_IMAGE)).strip()
         except Exception as e:
             print(f"Error extracting text from PDF images: {e}")
             # Fallback to PyPDF2 if image extraction fails
@@ -202,38 +188,488 @@ class PDFProcessor:
             str: Extracted text using OCR
         """
         try:
-            # Convert PDF to images
-            images = convert_from_path(self.pdf_path, dpi=300)
-            
-            # Extract text from each image
-            full_text = ""
-            for i, img in enumerate(images):
-                # Convert to OpenCV format
-                cv_image = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
-                
-                # Check if the image has a QR code and crop if needed
-                if self.has_qr_code(cv_image):
-                    print(f"QR code detected in page {i+1}, cropping for OCR")
-                    cv_image = self.crop_image_at_qr_code(cv_image)
-                
-                # Convert back to PIL Image
-                pil_image = Image.fromarray(cv2.cvtColor(cv_image, cv2.COLOR_BGR2RGB))
-                
-                # Perform OCR
-                text = pytesseract.image_to_string(pil_image, lang='eng')
-                
-                # Post-process the text
-                text = self._normalize_text(text)
-                
-                full_text += text + "\n\n"
-            
-            return full_text.strip()
-            
+            return self._join_pages(self._extract_pages(self.EXTRACT_METHOD_OCR)).strip()
         except Exception as e:
             print(f"Error performing OCR on PDF: {e}")
             # Fallback to PyPDF2 if OCR fails
             return self._extract_text_with_pypdf2()
     
+    def _extract_pages(self, method):
+        """
+        Get the normalized text of every page, reading from and filling the extraction cache.
+        Only pages missing from the cache are extracted.
+        
+        Args:
+            method (str): Extraction method
+            
+        Returns:
+            list: Normalized text of every page, in document order
+        """
+        extractors = {
+            self.EXTRACT_METHOD_PYPDF2: self._extract_pages_with_pypdf2,
+            self.EXTRACT_METHOD_PDFPLUMBER: self._extract_pages_with_pdfplumber,
+            self.EXTRACT_METHOD_PDFMINER: self._extract_pages_with_pdfminer,
+            self.EXTRACT_METHOD_IMAGE: self._extract_pages_from_images,
+            self.EXTRACT_METHOD_OCR: self._extract_pages_with_ocr,
+        }
+        extractor = extractors[method]
+        
+        if not self.use_cache:
+            pages = extractor(list(range(self._count_pages())))
+        else:
+            cache = self._get_cache()
+            pdf_hash = self._get_pdf_hash()
+            
+            page_count = cache.get_page_count(pdf_hash)
+            if page_count is None:
+                page_count = self._count_pages()
+                cache.set_page_count(pdf_hash, page_count)
+            
+            cached_pages = {
+                index: PageText(text, source_method, False)
+                for index, (text, source_method) in cache.get_pages(pdf_hash, method, self.NORMALIZER_VERSION).items()
+            }
+            missing_pages = [index for index in range(page_count) if index not in cached_pages]
+            
+            if missing_pages:
+                extracted = dict(zip(missing_pages, extractor(missing_pages)))
+                # 所有方法都出错的页面和超时降级的页面不写入缓存，下次重新尝试
+                cache.put_pages(pdf_hash, method, self.NORMALIZER_VERSION, {
+                    index: (page.text, page.method) for index, page in extracted.items()
+                    if page.method is not None and not page.timed_out
+                })
+                cached_pages.update(extracted)
+            
+            pages = [cached_pages[index] for index in range(page_count)]
+        
+        self.page_report = [
+            {'page': index + 1, 'method': page.method, 'timed_out': page.timed_out}
+            for index, page in enumerate(pages)
+        ]
+        
+        return [page.text for page in pages]
+    
+    def get_timed_out_pages(self):
+        """
+        Get the pages of the last extraction that exceeded their time budget.
+        
+        Returns:
+            list: Report entries of the degraded pages
+        """
+        return [entry for entry in self.page_report if entry['timed_out']]
+    
+    def get_page_method_summary(self):
+        """
+        Group the pages of the last extraction by the method that produced them.
+        
+        Returns:
+            dict: Mapping of method name (PAGE_METHOD_FAILED for pages that every method
+                  failed on) to a list of one-based page numbers
+        """
+        summary = {}
+        for entry in self.page_report:
+            summary.setdefault(entry['method'] or self.PAGE_METHOD_FAILED, []).append(entry['page'])
+        return summary
+    
+    def _get_cache(self):
+        """
+        Get the extraction cache, falling back to the shared cache.
+        
+        Returns:
+            ExtractionCache: Extraction cache
+        """
+        if self._cache is None:
+            self._cache = get_default_cache()
+        return self._cache
+    
+    def _get_pdf_hash(self):
+        """
+        Get the content hash of the PDF, computed once per processor.
+        
+        Returns:
+            str: Hex digest of the PDF content
+        """
+        if self._pdf_hash is None:
+            self._pdf_hash = ExtractionCache.hash_file(self.pdf_path)
+        return self._pdf_hash
+    
+    def _extract_pages_with_pypdf2(self, page_indices):
+        """
+        Extract the given pages using PyPDF2.
+        
+        Args:
+            page_indices (list): Zero-based page indices
+            
+        Returns:
+            list: PageText of each requested page
+        """
+        page_texts, failed = self._run_pages_in_process(_iter_pypdf2_pages, page_indices)
+        return [
+            PageText(page_texts.get(index, ""), None if index in failed else self.EXTRACT_METHOD_PYPDF2, False)
+            for index in page_indices
+        ]
+    
+    def _extract_pages_with_pdfplumber(self, page_indices):
+        """
+        Extract the given pages using pdfplumber, in parallel.
+        
+        Args:
+            page_indices (list): Zero-based page indices
+            
+        Returns:
+            list: PageText of each requested page
+        """
+        return self._extract_pages_parallel(self.EXTRACT_METHOD_PDFPLUMBER, page_indices)
+    
+    def _extract_pages_with_pdfminer(self, page_indices):
+        """
+        Extract the given pages using pdfminer.six, in parallel.
+        
+        Args:
+            page_indices (list): Zero-based page indices
+            
+        Returns:
+            list: PageText of each requested page
+        """
+        return self._extract_pages_parallel(self.EXTRACT_METHOD_PDFMINER, page_indices)
+    
+    def _extract_pages_from_images(self, page_indices):
+        """
+        Extract the given pages by rendering them to images and reading them
+        with pytesseract's automatic page segmentation.
+        
+        Args:
+            page_indices (list): Zero-based page indices
+            
+        Returns:
+            list: PageText of each requested page
+        """
+        page_texts = []
+        for index, img in zip(page_indices, self._convert_pages_to_images(page_indices, dpi=300)):
+            pil_image = self._crop_page_image(img, index, "text extraction")
+            
+            try:
+                img_text = pytesseract.image_to_string(
+                    pil_image, 
+                    lang='eng',
+                    config='--psm 1'  # Automatic page segmentation with OSD
+                )
+                img_text = self._normalize_text(img_text)
+            except Exception as e:
+                print(f"Error extracting text from image {index+1}: {e}")
+                # Skip this image and continue with the next one
+                img_text = ""
+            
+            page_texts.append(PageText(img_text, self.EXTRACT_METHOD_IMAGE, False))
+        
+        return page_texts
+    
+    def _extract_pages_with_ocr(self, page_indices):
+        """
+        Extract the given pages using OCR.
+        
+        Args:
+            page_indices (list): Zero-based page indices
+            
+        Returns:
+            list: PageText of each requested page
+        """
+        page_texts = []
+        for index, img in zip(page_indices, self._convert_pages_to_images(page_indices, dpi=300)):
+            pil_image = self._crop_page_image(img, index, "OCR")
+            text = pytesseract.image_to_string(pil_image, lang='eng')
+            page_texts.append(PageText(self._normalize_text(text), self.EXTRACT_METHOD_OCR, False))
+        
+        return page_texts
+    
+    def _convert_pages_to_images(self, page_indices, dpi):
+        """
+        Render the given pages to images, one conversion per contiguous page range.
+        
+        Args:
+            page_indices (list): Zero-based page indices, in ascending order
+            dpi (int): Rendering resolution
+            
+        Returns:
+            list: PIL images of the requested pages
+        """
+        images = []
+        range_start = 0
+        for i in range(1, len(page_indices) + 1):
+            if i == len(page_indices) or page_indices[i] != page_indices[i - 1] + 1:
+                images.extend(convert_from_path(
+                    self.pdf_path, dpi=dpi,
+                    first_page=page_indices[range_start] + 1,
+                    last_page=page_indices[i - 1] + 1
+                ))
+                range_start = i
+        
+        return images
+    
+    def _crop_page_image(self, img, index, purpose):
+        """
+        Crop a rendered page at its QR code, if any.
+        
+        Args:
+            img (PIL.Image): Rendered page
+            index (int): Zero-based page index
+            purpose (str): What the image is used for (for logging)
+            
+        Returns:
+            PIL.Image: Cropped page image
+        """
+        # Convert to OpenCV format for QR detection
+        cv_image = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
+        
+        # Check if the image has a QR code and crop if needed
+        if self.has_qr_code(cv_image):
+            print(f"QR code detected in page {index+1}, cropping for {purpose}")
+            cv_image = self.crop_image_at_qr_code(cv_image)
+        
+        # Convert back to PIL Image
+        return Image.fromarray(cv2.cvtColor(cv_image, cv2.COLOR_BGR2RGB))
+    
+    def _count_pages(self):
+        """
+        Count the pages of the PDF.
+        
+        Returns:
+            int: Number of pages
+        """
+        with _open_pdf(self.pdf_path) as stream:
+            return len(PdfReader(stream).pages)
+    
+    def _partition_pages(self, page_indices, workers):
+        """
+        Split page indices into contiguous batches for the worker processes.
+        
+        Args:
+            page_indices (list): Zero-based page indices
+            workers (int): Number of worker processes
+            
+        Returns:
+            list: List of page index lists, in document order
+        """
+        batch_count = min(len(page_indices), workers * self.BATCHES_PER_WORKER)
+        batch_size, remainder = divmod(len(page_indices), batch_count)
+        
+        batches = []
+        start = 0
+        for i in range(batch_count):
+            end = start + batch_size + (1 if i < remainder else 0)
+            batches.append(page_indices[start:end])
+            start = end
+        
+        return batches
+    
+    def _extract_pages_parallel(self, method, page_indices):
+        """
+        Extract pages across worker processes. Failed pages go through the method's
+        fallback chain and timed-out pages through the timeout fallback chain,
+        one page at a time.
+        
+        Args:
+            method (str): Extraction method
+            page_indices (list): Zero-based page indices, in ascending order
+            
+        Returns:
+            list: PageText of each requested page
+        """
+        if not page_indices:
+            return []
+        
+        page_texts, failed, timed_out = self._run_pages(_PAGE_ITERATORS[method], page_indices)
+        pages = {index: PageText(text, method, False) for index, text in page_texts.items()}
+        
+        if failed:
+            print(f"Pages {[index + 1 for index in failed]} failed with {method}")
+        self._run_fallback_chain(pages, failed, self.FALLBACK_CHAINS.get(method, []), False)
+        
+        if timed_out:
+            print(f"Pages {[index + 1 for index in timed_out]} exceeded {self.page_timeout}s with {method}")
+        self._run_fallback_chain(pages, timed_out, self.TIMEOUT_FALLBACK_CHAIN, True)
+        
+        return [pages[index] for index in page_indices]
+    
+    def _run_fallback_chain(self, pages, page_indices, chain, timed_out):
+        """
+        Retry pages with each fallback method in turn until they yield text.
+        
+        Args:
+            pages (dict): Mapping of page index to PageText, updated in place
+            page_indices (list): Zero-based indices of the pages to retry
+            chain (list): Fallback extraction methods, in order
+            timed_out (bool): Whether the pages are being retried after a timeout
+        """
+        remaining = list(page_indices)
+        # 某方法成功但未提取到文字的页面（可能是空白页）
+        empty_results = {}
+        
+        for fallback_method in chain:
+            if not remaining:
+                break
+            
+            print(f"Retrying pages {[index + 1 for index in remaining]} with {fallback_method}")
+            page_texts, _, _ = self._run_pages(_PAGE_ITERATORS[fallback_method], remaining)
+            
+            for index, text in page_texts.items():
+                if text:
+                    pages[index] = PageText(text, fallback_method, timed_out)
+                else:
+                    empty_results.setdefault(index, fallback_method)
+            remaining = [index for index in remaining if index not in pages]
+        
+        for index in remaining:
+            pages[index] = PageText("", empty_results.get(index), timed_out)
+    
+    def _run_pages(self, page_iterator, page_indices):
+        """
+        Extract pages with a page iterator, in worker processes when the watchdog is
+        enabled or the document is large enough to benefit from parallelism.
+        
+        Args:
+            page_iterator (callable): Module-level generator taking (pdf_path, page_indices)
+                                      and yielding (page_index, normalized_text, error)
+            page_indices (list): Zero-based page indices, in ascending order
+            
+        Returns:
+            tuple: (dict of page index to normalized text, list of failed page indices,
+                    list of timed-out page indices)
+        """
+        workers = min(self.max_workers, len(page_indices))
+        
+        # 不限时且页数少或单核时直接在当前进程提取
+        if self.page_timeout is None and (workers <= 1 or len(page_indices) < self.PARALLEL_MIN_PAGES):
+            page_texts, failed = self._run_pages_in_process(page_iterator, page_indices)
+            return page_texts, failed, []
+        
+        return self._run_page_workers(page_iterator, page_indices)
+    
+    def _run_pages_in_process(self, page_iterator, page_indices):
+        """
+        Extract pages with a page iterator in the current process.
+        
+        Args:
+            page_iterator (callable): Generator yielding (page_index, normalized_text, error)
+            page_indices (list): Zero-based page indices
+            
+        Returns:
+            tuple: (dict of page index to normalized text, list of failed page indices)
+        """
+        page_texts = {}
+        try:
+            for index, text, error in page_iterator(self.pdf_path, page_indices):
+                if error is None:
+                    page_texts[index] = text
+                else:
+                    print(f"Error extracting page {index+1}: {error}")
+        except Exception as e:
+            print(f"Error extracting pages: {e}")
+        
+        return page_texts, [index for index in page_indices if index not in page_texts]
+    
+    def _run_page_workers(self, page_iterator, page_indices):
+        """
+        Extract pages in killable worker processes, enforcing the per-page time budget.
+        A worker stuck on a page or crashing on it is replaced by a new worker that
+        continues after that page.
+        
+        Args:
+            page_iterator (callable): Module-level generator taking (pdf_path, page_indices)
+                                      and yielding (page_index, normalized_text, error)
+            page_indices (list): Zero-based page indices, in ascending order
+            
+        Returns:
+            tuple: (dict of page index to normalized text, list of failed page indices,
+                    list of timed-out page indices)
+        """
+        workers = min(self.max_workers, len(page_indices))
+        pending = deque(self._partition_pages(page_indices, workers))
+        running = {}  # 接收端连接 -> 工作进程状态
+        page_texts = {}
+        failed = []
+        timed_out = []
+        
+        def stop_worker(receiver):
+            state = running.pop(receiver)
+            state['process'].kill()
+            state['process'].join()
+            receiver.close()
+            return state
+        
+        try:
+            while pending or running:
+                # 启动工作进程，每个进程通过独立管道返回结果，终止进程不会影响其他进程
+                while pending and len(running) < workers:
+                    batch = pending.popleft()
+                    receiver, sender = multiprocessing.Pipe(duplex=False)
+                    process = multiprocessing.Process(
+                        target=_page_worker,
+                        args=(page_iterator, self.pdf_path, batch, sender),
+                        daemon=True
+                    )
+                    process.start()
+                    sender.close()
+                    running[receiver] = {'process': process, 'pages': deque(batch), 'started': time.monotonic()}
+                
+                for receiver in wait(list(running), timeout=0.5):
+                    state = running[receiver]
+                    try:
+                        index, text, error = receiver.recv()
+                    except EOFError:
+                        # 工作进程已退出；若仍有未完成页面，说明进程在当前页崩溃
+                        stop_worker(receiver)
+                        if state['pages']:
+                            print(f"Extraction worker exited unexpectedly on page {state['pages'][0] + 1}")
+                            failed.append(state['pages'].popleft())
+                            if state['pages']:
+                                pending.appendleft(list(state['pages']))
+                        continue
+                    
+                    if index is None:
+                        # 文档级错误，该批次剩余页面全部交给备用链
+                        print(f"Error extracting pages: {error}")
+                        stop_worker(receiver)
+                        failed.extend(state['pages'])
+                        continue
+                    
+                    if error is None:
+                        page_texts[index] = text
+                    else:
+                        print(f"Error extracting page {index+1}: {error}")
+                        failed.append(index)
+                    state['pages'].popleft()
+                    state['started'] = time.monotonic()
+                
+                if self.page_timeout is None:
+                    continue
+                
+                # 终止在单页上耗时超过预算的工作进程，剩余页面交给新的工作进程
+                now = time.monotonic()
+                for receiver, state in list(running.items()):
+                    if state['pages'] and now - state['started'] > self.page_timeout:
+                        stop_worker(receiver)
+                        timed_out.append(state['pages'].popleft())
+                        if state['pages']:
+                            pending.appendleft(list(state['pages']))
+        finally:
+            for receiver in list(running):
+                stop_worker(receiver)
+        
+        return page_texts, sorted(failed), sorted(timed_out)
+    
+    def _join_pages(self, page_texts):
+        """
+        Merge per-page text into a single document, skipping empty pages.
+        
+        Args:
+            page_texts (list): Normalized text of each page
+            
+        Returns:
+            str: Merged text
+        """
+        return "".join(page_text + "\n\n" for page_text in page_texts if page_text)
+    
     def extract_text_all_methods(self):
         """
         Extract text using all available methods and return results.
@@ -270,7 +706,8 @@ class PDFProcessor:
             
         return results
     
-    def _normalize_text(self, text):
+    @staticmethod
+    def _normalize_text(text):
         """
         Normalize text extracted from PDF by fixing common spacing issues.
         
@@ -722,4 +1159,161 @@ class PDFProcessor:
             
         except Exception as e:
             print(f"翻译转PDF失败: {e}")
-            raise Exception(f"创建翻译PDF时出错: {str(e)}") 
\ No newline at end of file
+            raise Exception(f"创建翻译PDF时出错: {str(e)}") 
+
+
+
+
+@contextmanager
+def _open_pdf(pdf_path):
+    """
+    Open a PDF as a binary stream for the parsers. Files of at least
+    PDFProcessor.MMAP_THRESHOLD_BYTES are memory-mapped, so the parsers read
+    straight from the shared OS page cache instead of private copies of the file.
+    
+    Args:
+        pdf_path (str): Path to the PDF file
+        
+    Yields:
+        file or mmap.mmap: Seekable binary stream of the PDF
+    """
+    with open(pdf_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0 or size < PDFProcessor.MMAP_THRESHOLD_BYTES:
+            yield f
+            return
+        
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+
+
+def _page_worker(page_iterator, pdf_path, page_indices, connection):
+    """
+    Extract pages in a worker process and send each result as soon as it is ready.
+    
+    Args:
+        page_iterator (callable): Generator yielding (page_index, normalized_text, error)
+        pdf_path (str): Path to the PDF file
+        page_indices (list): Zero-based page indices, in ascending order
+        connection (multiprocessing.connection.Connection): Sending end of the result pipe
+    """
+    try:
+        for result in page_iterator(pdf_path, page_indices):
+            connection.send(result)
+    except Exception as e:
+        # 无法继续逐页提取的文档级错误
+        connection.send((None, None, str(e)))
+    finally:
+        connection.close()
+
+
+def _iter_pypdf2_pages(pdf_path, page_indices):
+    """
+    Extract and normalize the given pages with PyPDF2.
+    
+    Args:
+        pdf_path (str): Path to the PDF file
+        page_indices (list): Zero-based page indices
+        
+    Yields:
+        tuple: (page_index, normalized_text, error), where error is None on success
+    """
+    with _open_pdf(pdf_path) as stream:
+        reader = PdfReader(stream)
+        for index in page_indices:
+            try:
+                page_text = reader.pages[index].extract_text() or ""
+            except Exception as e:
+                yield index, None, str(e)
+            else:
+                yield index, PDFProcessor._normalize_text(page_text), None
+
+
+def _iter_pdfplumber_pages(pdf_path, page_indices):
+    """
+    Extract and normalize the given pages with pdfplumber.
+    
+    Args:
+        pdf_path (str): Path to the PDF file
+        page_indices (list): Zero-based page indices, in ascending order
+        
+    Yields:
+        tuple: (page_index, normalized_text, error), where error is None on success
+    """
+    with _open_pdf(pdf_path) as stream, \
+            pdfplumber.open(stream, pages=[index + 1 for index in page_indices]) as pdf:
+        for index, page in zip(page_indices, pdf.pages):
+            try:
+                page_text = page.extract_text() or ""
+            except Exception as e:
+                yield index, None, str(e)
+            else:
+                yield index, PDFProcessor._normalize_text(page_text), None
+            finally:
+                # 释放页面缓存，避免长文档占用过多内存
+                page.close()
+
+
+def _iter_pdfminer_pages(pdf_path, page_indices):
+    """
+    Extract and normalize the given pages with pdfminer.six.
+    
+    Args:
+        pdf_path (str): Path to the PDF file
+        page_indices (list): Zero-based page indices, in ascending order
+        
+    Yields:
+        tuple: (page_index, normalized_text, error), where error is None on success
+    """
+    resource_manager = PDFResourceManager()
+    output = io.StringIO()
+    device = TextConverter(resource_manager, output, laparams=LAParams())
+    interpreter = PDFPageInterpreter(resource_manager, device)
+    
+    try:
+        with _open_pdf(pdf_path) as fp:
+            for index, page in zip(page_indices, PDFPage.get_pages(fp, set(page_indices))):
+                try:
+                    interpreter.process_page(page)
+                    page_text = output.getvalue()
+                except Exception as e:
+                    yield index, None, str(e)
+                else:
+                    yield index, PDFProcessor._normalize_text(page_text), None
+                finally:
+                    output.seek(0)
+                    output.truncate(0)
+    finally:
+        device.close()
+
+
+def _iter_low_dpi_ocr_pages(pdf_path, page_indices):
+    """
+    Extract and normalize the given pages with low-resolution OCR.
+    
+    Args:
+        pdf_path (str): Path to the PDF file
+        page_indices (list): Zero-based page indices
+        
+    Yields:
+        tuple: (page_index, normalized_text, error), where error is None on success
+    """
+    for index in page_indices:
+        try:
+            images = convert_from_path(
+                pdf_path, dpi=PDFProcessor.FALLBACK_OCR_DPI, first_page=index + 1, last_page=index + 1
+            )
+            page_text = pytesseract.image_to_string(images[0], lang='eng')
+        except Exception as e:
+            yield index, None, str(e)
+        else:
+            yield index, PDFProcessor._normalize_text(page_text), None
+
+
+# 各提取方法的逐页提取函数；OCR在此仅作为低分辨率备用方法使用
+_PAGE_ITERATORS = {
+    PDFProcessor.EXTRACT_METHOD_PYPDF2: _iter_pypdf2_pages,
+    PDFProcessor.EXTRACT_METHOD_PDFPLUMBER: _iter_pdfplumber_pages,
+    PDFProcessor.EXTRACT_METHOD_PDFMINER: _iter_pdfminer_pages,
+    PDFProcessor.EXTRACT_METHOD_OCR: _iter_low_dpi_ocr_pages,
+}
@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import threading
+from collections import deque
+
+class BackendHealth:
+    """
+    Rolling error rate and latency of one translation backend, with a
+    circuit breaker.
+
+    The breaker opens when the error rate over the recent window reaches the
+    threshold, or after several consecutive failures. While open the backend
+    receives no requests; after the cooldown a single probe request is let
+    through (half-open), and its outcome closes or reopens the breaker.
+
+    A backend whose recent successful requests take longer than the latency
+    limit on average counts as slow, and is chosen after backends that are not.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, name, window=None, error_threshold=None, consecutive_failures=None, cooldown=None,
+                 latency_limit=None):
+        """
+        Initialize BackendHealth.
+
+        Args:
+            name (str): Backend name
+            window (int): Number of recent requests tracked (defaults to FAILOVER_WINDOW or 20)
+            error_threshold (float): Error rate that opens the breaker
+                                     (defaults to FAILOVER_ERROR_THRESHOLD or 0.5)
+            consecutive_failures (int): Consecutive failures that open the breaker
+                                        (defaults to FAILOVER_CONSECUTIVE_FAILURES or 3)
+            cooldown (float): Seconds the breaker stays open (defaults to FAILOVER_COOLDOWN or 30)
+            latency_limit (float): Mean seconds per successful request above which the backend
+                                   is slow (defaults to FAILOVER_LATENCY_LIMIT or 60)
+        """
+        self.name = name
+        self.error_threshold = error_threshold or float(os.getenv('FAILOVER_ERROR_THRESHOLD', 0.5))
+        self.consecutive_failures = consecutive_failures or int(os.getenv('FAILOVER_CONSECUTIVE_FAILURES', 3))
+        self.cooldown = cooldown or float(os.getenv('FAILOVER_COOLDOWN', 30))
+        self.latency_limit = latency_limit or float(os.getenv('FAILOVER_LATENCY_LIMIT', 60))
+
+        # 每个元素为 (是否成功, 耗时秒数)
+        self._outcomes = deque(maxlen=window or int(os.getenv('FAILOVER_WINDOW', 20)))
+        self._failures_in_row = 0
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        """
+        Current breaker state, moving from open to half-open once the cooldown has passed.
+        """
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self):
+        """
+        Get the breaker state. Caller must hold the lock.
+        """
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+            self._state = self.HALF_OPEN
+            self._probing = False
+        return self._state
+
+    def error_rate(self):
+        """
+        Get the error rate over the recent window.
+
+        Returns:
+            float: Share of failed requests, 0 when nothing has been recorded
+        """
+        with self._lock:
+            return self._error_rate()
+
+    def _error_rate(self):
+        """
+        Get the error rate. Caller must hold the lock.
+        """
+        if not self._outcomes:
+            return 0.0
+        return sum(1 for success, _ in self._outcomes if not success) / len(self._outcomes)
+
+    def mean_latency(self):
+        """
+        Get the mean time of the successful requests in the recent window.
+
+        Returns:
+            float: Seconds, or None when no request has succeeded
+        """
+        with self._lock:
+            return self._mean_latency()
+
+    def _mean_latency(self):
+        """
+        Get the mean latency. Caller must hold the lock.
+        """
+        latencies = [latency for success, latency in self._outcomes if success]
+        return sum(latencies) / len(latencies) if latencies else None
+
+    def is_slow(self):
+        """
+        Check whether the backend's recent requests exceed the latency limit on average.
+
+        Returns:
+            bool: Whether the backend is slow
+        """
+        latency = self.mean_latency()
+        return latency is not None and latency > self.latency_limit
+
+    def try_acquire(self):
+        """
+        Check whether a request may be sent to the backend now.
+
+        In the half-open state only one probe request is allowed at a time.
+
+        Returns:
+            bool: Whether the request may be sent
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def release(self):
+        """
+        Give back the probe slot of a request that was abandoned before it finished.
+        """
+        with self._lock:
+            self._probing = False
+
+    def record_success(self, latency):
+        """
+        Record a successful request.
+
+        Args:
+            latency (float): Request time in seconds
+        """
+        with self._lock:
+            self._outcomes.append((True, latency))
+            self._failures_in_row = 0
+            if self._current_state() != self.CLOSED:
+                print(f"[DEBUG] {self.name}: 探测请求成功，恢复使用")
+                self._state = self.CLOSED
+                # 之前的失败记录不再代表当前状态
+                self._outcomes.clear()
+                self._outcomes.append((True, latency))
+            self._probing = False
+
+    def record_failure(self, latency):
+        """
+        Record a failed request, opening the breaker if the backend looks unhealthy.
+
+        Args:
+            latency (float): Request time in seconds
+        """
+        with self._lock:
+            self._outcomes.append((False, latency))
+            self._failures_in_row += 1
+            state = self._current_state()
+            min_samples = max(1, self._outcomes.maxlen // 4)
+            if state == self.HALF_OPEN or self._failures_in_row >= self.consecutive_failures or \
+                    (len(self._outcomes) >= min_samples and self._error_rate() >= self.error_threshold):
+                if state != self.OPEN:
+                    print(f"[DEBUG] {self.name}: 错误率过高，暂停使用 {self.cooldown:.0f} 秒")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+    def get_stats(self):
+        """
+        Get the health of the backend.
+
+        Returns:
+            dict: state, error_rate, mean_latency and requests in the window
+        """
+        with self._lock:
+            return {
+                'state': self._current_state(),
+                'error_rate': self._error_rate(),
+                'mean_latency': self._mean_latency(),
+                'requests': len(self._outcomes),
+            }
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+def get_backend_health(name):
+    """
+    Get the process-wide health tracker of a backend.
+
+    Args:
+        name (str): Backend name
+
+    Returns:
+        BackendHealth: Shared health tracker
+    """
+    with _backends_lock:
+        health = _backends.get(name)
+        if health is None:
+            health = BackendHealth(name)
+            _backends[name] = health
+        return health
@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import random
+import asyncio
+import hashlib
+import threading
+from email.utils import parsedate_to_datetime
+
+from .http_pool import HTTPSessionPool
+
+class RateLimiter:
+    """
+    Token-bucket rate limiter for one API provider and key, shared by every
+    translator and vocabulary call in the process.
+
+    Requests take a token before they are sent. A 429 response pauses all
+    callers until its Retry-After has passed, and when 429s cluster the refill
+    rate is halved. Each successful request then raises the rate a little until
+    it is back at the configured rate.
+    """
+
+    # 在这段时间（秒）内出现多次429视为集中限流
+    THROTTLE_WINDOW = 10.0
+    # 降速后的最低速率（相对于配置速率的比例）和每次成功后的恢复量
+    MIN_RATE_FACTOR = 0.1
+    RECOVERY_FACTOR = 0.05
+
+    def __init__(self, rate=None, burst=None, max_retries=None, max_backoff=None):
+        """
+        Initialize RateLimiter.
+
+        Args:
+            rate (float): Requests per second (defaults to RATE_LIMIT_RPS or 5)
+            burst (int): Bucket capacity (defaults to RATE_LIMIT_BURST or 10)
+            max_retries (int): Retries after a 429 response (defaults to RATE_LIMIT_RETRIES or 5)
+            max_backoff (float): Maximum backoff in seconds (defaults to RATE_LIMIT_MAX_BACKOFF or 60)
+        """
+        self.base_rate = rate or float(os.getenv('RATE_LIMIT_RPS', 5))
+        self.burst = burst or int(os.getenv('RATE_LIMIT_BURST', 10))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv('RATE_LIMIT_RETRIES', 5))
+        self.max_backoff = max_backoff or float(os.getenv('RATE_LIMIT_MAX_BACKOFF', 60))
+
+        self.rate = self.base_rate
+        self.throttled = 0
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._recent_throttles = []
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        """
+        Take one token, allowing the bucket to go negative.
+
+        Returns:
+            float: Seconds the caller must wait before sending
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return max(wait, self._blocked_until - now)
+
+    def acquire(self):
+        """
+        Block until a request may be sent.
+        """
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """
+        Wait until a request may be sent, without blocking the event loop.
+        """
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def on_success(self):
+        """
+        Record a successful request and recover the rate towards the configured rate.
+        """
+        with self._lock:
+            if self.rate < self.base_rate:
+                self.rate = min(self.base_rate, self.rate + self.base_rate * self.RECOVERY_FACTOR)
+
+    def on_throttled(self, attempt, retry_after=None):
+        """
+        Record a 429 response and compute how long to back off.
+
+        Args:
+            attempt (int): Zero-based retry attempt of the request
+            retry_after (float): Seconds requested by the server's Retry-After header
+
+        Returns:
+            float: Seconds to wait before retrying
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.throttled += 1
+            self._recent_throttles = [t for t in self._recent_throttles if now - t < self.THROTTLE_WINDOW]
+            self._recent_throttles.append(now)
+
+            # 短时间内多次被限流，说明配置的速率过高，减半
+            if len(self._recent_throttles) > 1:
+                self.rate = max(self.base_rate * self.MIN_RATE_FACTOR, self.rate / 2)
+
+            if retry_after is not None:
+                delay = min(retry_after, self.max_backoff)
+            else:
+                # 指数退避加完全抖动，避免多个调用方同时重试
+                delay = random.uniform(0, min(self.max_backoff, 2 ** attempt))
+
+            # 其他调用方在这段时间内也暂停发送
+            self._blocked_until = max(self._blocked_until, now + delay)
+            return delay
+
+
+def parse_retry_after(value):
+    """
+    Parse a Retry-After header, given either as seconds or as an HTTP date.
+
+    Args:
+        value (str): Header value
+
+    Returns:
+        float: Seconds to wait, or None if the header is missing or invalid
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def request_with_rate_limit(send, api_url, api_key):
+    """
+    Send a request through the shared rate limiter, retrying on 429 responses.
+
+    Args:
+        send (callable): Function sending the request and returning a requests.Response
+        api_url (str): API URL
+        api_key (str): API key used by the request
+
+    Returns:
+        requests.Response: Final response (still 429 if all retries were throttled)
+    """
+    limiter = get_rate_limiter(api_url, api_key)
+    for attempt in range(limiter.max_retries + 1):
+        limiter.acquire()
+        response = send()
+        if response.status_code != 429:
+            # 只有成功的响应才说明当前速率可行，5xx等错误不应让速率回升
+            if 200 <= response.status_code < 300:
+                limiter.on_success()
+            return response
+        if attempt == limiter.max_retries:
+            return response
+
+        delay = limiter.on_throttled(attempt, parse_retry_after(response.headers.get('Retry-After')))
+        # 释放429响应占用的连接，重试期间连接可以归还连接池
+        response.close()
+        print(f"[DEBUG] 服务器繁忙 (429)，{delay:.1f}秒后自动重试 ({attempt + 1}/{limiter.max_retries})")
+        time.sleep(delay)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_rate_limiter(api_url, api_key):
+    """
+    Get the process-wide rate limiter of an API provider and key.
+
+    Args:
+        api_url (str): API URL
+        api_key (str): API key
+
+    Returns:
+        RateLimiter: Shared rate limiter
+    """
+    key = (HTTPSessionPool.base_url(api_url), hashlib.sha256((api_key or '').encode('utf-8')).hexdigest())
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = RateLimiter()
+            _limiters[key] = limiter
+        return limiter
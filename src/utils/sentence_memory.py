@@ -0,0 +1,443 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import time
+import atexit
+import struct
+import hashlib
+import sqlite3
+import threading
+
+import numpy as np
+
+from .text_utils import estimate_tokens
+
+# 梅森素数，作为MinHash哈希函数的模数；n-gram哈希和哈希参数都小于2^32，
+# a * h + b 不超过2^64，可以直接用uint64计算
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+# 数字和否定词改变一个就会改变句意，相似句子之间必须完全一致才能复用
+_PROTECTED_TOKENS = re.compile(r"\d+(?:[.,:/]\d+)*|\b(?:not|no|never|none|nor|without)\b|n't\b")
+
+class SentenceMemory:
+    """
+    Fuzzy sentence-level translation memory, stored in a local SQLite database.
+
+    Each source sentence is indexed by a MinHash signature of its character
+    n-grams, split into LSH bands. A lookup only compares against sentences that
+    share at least one band, and reuses the stored translation of the most
+    similar one if its n-gram Jaccard similarity reaches the threshold. This lets
+    a revised edition that changes a few words per paragraph reuse the
+    translations of every unchanged or near-identical sentence. Sentences whose
+    numbers or negations differ are never treated as similar.
+
+    Signatures are computed with numpy and the last-used times of reused
+    sentences are written in batches (on the next store, at most every
+    TOUCH_FLUSH_INTERVAL seconds, and at exit). Lookups and stores still block,
+    so async callers should run them in an executor.
+    """
+
+    NGRAM_SIZE = 4
+    NUM_PERMUTATIONS = 64
+    BANDS = 16
+
+    # 签名算法的版本号，包含在LSH分桶的键中，修改 _signature 后需递增
+    SIGNATURE_VERSION = 2
+
+    # 每写入多少条检查一次容量限制
+    EVICTION_INTERVAL = 100
+
+    # 两次写入复用记录之间至少间隔的秒数
+    TOUCH_FLUSH_INTERVAL = 30
+
+    def __init__(self, db_path=None, threshold=None, max_entries=None):
+        """
+        Initialize SentenceMemory.
+
+        Args:
+            db_path (str): Path to the SQLite database file
+                           (defaults to SENTENCE_MEMORY_PATH or ~/.pdf_assistant/sentence_memory.db)
+            threshold (float): Minimum similarity for reusing a translation
+                               (defaults to SENTENCE_MEMORY_THRESHOLD or 0.9)
+            max_entries (int): Maximum number of stored sentences
+                               (defaults to SENTENCE_MEMORY_MAX_ENTRIES or 200000)
+        """
+        self.db_path = db_path or os.getenv('SENTENCE_MEMORY_PATH') or os.path.join(
+            os.path.expanduser('~'), '.pdf_assistant', 'sentence_memory.db'
+        )
+        self.threshold = threshold or float(os.getenv('SENTENCE_MEMORY_THRESHOLD', 0.9))
+        self.max_entries = max_entries or int(os.getenv('SENTENCE_MEMORY_MAX_ENTRIES', 200000))
+
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir, exist_ok=True)
+
+        # 固定种子的哈希参数，保证不同进程计算出的签名一致
+        permutations = []
+        for i in range(self.NUM_PERMUTATIONS):
+            seed = hashlib.sha256(f"minhash-{i}".encode('utf-8')).digest()
+            a, b = struct.unpack('<II', seed[:8])
+            permutations.append((a or 1, b))
+        self._a, self._b = (np.array(values, dtype=np.uint64)[:, None] for values in zip(*permutations))
+
+        self._puts_since_eviction = 0
+        # 尚未写入数据库的复用：句子ID到最近使用时间
+        self._touches = {}
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            """CREATE TABLE IF NOT EXISTS sentences (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                model TEXT NOT NULL,
+                prompt_version INTEGER NOT NULL,
+                source TEXT NOT NULL,
+                translation TEXT NOT NULL,
+                last_used REAL NOT NULL,
+                UNIQUE (model, prompt_version, source)
+            )"""
+        )
+        self._connection.execute(
+            """CREATE TABLE IF NOT EXISTS bands (
+                band_key TEXT NOT NULL,
+                sentence_id INTEGER NOT NULL
+            )"""
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS bands_key ON bands (band_key)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS bands_sentence ON bands (sentence_id)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS sentences_last_used ON sentences (last_used)")
+        self._connection.commit()
+        atexit.register(self.flush)
+
+    @staticmethod
+    def normalize(sentence):
+        """
+        Normalize a sentence for comparison.
+
+        Args:
+            sentence (str): Sentence text
+
+        Returns:
+            str: Lowercased text with collapsed whitespace
+        """
+        return re.sub(r'\s+', ' ', sentence or '').strip().lower()
+
+    def _shingles(self, sentence):
+        """
+        Get the character n-grams of a normalized sentence.
+
+        Args:
+            sentence (str): Normalized sentence
+
+        Returns:
+            set: Character n-grams
+        """
+        if len(sentence) <= self.NGRAM_SIZE:
+            return {sentence}
+        return {sentence[i:i + self.NGRAM_SIZE] for i in range(len(sentence) - self.NGRAM_SIZE + 1)}
+
+    def _signature(self, shingles):
+        """
+        Compute the MinHash signature of a set of n-grams.
+
+        Args:
+            shingles (set): Character n-grams
+
+        Returns:
+            list: Signature of NUM_PERMUTATIONS values
+        """
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=4).digest(), 'little')
+             for shingle in shingles),
+            dtype=np.uint64, count=len(shingles)
+        )
+        # 每行一个哈希函数，对所有n-gram取最小值
+        return (((self._a * hashes + self._b) % _MERSENNE_PRIME) & _MAX_HASH).min(axis=1).tolist()
+
+    def _band_keys(self, model, prompt_version, signature):
+        """
+        Split a signature into LSH band keys.
+
+        Args:
+            model (str): Model identifier
+            prompt_version (int): Version of the prompt template
+            signature (list): MinHash signature
+
+        Returns:
+            list: One key per band
+        """
+        rows = self.NUM_PERMUTATIONS // self.BANDS
+        return [
+            hashlib.blake2b(
+                f"{model}\0{prompt_version}\0{self.SIGNATURE_VERSION}\0{band}\0"
+                f"{signature[band * rows:(band + 1) * rows]}".encode('utf-8'),
+                digest_size=12
+            ).hexdigest()
+            for band in range(self.BANDS)
+        ]
+
+    @staticmethod
+    def _jaccard(first, second):
+        """
+        Compute the Jaccard similarity of two sets.
+
+        Returns:
+            float: Similarity between 0 and 1
+        """
+        if not first or not second:
+            return 0.0
+        return len(first & second) / len(first | second)
+
+    def lookup(self, model, prompt_version, sentence):
+        """
+        Find the stored translation of the most similar sentence.
+
+        Args:
+            model (str): Model identifier
+            prompt_version (int): Version of the prompt template
+            sentence (str): Source sentence
+
+        Returns:
+            tuple: (translation, similarity), or None if nothing reaches the threshold
+        """
+        return self.lookup_many(model, prompt_version, [sentence])[0]
+
+    def lookup_many(self, model, prompt_version, sentences):
+        """
+        Find the stored translations of several sentences under one lock.
+
+        Args:
+            model (str): Model identifier
+            prompt_version (int): Version of the prompt template
+            sentences (list): Source sentences
+
+        Returns:
+            list: (translation, similarity) or None for each sentence, in order
+        """
+        queries = []
+        for sentence in sentences:
+            normalized = self.normalize(sentence)
+            shingles = self._shingles(normalized)
+            queries.append((normalized, shingles, self._band_keys(model, prompt_version, self._signature(shingles))))
+
+        matches = []
+        now = time.time()
+        with self._lock:
+            for normalized, shingles, band_keys in queries:
+                best = self._best_match(normalized, shingles, band_keys)
+                if best is None:
+                    matches.append(None)
+                    continue
+                self._touches[best[0]] = now
+                matches.append((best[1], best[2]))
+
+            if self._touches and time.monotonic() - self._last_flush >= self.TOUCH_FLUSH_INTERVAL:
+                self._flush_touches()
+                self._connection.commit()
+        return matches
+
+    def _best_match(self, normalized, shingles, band_keys):
+        """
+        Find the most similar stored sentence sharing a band. Caller must hold the lock.
+
+        Args:
+            normalized (str): Normalized source sentence
+            shingles (set): Its character n-grams
+            band_keys (list): Its LSH band keys
+
+        Returns:
+            tuple: (sentence id, translation, similarity), or None if nothing reaches the threshold
+        """
+        placeholders = ','.join('?' * len(band_keys))
+        candidates = self._connection.execute(
+            f"SELECT DISTINCT s.id, s.source, s.translation FROM bands b "
+            f"JOIN sentences s ON s.id = b.sentence_id WHERE b.band_key IN ({placeholders})",
+            band_keys
+        ).fetchall()
+
+        best = None
+        protected = _PROTECTED_TOKENS.findall(normalized)
+        for sentence_id, source, translation in candidates:
+            if source != normalized and _PROTECTED_TOKENS.findall(source) != protected:
+                continue
+            similarity = 1.0 if source == normalized else self._jaccard(shingles, self._shingles(source))
+            if similarity >= self.threshold and (best is None or similarity > best[2]):
+                best = (sentence_id, translation, similarity)
+        return best
+
+    def store(self, model, prompt_version, pairs):
+        """
+        Store translated sentences.
+
+        Args:
+            model (str): Model identifier
+            prompt_version (int): Version of the prompt template
+            pairs (list): (source sentence, translation) tuples
+        """
+        entries = []
+        for source, translation in pairs:
+            normalized = self.normalize(source)
+            if normalized and translation:
+                entries.append((normalized, translation,
+                                self._band_keys(model, prompt_version, self._signature(self._shingles(normalized)))))
+
+        now = time.time()
+        with self._lock:
+            self._flush_touches()
+            for normalized, translation, band_keys in entries:
+                row = self._connection.execute(
+                    "SELECT id FROM sentences WHERE model = ? AND prompt_version = ? AND source = ?",
+                    (model, prompt_version, normalized)
+                ).fetchone()
+                if row:
+                    self._connection.execute(
+                        "UPDATE sentences SET translation = ?, last_used = ? WHERE id = ?",
+                        (translation, now, row[0])
+                    )
+                    continue
+
+                sentence_id = self._connection.execute(
+                    "INSERT INTO sentences (model, prompt_version, source, translation, last_used) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (model, prompt_version, normalized, translation, now)
+                ).lastrowid
+                self._connection.executemany(
+                    "INSERT INTO bands (band_key, sentence_id) VALUES (?, ?)",
+                    [(band_key, sentence_id) for band_key in band_keys]
+                )
+                self._puts_since_eviction += 1
+
+            if self._puts_since_eviction >= self.EVICTION_INTERVAL:
+                self._evict()
+            self._connection.commit()
+
+    def flush(self):
+        """
+        Write the pending last-used times of reused sentences to the database.
+        """
+        with self._lock:
+            self._flush_touches()
+            self._connection.commit()
+
+    def _flush_touches(self):
+        """
+        Write the pending last-used times without committing. Caller must hold the lock.
+        """
+        if self._touches:
+            self._connection.executemany(
+                "UPDATE sentences SET last_used = ? WHERE id = ?",
+                [(last_used, sentence_id) for sentence_id, last_used in self._touches.items()]
+            )
+            self._touches = {}
+        self._last_flush = time.monotonic()
+
+    def _evict(self):
+        """
+        Remove least recently used sentences above the entry limit. Caller must hold the lock.
+        """
+        self._puts_since_eviction = 0
+        count = self._connection.execute("SELECT COUNT(*) FROM sentences").fetchone()[0]
+        if count <= self.max_entries:
+            return
+
+        stale_ids = [(row[0],) for row in self._connection.execute(
+            "SELECT id FROM sentences ORDER BY last_used LIMIT ?", (count - self.max_entries,)
+        ).fetchall()]
+        self._connection.executemany("DELETE FROM bands WHERE sentence_id = ?", stale_ids)
+        self._connection.executemany("DELETE FROM sentences WHERE id = ?", stale_ids)
+
+    def clear(self):
+        """
+        Remove all stored sentences.
+        """
+        with self._lock:
+            self._touches = {}
+            self._connection.execute("DELETE FROM bands")
+            self._connection.execute("DELETE FROM sentences")
+            self._connection.commit()
+
+
+class ReuseReport:
+    """
+    Thread-safe tally of how much of one document was answered from translation memory,
+    and of the chunks whose reply was still truncated after every continuation.
+    """
+
+    def __init__(self):
+        """
+        Initialize an empty report.
+        """
+        self._lock = threading.Lock()
+        self.sentences = 0
+        self.reused_sentences = 0
+        self.tokens_saved = 0
+        self.truncated_chunks = 0
+
+    def add(self, sentences, reused_sentences, tokens_saved):
+        """
+        Add the outcome of one chunk.
+
+        Args:
+            sentences (int): Number of sentences in the chunk
+            reused_sentences (int): Number of sentences answered from memory
+            tokens_saved (int): Estimated prompt and completion tokens not sent
+        """
+        with self._lock:
+            self.sentences += sentences
+            self.reused_sentences += reused_sentences
+            self.tokens_saved += tokens_saved
+
+    def add_reused_text(self, sentences, source, translation):
+        """
+        Add sentences whose translation was reused without an API call.
+
+        Args:
+            sentences (int): Number of reused sentences
+            source (str): Reused source text
+            translation (str): Reused translation
+        """
+        self.add(sentences, sentences, estimate_tokens(source) + estimate_tokens(translation))
+
+    def add_truncated(self):
+        """
+        Count a chunk whose translation is incomplete because the reply was truncated.
+        """
+        with self._lock:
+            self.truncated_chunks += 1
+
+    def as_dict(self):
+        """
+        Get the report as a dictionary.
+
+        Returns:
+            dict: sentences, reused_sentences, reuse_rate, tokens_saved and truncated_chunks
+        """
+        with self._lock:
+            return {
+                'sentences': self.sentences,
+                'reused_sentences': self.reused_sentences,
+                'reuse_rate': self.reused_sentences / self.sentences if self.sentences else 0.0,
+                'tokens_saved': self.tokens_saved,
+                'truncated_chunks': self.truncated_chunks,
+            }
+
+
+_default_memory = None
+_default_memory_lock = threading.Lock()
+
+def get_default_sentence_memory():
+    """
+    Get the process-wide sentence memory, creating it on first use.
+
+    Returns:
+        SentenceMemory: Shared sentence memory
+    """
+    global _default_memory
+    with _default_memory_lock:
+        if _default_memory is None:
+            _default_memory = SentenceMemory()
+        return _default_memory
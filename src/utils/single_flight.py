@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+import hashlib
+import json
+import threading
+
+class _SharedStream:
+    """
+    One streaming API response read once and replayed to every subscriber.
+    """
+
+    def __init__(self):
+        """
+        Initialize an empty shared stream.
+        """
+        self.items = []
+        self.done = False
+        self.error = None
+        self.subscribers = 0
+        self.task = None
+        self._changed = asyncio.Event()
+
+    def notify(self):
+        """
+        Wake up subscribers waiting for new items.
+        """
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait(self):
+        """
+        Wait until a new item arrives or the stream ends.
+        """
+        await self._changed.wait()
+
+
+class SingleFlight:
+    """
+    Coalesces identical API requests that are in flight at the same time.
+
+    The first caller of a key sends the request; every caller arriving
+    before it finishes waits for that request and receives the same result
+    (or error). Completed requests are not cached here; that is the job of
+    the translation memory.
+    """
+
+    def __init__(self):
+        """
+        Initialize SingleFlight.
+        """
+        self.calls = 0
+        self.coalesced = 0
+        self._tasks = {}
+        self._streams = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(*parts):
+        """
+        Build a request key from JSON-serializable parts.
+
+        Returns:
+            str: Hex digest identifying the request
+        """
+        return hashlib.sha256(json.dumps(parts, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def _count(self, coalesced):
+        """
+        Count a call. Caller must hold the lock.
+        """
+        self.calls += 1
+        if coalesced:
+            self.coalesced += 1
+
+    async def call_async(self, key, function):
+        """
+        Await a request, or the identical one already in flight.
+
+        The request runs as its own task, so cancelling one waiter does not
+        cancel it for the others; it is cancelled only when every waiter is gone.
+
+        Args:
+            key (str): Request key
+            function (callable): Returns a coroutine sending the request
+
+        Returns:
+            The request's result
+        """
+        key = (asyncio.get_running_loop(), key)
+        with self._lock:
+            entry = self._tasks.get(key)
+            self._count(entry is not None)
+            if entry is None:
+                entry = [asyncio.ensure_future(function()), 0]
+                entry[0].add_done_callback(lambda _: self._forget(self._tasks, key, entry))
+                self._tasks[key] = entry
+            entry[1] += 1
+
+        try:
+            return await asyncio.shield(entry[0])
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0 and not entry[0].done():
+                    entry[0].cancel()
+
+    async def stream(self, key, open_stream):
+        """
+        Iterate a streaming request, sharing it with identical requests in flight.
+
+        Subscribers joining late first receive every item already read.
+
+        Args:
+            key (str): Request key
+            open_stream (callable): Returns an async iterator over the response
+
+        Yields:
+            Items of the response
+        """
+        key = (asyncio.get_running_loop(), key)
+        with self._lock:
+            shared = self._streams.get(key)
+            self._count(shared is not None)
+            if shared is None:
+                shared = _SharedStream()
+                shared.task = asyncio.ensure_future(self._read_stream(shared, open_stream))
+                shared.task.add_done_callback(lambda _: self._forget(self._streams, key, shared))
+                self._streams[key] = shared
+            shared.subscribers += 1
+
+        index = 0
+        try:
+            while True:
+                if index < len(shared.items):
+                    index += 1
+                    yield shared.items[index - 1]
+                elif shared.done:
+                    if shared.error is not None:
+                        raise shared.error
+                    return
+                else:
+                    await shared.wait()
+        finally:
+            with self._lock:
+                shared.subscribers -= 1
+                if shared.subscribers == 0 and not shared.task.done():
+                    shared.task.cancel()
+
+    @staticmethod
+    async def _read_stream(shared, open_stream):
+        """
+        Read a streaming response into a shared stream.
+        """
+        stream = open_stream()
+        try:
+            async for item in stream:
+                shared.items.append(item)
+                shared.notify()
+        except Exception as e:
+            shared.error = e
+        except asyncio.CancelledError:
+            shared.error = Exception("请求已取消")
+            raise
+        finally:
+            shared.done = True
+            shared.notify()
+            if hasattr(stream, 'aclose'):
+                await stream.aclose()
+
+    def _forget(self, entries, key, entry):
+        """
+        Remove a finished request so later callers send a new one.
+        """
+        with self._lock:
+            if entries.get(key) is entry:
+                del entries[key]
+
+    def get_stats(self):
+        """
+        Get coalescing statistics.
+
+        Returns:
+            dict: calls, coalesced, coalesce_rate and in_flight
+        """
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'coalesced': self.coalesced,
+                'coalesce_rate': self.coalesced / self.calls if self.calls else 0.0,
+                'in_flight': len(self._tasks) + len(self._streams),
+            }
+
+
+_default_single_flight = None
+_default_single_flight_lock = threading.Lock()
+
+def get_default_single_flight():
+    """
+    Get the process-wide request coalescer, creating it on first use.
+
+    Returns:
+        SingleFlight: Shared request coalescer
+    """
+    global _default_single_flight
+    with _default_single_flight_lock:
+        if _default_single_flight is None:
+            _default_single_flight = SingleFlight()
+        return _default_single_flight
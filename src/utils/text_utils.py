@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import re
+
+# 按DeepSeek的换算规则估算：1个英文字符约0.3个token，1个中文字符约0.6个token
+ASCII_TOKENS_PER_CHAR = 0.3
+CJK_TOKENS_PER_CHAR = 0.6
+
+_CJK_PATTERN = re.compile(r'[　-〿一-鿿＀-￯]')
+
+# 句末标点（可带右引号/括号）后接空白，且下一句以大写字母、数字或左引号/括号开头
+_SENTENCE_BOUNDARY = re.compile(r'([.!?]["\')\]]*)\s+(?=["\'(\[]?[A-Z0-9])')
+
+# 中文句末标点（可带右引号/括号），其后即为下一句
+_CHINESE_SENTENCE_END = re.compile(r'[。！？]+[”’」』）)]*')
+
+# 以句点结尾但通常不表示句子结束的缩写
+_ABBREVIATIONS = {'mr', 'mrs', 'ms', 'dr', 'prof', 'st', 'vs', 'etc', 'e.g', 'i.e', 'fig', 'no', 'vol', 'al'}
+
+def estimate_tokens(text):
+    """
+    Estimate the number of tokens a text uses, without a tokenizer.
+
+    Args:
+        text (str): Text to measure
+
+    Returns:
+        int: Estimated token count
+    """
+    if not text:
+        return 0
+    cjk_chars = len(_CJK_PATTERN.findall(text))
+    return int(round(cjk_chars * CJK_TOKENS_PER_CHAR + (len(text) - cjk_chars) * ASCII_TOKENS_PER_CHAR))
+
+def split_sentences(paragraph):
+    """
+    Split an English paragraph into sentences. Line breaks inside the
+    paragraph are treated as spaces.
+
+    Args:
+        paragraph (str): Paragraph text
+
+    Returns:
+        list: Sentences, without surrounding whitespace
+    """
+    text = re.sub(r'\s+', ' ', paragraph).strip()
+    sentences = []
+    start = 0
+
+    for match in _SENTENCE_BOUNDARY.finditer(text):
+        end = match.end(1)
+        last_word = text[start:end].rsplit(' ', 1)[-1].rstrip('.').lower()
+        if last_word in _ABBREVIATIONS:
+            continue
+        sentences.append(text[start:end])
+        start = match.end()
+
+    if start < len(text):
+        sentences.append(text[start:])
+    return sentences
+
+def split_chinese_sentences(paragraph):
+    """
+    Split a Chinese paragraph into sentences at full-width sentence-ending
+    punctuation. Line breaks inside the paragraph are removed.
+
+    Args:
+        paragraph (str): Paragraph text
+
+    Returns:
+        list: Sentences, each keeping its closing punctuation
+    """
+    text = re.sub(r'\s*\n\s*', '', paragraph).strip()
+    sentences = []
+    start = 0
+
+    for match in _CHINESE_SENTENCE_END.finditer(text):
+        sentences.append(text[start:match.end()].strip())
+        start = match.end()
+
+    if text[start:].strip():
+        sentences.append(text[start:].strip())
+    return [sentence for sentence in sentences if sentence]
@@ -0,0 +1,274 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import time
+import atexit
+import hashlib
+import sqlite3
+import threading
+
+class TranslationMemory:
+    """
+    Persistent cache of LLM results per text chunk, stored in a local SQLite database.
+
+    Entries are keyed by normalized chunk text, task (translation or vocabulary),
+    model name, prompt version and temperature, so a chunk that was already
+    processed the same way is answered without calling the API. The least
+    recently used entries are evicted when the entry or size limit is exceeded.
+
+    Hits only update an in-memory record of when each entry was last used;
+    the records are written in one transaction on the next put, at most every
+    TOUCH_FLUSH_INTERVAL seconds, and at exit, so a lookup does not commit.
+    """
+
+    # 每写入多少条检查一次容量限制
+    EVICTION_INTERVAL = 100
+
+    # 两次写入命中记录之间至少间隔的秒数
+    TOUCH_FLUSH_INTERVAL = 30
+
+    def __init__(self, db_path=None, max_entries=None, max_bytes=None):
+        """
+        Initialize TranslationMemory.
+
+        Args:
+            db_path (str): Path to the SQLite database file
+                           (defaults to TRANSLATION_MEMORY_PATH or ~/.pdf_assistant/translation_memory.db)
+            max_entries (int): Maximum number of stored entries
+                               (defaults to TRANSLATION_MEMORY_MAX_ENTRIES or 100000)
+            max_bytes (int): Maximum total size of stored results in bytes
+                             (defaults to TRANSLATION_MEMORY_MAX_MB or 200 MB)
+        """
+        self.db_path = db_path or os.getenv('TRANSLATION_MEMORY_PATH') or os.path.join(
+            os.path.expanduser('~'), '.pdf_assistant', 'translation_memory.db'
+        )
+        self.max_entries = max_entries or int(os.getenv('TRANSLATION_MEMORY_MAX_ENTRIES', 100000))
+        self.max_bytes = max_bytes or int(float(os.getenv('TRANSLATION_MEMORY_MAX_MB', 200)) * 1024 * 1024)
+
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir, exist_ok=True)
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._puts_since_eviction = 0
+
+        # 尚未写入数据库的命中：键到 (最近使用时间, 命中次数)
+        self._touches = {}
+        self._last_flush = time.monotonic()
+
+        # 翻译器在多个线程和事件循环中共享同一个对象
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            """CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                task TEXT NOT NULL,
+                model TEXT NOT NULL,
+                prompt_version INTEGER NOT NULL,
+                temperature REAL NOT NULL,
+                result TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL,
+                hit_count INTEGER NOT NULL DEFAULT 0
+            )"""
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+        self._connection.commit()
+
+        with self._lock:
+            self._evict()
+        atexit.register(self.flush)
+
+    @staticmethod
+    def normalize(text):
+        """
+        Normalize chunk text so whitespace-only differences map to the same entry.
+
+        Args:
+            text (str): Chunk text
+
+        Returns:
+            str: Normalized text
+        """
+        return re.sub(r'\s+', ' ', text or '').strip()
+
+    @classmethod
+    def make_key(cls, task, model, prompt_version, temperature, text):
+        """
+        Build the lookup key of a chunk.
+
+        Args:
+            task (str): "translation" or "vocabulary"
+            model (str): Model identifier
+            prompt_version (int): Version of the prompt template
+            temperature (float): Sampling temperature
+            text (str): Chunk text
+
+        Returns:
+            str: Hex digest identifying the entry
+        """
+        digest = hashlib.sha256()
+        for part in (task, model, str(prompt_version), repr(float(temperature)), cls.normalize(text)):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def get(self, task, model, prompt_version, temperature, text):
+        """
+        Look up the stored result of a chunk.
+
+        Args:
+            task (str): "translation" or "vocabulary"
+            model (str): Model identifier
+            prompt_version (int): Version of the prompt template
+            temperature (float): Sampling temperature
+            text (str): Chunk text
+
+        Returns:
+            str: Stored result, or None on a miss
+        """
+        key = self.make_key(task, model, prompt_version, temperature, text)
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT result FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            _, count = self._touches.get(key, (None, 0))
+            self._touches[key] = (time.time(), count + 1)
+            if time.monotonic() - self._last_flush >= self.TOUCH_FLUSH_INTERVAL:
+                self._flush_touches()
+        return row[0]
+
+    def put(self, task, model, prompt_version, temperature, text, result):
+        """
+        Store the result of a chunk.
+
+        Args:
+            task (str): "translation" or "vocabulary"
+            model (str): Model identifier
+            prompt_version (int): Version of the prompt template
+            temperature (float): Sampling temperature
+            text (str): Chunk text
+            result (str): Result to store
+        """
+        key = self.make_key(task, model, prompt_version, temperature, text)
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO entries "
+                "(key, task, model, prompt_version, temperature, result, size, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, task, model, prompt_version, float(temperature), result,
+                 len(result.encode('utf-8')), now, now)
+            )
+            self._touches.pop(key, None)
+            self._flush_touches()
+
+            self._puts_since_eviction += 1
+            if self._puts_since_eviction >= self.EVICTION_INTERVAL:
+                self._evict()
+
+    def flush(self):
+        """
+        Write the pending last-used times of hit entries to the database.
+        """
+        with self._lock:
+            self._flush_touches()
+
+    def _flush_touches(self):
+        """
+        Write the pending hits and commit. Caller must hold the lock.
+        """
+        if self._touches:
+            self._connection.executemany(
+                "UPDATE entries SET last_used = ?, hit_count = hit_count + ? WHERE key = ?",
+                [(last_used, count, key) for key, (last_used, count) in self._touches.items()]
+            )
+            self._touches = {}
+        self._connection.commit()
+        self._last_flush = time.monotonic()
+
+    def _evict(self):
+        """
+        Remove least recently used entries until both limits are met. Caller must hold the lock.
+        """
+        self._puts_since_eviction = 0
+        # 按最近使用时间淘汰，先写入尚未保存的命中
+        self._flush_touches()
+
+        count, total_size = self._connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()
+        if count <= self.max_entries and total_size <= self.max_bytes:
+            return
+
+        # 按最近使用时间从旧到新删除，直到数量和大小都不超过限制
+        removed = 0
+        for key, size in self._connection.execute(
+            "SELECT key, size FROM entries ORDER BY last_used"
+        ).fetchall():
+            if count - removed <= self.max_entries and total_size <= self.max_bytes:
+                break
+            self._connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+            removed += 1
+            total_size -= size
+
+        self._connection.commit()
+        self.evictions += removed
+
+    def get_stats(self):
+        """
+        Get hit/miss counters of this process and the size of the memory.
+
+        Returns:
+            dict: Statistics with hits, misses, hit_rate, evictions, entries and size_bytes
+        """
+        with self._lock:
+            count, total_size = self._connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': count,
+                'size_bytes': total_size,
+            }
+
+    def clear(self):
+        """
+        Remove all stored entries.
+        """
+        with self._lock:
+            self._touches = {}
+            self._connection.execute("DELETE FROM entries")
+            self._connection.commit()
+
+
+_default_memory = None
+_default_memory_lock = threading.Lock()
+
+def get_default_memory():
+    """
+    Get the process-wide translation memory, creating it on first use.
+
+    Returns:
+        TranslationMemory: Shared translation memory
+    """
+    global _default_memory
+    with _default_memory_lock:
+        if _default_memory is None:
+            _default_memory = TranslationMemory()
+        return _default_memory
@@ -2,101 +2,1646 @@
 # -*- coding: utf-8 -*-
 
 import os
+import copy
 import json
-import requests
-from dotenv import load_dotenv
+import time
+import asyncio
+import threading
+import aiohttp
+from contextlib import asynccontextmanager
+from dotenv import load_dotenv, find_dotenv
 import re
 
+from .http_pool import HTTPSessionPool, get_async_session, resolve_api_url
+from .async_runtime import iterate_sync, run_sync
+from .translation_memory import get_default_memory
+from .sentence_memory import ReuseReport, get_default_sentence_memory
+from .text_utils import estimate_tokens, split_sentences, split_chinese_sentences
+from .rate_limiter import get_rate_limiter, parse_retry_after
+from .hedging import get_default_hedger
+from .provider_health import BackendHealth, get_backend_health
+from .single_flight import SingleFlight, get_default_single_flight
+from .micro_batch import get_default_micro_batcher
+from .usage_ledger import UsageLedger, add_usage, normalize_usage
+from .chunk_router import ChunkRouter
+from .deadline import DeadlineSchedule
+from .output_budget import get_default_output_budget
+from .document_diff import chunk_units
+
+_environment = {'loaded': False, 'path': None, 'mtime': None}
+_environment_lock = threading.Lock()
+
+def load_environment(force=False):
+    """
+    加载.env文件中的配置
+    
+    只在第一次调用、文件被修改后或force为True时才重新读取文件，其余调用只检查修改时间。
+    
+    Args:
+        force (bool): 是否强制重新读取
+        
+    Returns:
+        bool: 这次调用是否重新读取了配置
+    """
+    with _environment_lock:
+        if _environment['path'] is None:
+            _environment['path'] = find_dotenv()
+        path = _environment['path']
+        mtime = os.path.getmtime(path) if path and os.path.exists(path) else None
+        
+        if _environment['loaded'] and not force and mtime == _environment['mtime']:
+            return False
+        
+        load_dotenv(path or None, override=True)
+        _environment['loaded'] = True
+        _environment['mtime'] = mtime
+        return True
+
+
+class ChunkTranslationError(Exception):
+    """
+    部分文本块在重试后仍处理失败时抛出，保留已成功块的结果
+    """
+    def __init__(self, message, results, errors):
+        """
+        初始化异常
+        
+        Args:
+            message (str): 错误信息
+            results (list): 按原顺序排列的各块结果，失败的块为None
+            errors (dict): 失败块的序号到异常的映射
+        """
+        super().__init__(message)
+        self.results = results
+        self.errors = errors
+
+
+# 每个服务商的并发请求上限，在所有翻译器实例和任务之间共享；
+# asyncio信号量绑定到事件循环，按 (事件循环, 基础URL) 保存
+_provider_async_semaphores = {}
+_provider_semaphores_lock = threading.Lock()
+
+def _get_provider_async_semaphore(api_url):
+    """
+    获取当前事件循环中API服务商的并发信号量，首次使用时创建
+    
+    Args:
+        api_url (str): API URL
+        
+    Returns:
+        asyncio.Semaphore: 服务商的并发信号量
+    """
+    loop = asyncio.get_running_loop()
+    key = (loop, HTTPSessionPool.base_url(api_url))
+    with _provider_semaphores_lock:
+        for stale_key in [k for k in _provider_async_semaphores if k[0].is_closed()]:
+            del _provider_async_semaphores[stale_key]
+        
+        semaphore = _provider_async_semaphores.get(key)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(int(os.getenv('TRANSLATION_CONCURRENCY', 4)))
+            _provider_async_semaphores[key] = semaphore
+        return semaphore
+
+
+class _PassThroughFilter:
+    """
+    流式输出过滤器，原样输出模型返回的内容
+    """
+    def feed(self, delta):
+        """
+        输入新收到的内容，返回可以显示的部分
+        """
+        return delta
+    
+    def flush(self):
+        """
+        响应结束时返回剩余的可显示内容
+        """
+        return ""
+
+
+class _SectionFilter:
+    """
+    流式输出过滤器，只输出开始标记和结束标记之间的内容
+    """
+    def __init__(self, start_marker, end_marker):
+        """
+        初始化过滤器
+        
+        Args:
+            start_marker (str): 开始标记
+            end_marker (str): 结束标记
+        """
+        self.start_marker = start_marker
+        self.end_marker = end_marker
+        self.buffer = ""
+        self.state = "before"
+        self.emitted = False
+    
+    def feed(self, delta):
+        """
+        输入新收到的内容，返回可以显示的部分
+        
+        标记可能被拆分到多个增量中，因此缓冲区末尾可能是标记前缀的部分暂不输出。
+        """
+        self.buffer += delta
+        
+        if self.state == "before":
+            index = self.buffer.find(self.start_marker)
+            if index < 0:
+                self.buffer = self.buffer[-(len(self.start_marker) - 1):]
+                return ""
+            self.buffer = self.buffer[index + len(self.start_marker):]
+            self.state = "inside"
+        
+        if self.state != "inside":
+            return ""
+        
+        index = self.buffer.find(self.end_marker)
+        if index >= 0:
+            output = self.buffer[:index].rstrip()
+            self.buffer = ""
+            self.state = "after"
+        else:
+            # 结束标记前的空白也暂不输出
+            safe_length = max(0, len(self.buffer) - (len(self.end_marker) - 1))
+            output = self.buffer[:safe_length].rstrip()
+            self.buffer = self.buffer[len(output):]
+        
+        # 去掉开始标记后的换行
+        if not self.emitted:
+            output = output.lstrip()
+            self.emitted = bool(output)
+        return output
+    
+    def flush(self):
+        """
+        响应结束时返回剩余的可显示内容
+        """
+        output = self.buffer.rstrip() if self.state == "inside" else ""
+        self.buffer = ""
+        return output if self.emitted else output.lstrip()
+
+
+class _ChunkStream:
+    """
+    流式翻译中单个文本块的输出队列
+
+    队列中依次放入译文片段，块完成时放入None，失败时放入异常。
+    """
+    def __init__(self, metrics, start_time):
+        """
+        初始化输出队列
+
+        Args:
+            metrics (dict): 整个流式翻译的统计，用于记录首token时间
+            start_time (float): 整个流式翻译的开始时间
+        """
+        self.queue = asyncio.Queue()
+        self.metrics = metrics
+        self.start_time = start_time
+        self.emitted = False
+
+    def mark_first_token(self):
+        """
+        记录首token时间（推理模型的思考过程也算在内）
+        """
+        if self.metrics['time_to_first_token'] is None:
+            self.metrics['time_to_first_token'] = time.perf_counter() - self.start_time
+
+    async def put(self, text):
+        """
+        输出一段译文，空字符串不输出
+        """
+        if text:
+            self.emitted = True
+            await self.queue.put(text)
+
+    def finish(self, translation):
+        """
+        块处理完成；没有流式输出过内容（翻译记忆、合并请求或保留原文）时整块输出
+
+        Args:
+            translation (str): 块的完整翻译
+        """
+        if not self.emitted:
+            self.mark_first_token()
+            self.queue.put_nowait(translation)
+        self.queue.put_nowait(None)
+
+    def fail(self, error):
+        """
+        块处理失败
+
+        Args:
+            error (Exception): 错误
+        """
+        self.queue.put_nowait(error)
+
+
 class TranslationModel:
     """
     翻译模型的基类，定义模型的基本属性和方法
     """
+    # 单个块失败后的重试次数和首次重试前的等待时间（秒，之后按指数增长）
+    CHUNK_RETRIES = 2
+    CHUNK_RETRY_DELAY = 1.0
+    
+    # 提示词版本，修改提示词模板或响应解析方式后需要递增，使翻译记忆中的旧结果失效
+    PROMPT_VERSION = 2
+    
+    # 模型上下文窗口（输入和输出tokens之和）
+    CONTEXT_WINDOW = 65536
+    # 提示词模板本身占用的tokens
+    PROMPT_OVERHEAD_TOKENS = 300
+    # 每个输入token大约产生的输出token数，用于保证块的输出不超过max_tokens
+    OUTPUT_EXPANSION_RATIO = 1.2
+    
+    # 回复因max_tokens被截断时，请模型继续输出的消息
+    CONTINUATION_PROMPT = "你的回复因长度限制被截断了。请从中断处继续输出剩余内容，不要重复已经输出的部分，也不要添加任何说明。"
+    
+    # 提供同一模型的备用服务商，请求过慢时向其发送对冲请求（None表示不对冲）
+    HEDGE_PROVIDER = None
+    
+    # 翻译可能超出时间限制时改用的更快模型类型（None表示没有更快的模型）
+    FAST_MODEL_TYPE = None
+    
     def __init__(self, name, api_url, api_key_env, model_name, temperature=0.5, max_tokens=4000):
         """
-        初始化翻译模型
+        初始化翻译模型
+        
+        Args:
+            name (str): 模型名称
+            api_url (str): API URL
+            api_key_env (str): 环境变量中API密钥的名称
+            model_name (str): 模型标识符
+            temperature (float): 温度参数，控制输出的随机性
+            max_tokens (int): 最大生成的令牌数（按块动态设置时为上限）
+        """
+        # 加载环境变量（.env文件只在第一次或修改后读取）
+        load_environment()
+        
+        # 获取API密钥（使用本地模拟服务器时任意密钥均可）
+        self.api_key = os.getenv(api_key_env) or ("mock" if os.getenv('MOCK_LLM_URL') else None)
+        if not self.api_key:
+            raise ValueError(f"{api_key_env} API key not found in environment variables.")
+        
+        # 设置基本属性
+        self.name = name
+        self.api_url = resolve_api_url(api_url)
+        self.model_name = model_name
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        
+        # 按估算的输入token数和学习到的输出比例为每个请求设置max_tokens（max_tokens作为上限），
+        # 回复被截断时最多自动续写的次数
+        if os.getenv('DYNAMIC_MAX_TOKENS_ENABLED', 'True').lower() in ('true', '1', 't'):
+            self.output_budget = get_default_output_budget()
+        else:
+            self.output_budget = None
+        self.max_continuations = int(os.getenv('MAX_CONTINUATIONS', 2))
+        
+        # 同一服务商同时进行的请求数上限
+        self.max_concurrency = int(os.getenv('TRANSLATION_CONCURRENCY', 4))
+        
+        # 每块最多使用的输入预算和输出预算比例
+        self.chunk_input_share = float(os.getenv('CHUNK_INPUT_SHARE', 0.5))
+        self.chunk_output_share = float(os.getenv('CHUNK_OUTPUT_SHARE', 0.8))
+        
+        # 翻译记忆，相同的块不再重复调用API
+        if os.getenv('TRANSLATION_MEMORY_ENABLED', 'True').lower() in ('true', '1', 't'):
+            self.memory = get_default_memory()
+        else:
+            self.memory = None
+        
+        # 句子级模糊翻译记忆，只把新句子发送给模型
+        if os.getenv('SENTENCE_MEMORY_ENABLED', 'True').lower() in ('true', '1', 't'):
+            self.sentence_memory = get_default_sentence_memory()
+        else:
+            self.sentence_memory = None
+        # 复用部分句子时，一次编号请求最多包含的新句子数
+        self.sentence_segments_per_request = int(os.getenv('SENTENCE_MEMORY_MAX_SEGMENTS', 20))
+        
+        # 短块批量合并，不超过该token数的块与同时进行的其他短块合并为一次请求
+        if os.getenv('BATCH_ENABLED', 'True').lower() in ('true', '1', 't'):
+            self.batcher = get_default_micro_batcher()
+        else:
+            self.batcher = None
+        self.batch_chunk_tokens = int(os.getenv('BATCH_CHUNK_TOKENS', 200))
+        
+        # 最近一次翻译中复用翻译记忆的统计
+        self.last_reuse_report = None
+        
+        # 最近一次流式翻译的首token时间和总时间
+        self.last_stream_metrics = None
+        
+        # 最近一次限时翻译的结果和各块的降级情况
+        self.last_deadline_report = None
+        self._fast_model = None
+        
+        # 最近一次翻译得到的按块、按段落对应的翻译，供下一次修订时复用
+        self.last_translation_units = None
+        
+        # API调用的token用量、耗时和费用，TranslatorFactory为每个翻译器拷贝创建新的账本
+        self.usage = UsageLedger()
+        
+        # 请求对冲，备用服务商的模型在第一次使用时创建
+        if self.HEDGE_PROVIDER and os.getenv('HEDGE_ENABLED', 'True').lower() in ('true', '1', 't'):
+            self.hedger = get_default_hedger()
+        else:
+            self.hedger = None
+        self._hedge_partner = None
+        
+        # HTTP请求头
+        self.headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}"
+        }
+    
+    def translate(self, text, deadline=None):
+        """
+        翻译英文文本为中文
+        
+        在共享的后台事件循环上运行 translate_async，GUI和命令行等同步调用方可以直接使用。
+        
+        Args:
+            text (str): 要翻译的文本
+            deadline (float): 可选，翻译的时间限制（秒）。预计超时时改用更快的模型或备用服务商，
+                              超过时间限制后尚未开始的块保留原文，各块的降级情况保存在 last_deadline_report 中
+            
+        Returns:
+            str: 翻译后的文本
+        """
+        return run_sync(self.translate_async(text, deadline))
+    
+    async def translate_async(self, text, deadline=None):
+        """
+        翻译英文文本为中文（异步版本）
+        
+        所有块在当前事件循环中并发请求，结果按原顺序合并。
+        
+        Args:
+            text (str): 要翻译的文本
+            deadline (float): 可选，翻译的时间限制（秒），见 translate
+            
+        Returns:
+            str: 翻译后的文本
+        """
+        chunks = self._split_text(text)
+        translations = await self._translate_chunks_async(chunks, deadline)
+        self.last_translation_units = chunk_units(text, chunks, translations)
+        return self._join_translations(translations)
+    
+    def translate_revision(self, diff, deadline=None):
+        """
+        增量翻译修订后的文档：只把有改动的段落发送给模型，未改动的段落使用上一版本的翻译
+        
+        新版本按段落对应的翻译保存在 last_translation_units 中，供下一次修订使用。
+        
+        Args:
+            diff (DocumentDiff): 新版本与上一版本的对齐结果
+            deadline (float): 可选，翻译的时间限制（秒），见 translate
+            
+        Returns:
+            str: 新版本的完整翻译
+        """
+        return run_sync(self.translate_revision_async(diff, deadline))
+    
+    async def translate_revision_async(self, diff, deadline=None):
+        """
+        增量翻译修订后的文档（异步版本）
+        
+        Args:
+            diff (DocumentDiff): 新版本与上一版本的对齐结果
+            deadline (float): 可选，翻译的时间限制（秒）
+            
+        Returns:
+            str: 新版本的完整翻译
+        """
+        chunks, owners = self._split_revision(diff)
+        return self._finish_revision(diff, chunks, owners, await self._translate_chunks_async(chunks, deadline))
+    
+    async def _translate_chunks_async(self, chunks, deadline=None):
+        """
+        并发翻译文本块，并保存翻译记忆复用和时间限制的统计
+        
+        Args:
+            chunks (list): 文本块列表
+            deadline (float): 可选，翻译的时间限制（秒）
+            
+        Returns:
+            list: 与chunks顺序一致的翻译
+        """
+        schedule = DeadlineSchedule(deadline, chunks) if deadline else None
+        report = ReuseReport()
+        translations = await self._process_chunks_async(
+            chunks,
+            lambda model, chunk, index, stream: model._translate_chunk_async(
+                chunk, report, stream, prepared=model is self
+            ),
+            schedule,
+            prepare_chunk=lambda chunk: self._translate_chunk_without_slot_async(chunk, report)
+        )
+        self._finish_reuse_report(report)
+        self._finish_deadline_report(schedule)
+        return translations
+    
+
+    def _split_revision(self, diff):
+        """
+        把需要翻译的各段连续段落分别分块，不同位置的改动不会合并到同一块中
+        
+        Args:
+            diff (DocumentDiff): 新版本与上一版本的对齐结果
+            
+        Returns:
+            tuple: (文本块列表, 每块所属的改动段序号)
+        """
+        chunks = []
+        owners = []
+        for r, run in enumerate(diff.changed_runs()):
+            for chunk in self._split_text("\n\n".join(run)):
+                chunks.append(chunk)
+                owners.append(r)
+        return chunks, owners
+    
+    def _finish_revision(self, diff, chunks, owners, translations):
+        """
+        把各改动段的翻译与复用的翻译按原顺序拼接
+        
+        Args:
+            diff (DocumentDiff): 新版本与上一版本的对齐结果
+            chunks (list): 各改动段分成的文本块
+            owners (list): 每块所属的改动段序号
+            translations (list): 各块的翻译
+            
+        Returns:
+            str: 新版本的完整翻译
+        """
+        run_chunks = [[] for _ in diff.runs]
+        run_translations = [[] for _ in diff.runs]
+        for chunk, owner, translation in zip(chunks, owners, translations):
+            run_chunks[owner].append(chunk)
+            run_translations[owner].append(translation)
+        
+        translation, self.last_translation_units = diff.splice(run_chunks, run_translations)
+        revision = diff.report()
+        print(f"[DEBUG] {self.name}: 增量翻译复用 {revision['reused_paragraphs']}/{revision['paragraphs']} 段 "
+              f"({revision['reused_percent']:.0f}%)，翻译 {revision['translated_paragraphs']} 段")
+        return self._join_translations([translation])
+    
+    def _finish_reuse_report(self, report):
+        """
+        保存并输出一次翻译的翻译记忆复用统计
+        
+        Args:
+            report (ReuseReport): 本次翻译的复用统计
+        """
+        self.last_reuse_report = report.as_dict()
+        print(f"[DEBUG] {self.name}: 翻译记忆复用 {report.reused_sentences}/{report.sentences} 句, "
+              f"节省约 {report.tokens_saved} tokens")
+        if report.truncated_chunks:
+            print(f"[DEBUG] {self.name}: {report.truncated_chunks} 个块的回复被截断，译文不完整")
+    
+    def _finish_deadline_report(self, schedule):
+        """
+        保存并输出一次翻译的时间限制和降级统计
+        
+        Args:
+            schedule (DeadlineSchedule): 本次翻译的时间预算，没有时间限制时为None
+        """
+        if schedule is None:
+            self.last_deadline_report = None
+            return
+        
+        self.last_deadline_report = schedule.report()
+        deadline = self.last_deadline_report
+        print(f"[DEBUG] {self.name}: 时间限制 {deadline['deadline']:.0f}秒，实际 {deadline['elapsed']:.1f}秒，"
+              f"降级 {deadline['degraded_chunks']}/{deadline['chunks']} 块，"
+              f"未翻译 {deadline['partial_chunks']} 块")
+    
+    def use_usage_ledger(self, ledger):
+        """
+        把之后的API调用记录到指定的用量账本（例如同一任务的各个步骤共用一个账本）
+        
+        Args:
+            ledger (UsageLedger): 用量账本
+        """
+        self.usage = ledger
+        # 备用服务商的模型是当前模型的拷贝，需要重新创建才会记录到新的账本
+        self._hedge_partner = None
+    
+    def translate_stream(self, text, deadline=None):
+        """
+        流式翻译英文文本，边生成边返回译文片段
+        
+        Args:
+            text (str): 要翻译的文本
+            deadline (float): 可选，翻译的时间限制（秒），见 translate
+            
+        Returns:
+            iterator: 按顺序产生的译文片段，全部拼接后即为完整翻译
+        """
+        return iterate_sync(self.translate_stream_async(text, deadline))
+    
+    def translate_stream_async(self, text, deadline=None):
+        """
+        流式翻译英文文本（异步版本）
+        
+        各块仍按并发上限同时请求，但按原顺序输出：第一块的译文实时输出，
+        后续块在前面的块输出完之前先缓存起来。首token时间和总时间保存在
+        last_stream_metrics 中，翻译记忆的复用情况保存在 last_reuse_report 中。
+        
+        Args:
+            text (str): 要翻译的文本
+            deadline (float): 可选，翻译的时间限制（秒），见 translate
+            
+        Returns:
+            异步生成器，按顺序产生译文片段
+        """
+        return self._stream_translation(text, deadline=deadline)
+    
+    async def _stream_translation(self, text, vocabularies=None, deadline=None):
+        """
+        流式翻译的实现
+        
+        各块与非流式翻译走同一条处理流程，只是整块请求改为流式请求，
+        译文片段通过每块的输出队列按原顺序产生。
+        
+        Args:
+            text (str): 要翻译的文本
+            vocabularies (list): 不为None时，同时从每块的回复中取出词汇解析，
+                                 按块的顺序追加到该列表中（用于翻译提示词同时要求词汇解析的模型）
+            deadline (float): 可选，翻译的时间限制（秒）
+            
+        Yields:
+            str: 译文片段
+        """
+        chunks = self._split_text(text)
+        schedule = DeadlineSchedule(deadline, chunks) if deadline else None
+        metrics = {'chunks': len(chunks), 'time_to_first_token': None,
+                   'time_to_first_text': None, 'total_time': None}
+        report = ReuseReport()
+        start_time = time.perf_counter()
+        
+        chunk_vocabularies = {} if vocabularies is not None else None
+        streams = [_ChunkStream(metrics, start_time) for _ in chunks]
+        # 同时需要词汇解析的块只能整块请求
+        processing = asyncio.ensure_future(self._process_chunks_async(
+            chunks,
+            lambda model, chunk, index, stream: model._translate_chunk_async(
+                chunk, report, stream, chunk_vocabularies, index, prepared=model is self and vocabularies is None
+            ),
+            schedule,
+            streams,
+            prepare_chunk=None if vocabularies is not None else
+            lambda chunk: self._translate_chunk_without_slot_async(chunk, report)
+        ))
+        
+        try:
+            yield "翻译：\n"
+            for i, stream in enumerate(streams):
+                if i > 0:
+                    yield "\n\n"
+                while True:
+                    item = await stream.queue.get()
+                    if item is None:
+                        if vocabularies is not None:
+                            vocabularies.append(chunk_vocabularies.get(i, ""))
+                        break
+                    if isinstance(item, BaseException):
+                        raise ChunkTranslationError(f"第 {i+1} 块翻译失败: {str(item)}", [], {i: item})
+                    if metrics['time_to_first_text'] is None:
+                        metrics['time_to_first_text'] = time.perf_counter() - start_time
+                    yield item
+            
+            self.last_translation_units = chunk_units(text, chunks, await processing)
+            metrics['total_time'] = time.perf_counter() - start_time
+            self.last_stream_metrics = metrics
+            self._finish_reuse_report(report)
+            self._finish_deadline_report(schedule)
+            print(f"[DEBUG] {self.name}: 流式翻译完成，首token {metrics['time_to_first_token'] or 0:.2f}秒，"
+                  f"首段译文 {metrics['time_to_first_text'] or 0:.2f}秒，总耗时 {metrics['total_time']:.2f}秒")
+        finally:
+            processing.cancel()
+            # 已经通过队列报告过的失败不再作为未取得的异常输出
+            if processing.done() and not processing.cancelled():
+                processing.exception()
+    
+
+    def _create_stream_filter(self):
+        """
+        创建流式输出过滤器（子类可以重写以只输出响应中的翻译部分）
+        
+        Returns:
+            带有 feed(delta) 和 flush() 方法的过滤器
+        """
+        return _PassThroughFilter()
+    
+    def _join_translations(self, translations):
+        """
+        合并各块的翻译
+        
+        Args:
+            translations (list): 按原顺序排列的各块翻译
+            
+        Returns:
+            str: 以"翻译："开头的完整翻译
+        """
+        result = "\n\n".join(translations)
+        
+        # 确保结果以"翻译："开头
+        if not result.strip().startswith("翻译："):
+            result = "翻译：\n" + result
+        
+        return result
+    
+    def _create_translation_prompt(self, text):
+        """
+        创建翻译提示词（子类需要实现）
+        """
+        raise NotImplementedError("Subclasses must implement this method")
+    
+    def _record_usage(self, stage, messages, response, latency):
+        """
+        把一次API调用的token用量和耗时记录到用量账本，并用完整的回复更新输出比例
+        
+        响应中没有usage时按文本长度估算，并标记为估算值。
+        
+        Args:
+            stage (str): 调用所属的步骤
+            messages (list): 请求的消息
+            response (dict): API响应
+            latency (float): 调用耗时（秒）
+        """
+        model = response.get("model") or self.model_name
+        prompt_tokens = self._input_tokens(messages)
+        if response.get("usage"):
+            usage = normalize_usage(response["usage"])
+            self.usage.record(model, stage, usage, latency)
+        else:
+            try:
+                completion_tokens = estimate_tokens(response["choices"][0]["message"]["content"] or "")
+            except (KeyError, IndexError, TypeError):
+                completion_tokens = 0
+            usage = normalize_usage({"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens})
+            self.usage.record(model, stage, usage, latency, estimated=True)
+        
+        # 续写后仍被截断的回复只是输出长度的下限，不用于学习
+        if self.output_budget is not None and self._finish_reason(response) != 'length':
+            self.output_budget.record(response.get("requested_model") or self.model_name, stage,
+                                      prompt_tokens, usage['completion_tokens'])
+    
+    @staticmethod
+    def _input_tokens(messages):
+        """
+        估算请求消息的token数
+        
+        Args:
+            messages (list): 消息内容
+        
+        Returns:
+            int: 估算的token数
+        """
+        return sum(estimate_tokens(message["content"]) for message in messages)
+    
+    def _request_max_tokens(self, messages, stage):
+        """
+        按估算的输入token数和该模型在该步骤学习到的输出比例计算请求的max_tokens
+        
+        Args:
+            messages (list): 消息内容
+            stage (str): 调用所属的步骤
+        
+        Returns:
+            int: 请求的max_tokens，不超过模型配置的max_tokens
+        """
+        if self.output_budget is None:
+            return self.max_tokens
+        return self.output_budget.max_tokens(self.model_name, stage, self._input_tokens(messages), self.max_tokens)
+    
+    @staticmethod
+    def _finish_reason(response):
+        """
+        获取API响应的结束原因
+        
+        Args:
+            response (dict): API响应
+        
+        Returns:
+            str: 结束原因，"length" 表示因max_tokens被截断；没有时为None
+        """
+        try:
+            return response["choices"][0].get("finish_reason")
+        except (KeyError, IndexError, TypeError, AttributeError):
+            return None
+    
+    def _continuation_messages(self, messages, partial):
+        """
+        创建请求模型继续输出被截断回复的消息
+        
+        推理模型可能在思考阶段就用完了max_tokens，此时还没有输出内容，改为以模型配置的
+        max_tokens重新发送原请求。
+        
+        Args:
+            messages (list): 原请求的消息
+            partial (str): 已经输出的内容
+        
+        Returns:
+            list: 续写请求的消息
+        """
+        if not partial.strip():
+            return messages
+        return messages + [
+            {"role": "assistant", "content": partial},
+            {"role": "user", "content": self.CONTINUATION_PROMPT}
+        ]
+    
+    @staticmethod
+    def _continue_response(response, continuation):
+        """
+        把续写请求的响应拼接到被截断的响应之后
+        
+        Args:
+            response (dict): 被截断的响应
+            continuation (dict): 续写请求的响应
+        
+        Returns:
+            dict: 内容拼接、用量相加、结束原因取自续写请求的响应
+        """
+        choice = continuation["choices"][0]
+        content = (response["choices"][0]["message"].get("content") or "") + \
+                  ((choice.get("message") or {}).get("content") or "")
+        merged = dict(continuation, choices=[dict(choice, message={"role": "assistant", "content": content})])
+        
+        # 任一响应没有用量时按文本长度估算整次调用
+        if response.get("usage") and continuation.get("usage"):
+            merged["usage"] = add_usage(response["usage"], continuation["usage"])
+        else:
+            merged.pop("usage", None)
+        return merged
+    
+    @staticmethod
+    def _api_error(status_code, response_text):
+        """
+        根据HTTP状态码创建API错误
+        
+        Args:
+            status_code (int): HTTP状态码
+            response_text (str): 响应内容
+            
+        Returns:
+            Exception: 包含错误说明的异常
+        """
+        error_message = f"API请求失败，状态码 {status_code}: {response_text}"
+        if status_code == 429:
+            error_message = f"服务器繁忙 (429): {response_text}"
+        elif status_code == 401:
+            error_message = f"API认证失败 (401): {response_text}"
+        
+        return Exception(error_message)
+    
+    async def _call_api_async(self, messages, stage='translation'):
+        """
+        调用API，发送请求并返回响应
+        
+        与正在进行中的相同请求（同一服务商、模型、参数和消息）合并，只发送一次，
+        用量也只由发送请求的一方记录一次。
+        
+        Args:
+            messages (list): 消息内容
+            stage (str): 调用所属的步骤，用于用量统计
+        
+        Returns:
+            dict: API响应（续写时为合并后的响应）
+        """
+        max_tokens = self._request_max_tokens(messages, stage)
+        return await get_default_single_flight().call_async(
+            self._request_key(messages, max_tokens), lambda: self._call_api_continued_async(messages, max_tokens, stage)
+        )
+    
+    async def _call_api_continued_async(self, messages, max_tokens, stage):
+        """
+        发送请求，回复因max_tokens被截断时自动请求续写并拼接，最后记录整次调用的用量
+        
+        Args:
+            messages (list): 消息内容
+            max_tokens (int): 第一次请求的最大生成令牌数
+            stage (str): 调用所属的步骤，用于用量统计
+        
+        Returns:
+            dict: API响应（续写时为合并后的响应）
+        """
+        start = time.perf_counter()
+        response = await self._call_api_hedged_async(messages, max_tokens)
+        
+        for attempt in range(self.max_continuations):
+            if self._finish_reason(response) != 'length':
+                break
+            partial = self._extract_translation(response) or ""
+            print(f"[DEBUG] {self.name}: 回复在 max_tokens={max_tokens} 处被截断，"
+                  f"继续生成 ({attempt + 1}/{self.max_continuations})")
+            request = self._continuation_messages(messages, partial)
+            max_tokens = self.max_tokens
+            continuation = await self._call_api_hedged_async(request, max_tokens)
+            response = self._continue_response(response, continuation)
+        
+        if self._finish_reason(response) == 'length':
+            print(f"[DEBUG] {self.name}: 续写 {self.max_continuations} 次后回复仍被截断，结果不完整")
+        self._record_usage(stage, messages, response, time.perf_counter() - start)
+        return response
+    
+    async def _call_api_hedged_async(self, messages, max_tokens):
+        """
+        发送请求并返回响应（异步版本）；请求过慢时向备用服务商发送对冲请求，
+        采用先返回的结果并取消另一个
+        
+        Args:
+            messages (list): 消息内容
+            max_tokens (int): 最大生成的令牌数
+        
+        Returns:
+            dict: API响应
+        """
+        partner = self._get_hedge_partner()
+        if partner is None:
+            return await self._request_api_async(messages, max_tokens)
+        
+        return await self.hedger.run(
+            self._hedge_key('response'), lambda: self._request_api_async(messages, max_tokens),
+            partner._hedge_key('response'), lambda: partner._request_api_in_slot_async(messages, max_tokens),
+            alternate_ready=partner._has_free_slot
+        )
+    
+    def _has_free_slot(self):
+        """
+        判断本服务商当前是否还有空闲的并发名额，没有时不向本服务商发送对冲请求
+        
+        Returns:
+            bool: 是否有空闲名额
+        """
+        return not _get_provider_async_semaphore(self.api_url).locked()
+    
+    async def _request_api_in_slot_async(self, messages, max_tokens):
+        """
+        占用本服务商的并发名额发送请求，用于发送到备用服务商的对冲请求
+        
+        Args:
+            messages (list): 消息内容
+            max_tokens (int): 最大生成的令牌数
+        
+        Returns:
+            dict: API响应
+        """
+        async with _get_provider_async_semaphore(self.api_url):
+            return await self._request_api_async(messages, max_tokens)
+    
+    async def _call_api_stream_in_slot_async(self, messages, max_tokens):
+        """
+        占用本服务商的并发名额发送流式请求，直到流式响应关闭，用于对冲请求
+        
+        Args:
+            messages (list): 消息内容
+            max_tokens (int): 最大生成的令牌数
+        
+        Yields:
+            与 _call_api_stream_async 相同
+        """
+        async with _get_provider_async_semaphore(self.api_url):
+            stream = self._call_api_stream_async(messages, max_tokens)
+            try:
+                async for delta in stream:
+                    yield delta
+            finally:
+                await stream.aclose()
+    
+    async def _request_api_async(self, messages, max_tokens):
+        """
+        向当前服务商发送请求并返回响应（异步版本）
+        
+        Args:
+            messages (list): 消息内容
+            max_tokens (int): 最大生成的令牌数
+        
+        Returns:
+            dict: API响应，requested_model 为请求发送给的模型标识符
+        """
+        payload = {
+            "model": self.model_name,
+            "messages": messages,
+            "temperature": self.temperature,
+            "max_tokens": max_tokens
+        }
+        
+        async with self._open_api_response_async(payload, aiohttp.ClientTimeout(total=30)) as response:
+            result = await response.json(content_type=None)
+        # 对冲时回复可能来自备用服务商，输出比例按实际回复的模型学习
+        result["requested_model"] = self.model_name
+        return result
+    
+    async def _call_api_stream_async(self, messages, max_tokens):
+        """
+        以流式(SSE)方式调用API，逐个返回生成的内容增量
+        
+        Args:
+            messages (list): 消息内容
+            max_tokens (int): 最大生成的令牌数
+        
+        Yields:
+            str: 内容增量（推理模型的思考过程不输出，但空增量会用于计算首token时间）；
+                 最后产生一个包含 model、requested_model（请求发送给的模型标识符）、
+                 usage（服务商返回用量时）和 finish_reason 的字典
+        """
+        payload = {
+            "model": self.model_name,
+            "messages": messages,
+            "temperature": self.temperature,
+            "max_tokens": max_tokens,
+            "stream": True,
+            "stream_options": {"include_usage": True}
+        }
+        
+        # 流式响应可能持续较长时间，只限制连接时间和两次数据之间的间隔
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=120)
+        summary = {"requested_model": self.model_name}
+        async with self._open_api_response_async(payload, timeout) as response:
+            async for line in response.content:
+                line = line.decode('utf-8').strip()
+                # 跳过空行和服务器发送的保活注释
+                if not line.startswith("data:"):
+                    continue
+                
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                
+                try:
+                    event = json.loads(data)
+                except ValueError:
+                    continue
+                
+                # 用量在最后一个事件中返回，该事件的choices可能为空
+                if event.get("usage"):
+                    summary.update(model=event.get("model"), usage=event["usage"])
+                if not event.get("choices"):
+                    continue
+                if event["choices"][0].get("finish_reason"):
+                    summary["finish_reason"] = event["choices"][0]["finish_reason"]
+                delta = event["choices"][0].get("delta") or {}
+                
+                if delta.get("content"):
+                    yield delta["content"]
+                elif delta.get("reasoning_content"):
+                    yield ""
+        
+        if summary:
+            yield summary
+    
+    async def _open_translation_stream_async(self, messages, stage='translation'):
+        """
+        以流式方式调用API，与正在进行中的相同请求共享同一个响应，用量也只由发送请求的一方记录一次
+        
+        Args:
+            messages (list): 消息内容
+            stage (str): 调用所属的步骤，用于用量统计和选择学习到的输出比例
+        
+        Yields:
+            str: 内容增量；最后产生一个字典，包含 model、requested_model、各次请求相加的 usage 和最终的 finish_reason
+        """
+        max_tokens = self._request_max_tokens(messages, stage)
+        stream = get_default_single_flight().stream(
+            self._request_key(messages, max_tokens, stream=True),
+            lambda: self._stream_api_continued_async(messages, max_tokens, stage)
+        )
+        try:
+            async for item in stream:
+                yield item
+        finally:
+            await stream.aclose()
+    
+    async def _stream_api_continued_async(self, messages, max_tokens, stage):
+        """
+        以流式方式发送请求，回复因max_tokens被截断时自动以流式方式请求续写，接着输出续写的内容；
+        最后记录整次调用的用量
+        
+        Args:
+            messages (list): 消息内容
+            max_tokens (int): 第一次请求的最大生成令牌数
+            stage (str): 调用所属的步骤，用于用量统计
+        
+        Yields:
+            str: 内容增量；最后产生一个字典，见 _open_translation_stream_async
+        """
+        start = time.perf_counter()
+        request = messages
+        content = []
+        summary = {}
+        
+        for attempt in range(self.max_continuations + 1):
+            result = {}
+            async for delta in self._open_hedged_stream_async(request, max_tokens):
+                if isinstance(delta, dict):
+                    result = delta
+                    continue
+                content.append(delta)
+                yield delta
+            
+            # 任一请求没有返回用量时按文本长度估算整次调用
+            if not attempt:
+                usage = result.get("usage")
+            elif summary.get("usage") and result.get("usage"):
+                usage = add_usage(summary["usage"], result["usage"])
+            else:
+                usage = None
+            summary = dict(result, usage=usage)
+            
+            if summary.get("finish_reason") != 'length':
+                break
+            if attempt == self.max_continuations:
+                print(f"[DEBUG] {self.name}: 续写 {self.max_continuations} 次后流式回复仍被截断，结果不完整")
+                break
+            print(f"[DEBUG] {self.name}: 流式回复在 max_tokens={max_tokens} 处被截断，"
+                  f"继续生成 ({attempt + 1}/{self.max_continuations})")
+            request = self._continuation_messages(messages, "".join(content))
+            max_tokens = self.max_tokens
+        
+        if not summary.get("usage"):
+            summary.pop("usage", None)
+        response = dict(summary, choices=[{
+            "message": {"content": "".join(content)}, "finish_reason": summary.get("finish_reason")
+        }])
+        self._record_usage(stage, messages, response, time.perf_counter() - start)
+        if summary:
+            yield summary
+    
+    async def _open_hedged_stream_async(self, messages, max_tokens):
+        """
+        以流式方式调用API；首token过慢时向备用服务商发送对冲请求，采用先开始输出的响应
+        
+        Args:
+            messages (list): 消息内容
+            max_tokens (int): 最大生成的令牌数
+        
+        Yields:
+            str: 内容增量
+        """
+        partner = self._get_hedge_partner()
+        if partner is None:
+            stream = self._call_api_stream_async(messages, max_tokens)
+            first = None
+        else:
+            first, stream = await self.hedger.run(
+                self._hedge_key('first_token'),
+                lambda: self._first_stream_delta(self._call_api_stream_async(messages, max_tokens)),
+                partner._hedge_key('first_token'),
+                lambda: partner._first_stream_delta(partner._call_api_stream_in_slot_async(messages, max_tokens)),
+                discard=lambda result: result[1].aclose(),
+                alternate_ready=partner._has_free_slot
+            )
+        
+        try:
+            if first is not None:
+                yield first
+            async for delta in stream:
+                yield delta
+        finally:
+            await stream.aclose()
+    
+    @staticmethod
+    async def _first_stream_delta(stream):
+        """
+        等待流式响应的第一个增量
+        
+        Args:
+            stream: 流式响应的异步生成器
+        
+        Returns:
+            tuple: (第一个增量, 流式响应)，响应为空时第一个增量为None
+        """
+        try:
+            return await stream.__anext__(), stream
+        except StopAsyncIteration:
+            return None, stream
+        except BaseException:
+            await stream.aclose()
+            raise
+    
+    def _request_key(self, messages, max_tokens, stream=False):
+        """
+        获取用于合并相同请求的键
+        
+        Args:
+            messages (list): 消息内容
+            max_tokens (int): 最大生成的令牌数
+            stream (bool): 是否为流式请求
+        
+        Returns:
+            str: 请求的键
+        """
+        return SingleFlight.make_key(
+            self.api_url, self.model_name, self.temperature, max_tokens, stream, messages
+        )
+    
+    def _get_hedge_partner(self):
+        """
+        获取备用服务商上的同一模型，用于发送对冲请求
+        
+        Returns:
+            TranslationModel: 备用服务商的模型，未启用对冲或没有备用服务商的API密钥时为None
+        """
+        if self.hedger is None:
+            return None
+        
+        if self._hedge_partner is None:
+            provider = self.HEDGE_PROVIDER
+            api_key = os.getenv(provider['api_key_env']) or ("mock" if os.getenv('MOCK_LLM_URL') else None)
+            if not api_key:
+                self.hedger = None
+                return None
+            
+            # 复制当前模型，只替换服务商相关的属性，提示词和解析方式保持不变
+            partner = copy.copy(self)
+            partner.name = f"{self.name} ({provider['name']})"
+            partner.api_url = resolve_api_url(provider['api_url'])
+            partner.api_key = api_key
+            partner.model_name = provider['model_name']
+            partner.headers = {
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer {api_key}"
+            }
+            partner.headers.update(provider.get('headers', {}))
+            partner.hedger = None
+            self._hedge_partner = partner
+        return self._hedge_partner
+    
+    def _hedge_key(self, kind):
+        """
+        获取对冲时记录延迟所用的键
+        
+        Args:
+            kind (str): "response"（完整响应）或 "first_token"（流式响应的首token）
+            
+        Returns:
+            str: 服务商、模型和请求类型组成的键
+        """
+        return f"{HTTPSessionPool.base_url(self.api_url)} {self.model_name} {kind}"
+    
+    @asynccontextmanager
+    async def _open_api_response_async(self, payload, timeout):
+        """
+        发送API请求并返回状态码为200的响应，429时通过共享限流器自动退避重试
+        
+        Args:
+            payload (dict): 请求内容
+            timeout (aiohttp.ClientTimeout): 超时设置
+            
+        Yields:
+            aiohttp.ClientResponse: API响应
+        """
+        limiter = get_rate_limiter(self.api_url, self.api_key)
+        
+        try:
+            session = get_async_session(self.api_url)
+            for attempt in range(limiter.max_retries + 1):
+                await limiter.acquire_async()
+                async with session.post(
+                    self.api_url,
+                    headers=self.headers,
+                    json=payload,
+                    timeout=timeout
+                ) as response:
+                    if response.status == 429 and attempt < limiter.max_retries:
+                        delay = limiter.on_throttled(attempt, parse_retry_after(response.headers.get('Retry-After')))
+                        print(f"[DEBUG] {self.name}: 服务器繁忙 (429)，{delay:.1f}秒后自动重试 "
+                              f"({attempt + 1}/{limiter.max_retries})")
+                    elif response.status != 200:
+                        raise self._api_error(response.status, await response.text())
+                    else:
+                        limiter.on_success()
+                        yield response
+                        return
+                
+                await asyncio.sleep(delay)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise Exception(f"网络请求错误: {str(e)}")
+    
+    def _extract_translation(self, response):
+        """
+        从API响应中提取翻译内容
+        
+        Args:
+            response (dict): API响应
+            
+        Returns:
+            str: 翻译文本
+        """
+        try:
+            return response["choices"][0]["message"]["content"]
+        except (KeyError, IndexError) as e:
+            raise Exception(f"无法从API响应中提取翻译: {e}")
+    
+    async def _translate_chunk_without_slot_async(self, chunk, report):
+        """
+        在占用服务商的并发名额之前，尝试不整块请求模型就翻译一块
+        
+        依次尝试：整块的翻译记忆；有句子能从句子级翻译记忆复用时，只把新句子编号发送给模型；
+        短块与同时进行的其他短块（包括其他任务的）合并请求。等待合并期间不占用并发名额，
+        合并后的批次和逐句请求发送时各占用一个名额。
+        
+        Args:
+            chunk (str): 文本块
+            report (ReuseReport): 记录翻译记忆复用情况
+            
+        Returns:
+            str: 翻译文本，需要整块请求时为None（调用方占用名额后调用 _translate_chunk_async）
+        """
+        translation = self._recall('translation', chunk)
+        if translation is not None:
+            report.add_reused_text(self._count_sentences(chunk), chunk, translation)
+            return translation
+        
+        translation = await self._translate_reused_sentences_async(chunk, report)
+        if translation is None and self._is_short_chunk(chunk):
+            segments = self._chunk_segments(chunk)
+            translation = self._batch_chunk(chunk, await self._batch_segments_async(segments), report)
+            if translation is not None:
+                await self._store_sentence_translations_async(chunk, translation)
+        
+        if translation is not None:
+            self._remember('translation', chunk, translation)
+        return translation
+    
+    async def _translate_chunk_async(self, chunk, report=None, stream=None, vocabularies=None, index=None,
+                                     prepared=False):
+        """
+        翻译单个文本块，所有翻译接口（普通、流式、限时、增量）都通过这里处理每一块，调用方已占用并发名额
+        
+        没有先经过 _translate_chunk_without_slot_async 时先查找整块的翻译记忆；然后用模型自己的
+        提示词整块请求（有输出队列时流式请求），整块的翻译再按句子保存到句子级翻译记忆。
+        回复需要同时包含词汇解析时只能整块请求。
+        
+        Args:
+            chunk (str): 文本块
+            report (ReuseReport): 记录翻译记忆复用情况
+            stream (_ChunkStream): 可选，流式输出译文片段的队列
+            vocabularies (dict): 不为None时，把该块回复中的词汇解析保存到 vocabularies[index]
+            index (int): 块的序号
+            prepared (bool): 是否已经用 _translate_chunk_without_slot_async 尝试过该块
+            
+        Returns:
+            str: 翻译文本
+        """
+        report = report or ReuseReport()
+        if not prepared:
+            translation = self._recall('translation', chunk)
+            vocabulary = self._recall('vocabulary', chunk) if vocabularies is not None else ""
+            if translation is not None and vocabulary is not None:
+                if vocabularies is not None:
+                    vocabularies[index] = vocabulary
+                report.add_reused_text(self._count_sentences(chunk), chunk, translation)
+                return translation
+        
+        prompt = self._create_translation_prompt(chunk)
+        if stream is None:
+            response = await self._call_api_async(prompt)
+        else:
+            response = await self._stream_response_async(prompt, stream)
+        translation = self._parse_translation_response(response)
+        report.add(self._count_sentences(chunk), 0, 0)
+        if vocabularies is not None:
+            vocabularies[index] = self._extract_formatted_vocabulary(response)
+        
+        # 续写后仍被截断的翻译不完整，不保存到翻译记忆
+        if self._finish_reason(response) == 'length':
+            report.add_truncated()
+            return translation
+        
+        await self._store_sentence_translations_async(chunk, translation)
+        if vocabularies is not None:
+            self._remember('vocabulary', chunk, vocabularies[index])
+        self._remember('translation', chunk, translation)
+        return translation
+    
+    async def _stream_response_async(self, prompt, stream):
+        """
+        以流式方式发送翻译请求，把过滤后的译文片段放入输出队列
+        
+        Args:
+            prompt (list): 翻译提示词
+            stream (_ChunkStream): 该块的输出队列
+            
+        Returns:
+            dict: 与非流式请求格式相同的完整响应
+        """
+        stream_filter = self._create_stream_filter()
+        content = []
+        usage = {}
+        async for delta in self._open_translation_stream_async(prompt):
+            if isinstance(delta, dict):
+                usage = delta
+                continue
+            stream.mark_first_token()
+            content.append(delta)
+            await stream.put(stream_filter.feed(delta))
+        # 响应中没有找到标记而没有输出任何内容时，块完成后输出解析出的完整翻译
+        await stream.put(stream_filter.flush())
+        
+        response = dict(usage, choices=[{
+            "message": {"content": "".join(content)}, "finish_reason": usage.get("finish_reason")
+        }])
+        return response
+    
+    async def _translate_reused_sentences_async(self, chunk, report):
+        """
+        复用句子级翻译记忆中相似句子的翻译，只把新句子编号发送给模型
+        
+        没有可复用的句子时不改变提示词，由调用方用模型自己的提示词整块请求。新句子
+        按 sentence_segments_per_request 分组请求，避免一次回复需要对齐过多编号。
+        
+        Args:
+            chunk (str): 文本块
+            report (ReuseReport): 记录翻译记忆复用情况
+            
+        Returns:
+            str: 翻译文本，没有可复用的句子或编号回复无法解析时为None
+        """
+        if self.sentence_memory is None:
+            return None
+        
+        # 签名计算和数据库查询会阻塞，放到线程池中，不占用其他任务共用的事件循环
+        plan = await asyncio.get_running_loop().run_in_executor(None, self._plan_sentence_translation, chunk)
+        paragraphs, reused, missing = plan
+        if not reused:
+            return None
+        
+        new_translations = []
+        for start in range(0, len(missing), self.sentence_segments_per_request):
+            segments = [paragraphs[p][i] for p, i in missing[start:start + self.sentence_segments_per_request]]
+            translations = await self._batch_segments_async(segments)
+            if translations is None:
+                translations = await self._request_segment_translations_in_slot_async(segments)
+            if translations is None:
+                new_translations = None
+                break
+            new_translations.extend(translations)
+        
+        translation = self._complete_sentence_translation(plan, new_translations, report)
+        if translation is not None:
+            await self._store_sentence_pairs_async([
+                (paragraphs[p][i], new) for (p, i), new in zip(missing, new_translations)
+            ])
+        return translation
+    
+    async def _store_sentence_translations_async(self, chunk, translation):
+        """
+        把整块请求的翻译按句子对齐后保存到句子级翻译记忆，供之后的相似句子复用
+        
+        中文句子数与英文句子数一致时才逐句对应保存，模型合并或拆分了句子的块不保存。
+        
+        Args:
+            chunk (str): 文本块
+            translation (str): 整块的翻译
+        """
+        if self.sentence_memory is None:
+            return
+        
+        sources = [sentence for paragraph in chunk.split("\n\n") for sentence in split_sentences(paragraph)]
+        targets = [sentence for paragraph in re.split(r'\n\s*\n', translation)
+                   for sentence in split_chinese_sentences(paragraph)]
+        if sources and len(sources) == len(targets):
+            await self._store_sentence_pairs_async(list(zip(sources, targets)))
+    
+    async def _store_sentence_pairs_async(self, pairs):
+        """
+        在线程池中把句子和翻译保存到句子级翻译记忆
+        
+        Args:
+            pairs (list): (英文句子, 中文翻译) 元组
+        """
+        await asyncio.get_running_loop().run_in_executor(
+            None, self.sentence_memory.store, self.model_name, self.PROMPT_VERSION, pairs
+        )
+    
+    @staticmethod
+    def _count_sentences(chunk):
+        """
+        统计文本块中的句子数
+        
+        Args:
+            chunk (str): 文本块
+            
+        Returns:
+            int: 句子数
+        """
+        return sum(len(split_sentences(paragraph)) for paragraph in chunk.split("\n\n"))
+    
+    def _plan_sentence_translation(self, chunk):
+        """
+        把文本块拆分为句子，并从句子级翻译记忆中查找可复用的翻译
+        
+        Args:
+            chunk (str): 文本块
+            
+        Returns:
+            tuple: (按段落分组的句子列表, (段落序号, 句子序号)到已复用翻译的映射,
+                    需要发送给模型的句子位置列表)
+        """
+        paragraphs = [sentences for sentences in
+                      (split_sentences(paragraph) for paragraph in chunk.split("\n\n")) if sentences]
+        positions = [(p, i) for p, sentences in enumerate(paragraphs) for i in range(len(sentences))]
+        matches = self.sentence_memory.lookup_many(
+            self.model_name, self.PROMPT_VERSION, [paragraphs[p][i] for p, i in positions]
+        )
+        reused = {position: match[0] for position, match in zip(positions, matches) if match}
+        missing = [position for position, match in zip(positions, matches) if not match]
+        
+        return paragraphs, reused, missing
+    
+    def _complete_sentence_translation(self, plan, new_translations, report):
+        """
+        合并复用的翻译和模型返回的新句子翻译
+        
+        Args:
+            plan (tuple): _plan_sentence_translation 的结果
+            new_translations (list): 按顺序排列的新句子翻译，解析失败时为None
+            report (ReuseReport): 记录翻译记忆复用情况
+            
+        Returns:
+            str: 翻译文本，新句子翻译解析失败时为None（调用方改为整块翻译）
+        """
+        paragraphs, reused, missing = plan
+        if new_translations is None:
+            print(f"[DEBUG] {self.name}: 逐句翻译结果无法解析，改为整块翻译")
+            return None
+        
+        report.add_reused_text(
+            len(reused),
+            " ".join(paragraphs[p][i] for p, i in reused),
+            "".join(reused.values())
+        )
+        report.add(len(missing), 0, 0)
+        
+        translations = dict(reused)
+        translations.update(zip(missing, new_translations))
+        return "\n\n".join(
+            "".join(translations[(p, i)] for i in range(len(sentences)))
+            for p, sentences in enumerate(paragraphs)
+        )
+    
+    def _create_segment_translation_prompt(self, segments):
+        """
+        创建逐段编号翻译的提示词，模型需按相同编号返回每一段的翻译
+        
+        Args:
+            segments (list): 按顺序排列的英文片段
+            
+        Returns:
+            list: 格式化的提示词
+        """
+        numbered = "\n".join(f"[{i}] {segment}" for i, segment in enumerate(segments, 1))
+        return [
+            {"role": "system", "content": "你是一个专业的英译中翻译专家。请将英文文本翻译成流畅、自然的中文。"},
+            {"role": "user", "content": f"""以下是按顺序编号的英文片段，它们可能来自不同的文档，请把每一条单独翻译成中文：
+
+{numbered}
+
+请严格按照以下格式回复，每个编号单独一行，编号与原文一一对应，不要合并或拆分，不要添加其他内容：
+[1] 第1条的中文翻译
+[2] 第2条的中文翻译
+...
+"""}
+        ]
+    
+    def _parse_segment_translations(self, response, count):
+        """
+        解析逐段编号翻译的响应
+        
+        Args:
+            response (dict): API响应
+            count (int): 期望的片段数
+            
+        Returns:
+            list: 按编号顺序排列的翻译，编号缺失、重复或为空时返回None
+        """
+        content = self._extract_translation(response)
+        segments = {}
+        current = None
+        
+        for line in content.splitlines():
+            match = re.match(r'^\s*\[(\d+)\]\s*(.*)$', line)
+            if match:
+                current = int(match.group(1))
+                if current in segments:
+                    return None
+                segments[current] = match.group(2).strip()
+            elif current is not None and line.strip():
+                segments[current] += line.strip()
+        
+        if sorted(segments) != list(range(1, count + 1)) or not all(segments.values()):
+            return None
+        return [segments[i] for i in range(1, count + 1)]
+    
+    async def _request_segment_translations_async(self, segments):
+        """
+        用逐段编号的提示词翻译片段（异步版本）
         
         Args:
-            name (str): 模型名称
-            api_url (str): API URL
-            api_key_env (str): 环境变量中API密钥的名称
-            model_name (str): 模型标识符
-            temperature (float): 温度参数，控制输出的随机性
-            max_tokens (int): 最大生成的令牌数
+            segments (list): 按顺序排列的英文片段
+            
+        Returns:
+            list: 按顺序排列的翻译，响应无法解析时为None
         """
-        # 加载环境变量
-        load_dotenv(override=True)
-        
-        # 获取API密钥
-        self.api_key = os.getenv(api_key_env)
-        if not self.api_key:
-            raise ValueError(f"{api_key_env} API key not found in environment variables.")
+        response = await self._call_api_async(self._create_segment_translation_prompt(segments))
+        # 被截断的回复可能缺少最后一段的后半部分，由调用方改为整块请求
+        if self._finish_reason(response) == 'length':
+            return None
+        return self._parse_segment_translations(response, len(segments))
+    
+    async def _request_segment_translations_in_slot_async(self, segments):
+        """
+        占用服务商的一个并发名额，用逐段编号的提示词翻译片段
         
-        # 设置基本属性
-        self.name = name
-        self.api_url = api_url
-        self.model_name = model_name
-        self.temperature = temperature
-        self.max_tokens = max_tokens
+        Args:
+            segments (list): 按顺序排列的英文片段
+            
+        Returns:
+            list: 按顺序排列的翻译，响应无法解析时为None
+        """
+        async with _get_provider_async_semaphore(self.api_url):
+            return await self._request_segment_translations_async(segments)
+    
+    def _is_short_chunk(self, chunk):
+        """
+        判断文本块是否足够短，可以与其他短块合并为一次请求
         
-        # HTTP请求头
-        self.headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.api_key}"
-        }
+        Args:
+            chunk (str): 文本块
+            
+        Returns:
+            bool: 是否合并请求
+        """
+        return self.batcher is not None and estimate_tokens(chunk) <= self.batch_chunk_tokens
     
-    def translate(self, text):
+    @staticmethod
+    def _chunk_segments(chunk):
         """
-        翻译文本（子类需要实现）
+        把文本块按段落拆分为单行片段，用于编号翻译
+        
+        Args:
+            chunk (str): 文本块
+            
+        Returns:
+            list: 各段落合并空白后的文本
         """
-        raise NotImplementedError("Subclasses must implement this method")
+        return [" ".join(paragraph.split()) for paragraph in chunk.split("\n\n") if paragraph.strip()]
     
-    def _create_translation_prompt(self, text):
+    def _batch_key(self):
         """
-        创建翻译提示词（子类需要实现）
+        获取批量合并的键，只有发送到同一模型、参数相同的请求才合并
+        
+        Returns:
+            str: 批量合并的键
         """
-        raise NotImplementedError("Subclasses must implement this method")
+        return f"{self.api_url} {self.model_name} {self.temperature} {self.max_tokens}"
     
-    def _call_api(self, messages):
+    async def _batch_segments_async(self, segments):
         """
-        调用API，发送请求并返回响应
+        把较短的片段与同时进行的其他请求合并翻译（异步版本）
         
         Args:
-            messages (list): 消息内容
+            segments (list): 按顺序排列的英文片段
             
         Returns:
-            dict: API响应
+            list: 按顺序排列的翻译，未合并或合并的响应无法解析时为None（调用方单独请求）
         """
-        payload = {
-            "model": self.model_name,
-            "messages": messages,
-            "temperature": self.temperature,
-            "max_tokens": self.max_tokens
-        }
+        tokens = sum(estimate_tokens(segment) for segment in segments)
+        if self.batcher is None or not segments or tokens > self.batch_chunk_tokens:
+            return None
+        return await self.batcher.call_async(
+            self._batch_key(), segments, tokens, self._request_segment_translations_in_slot_async
+        )
+    
+    def _batch_chunk(self, chunk, translations, report):
+        """
+        合并短块的批量翻译结果
         
-        try:
-            response = requests.post(
-                self.api_url,
-                headers=self.headers,
-                json=payload,
-                timeout=30
-            )
-            
-            if response.status_code != 200:
-                error_message = f"API请求失败，状态码 {response.status_code}: {response.text}"
-                if response.status_code == 429:
-                    error_message = f"服务器繁忙 (429): {response.text}"
-                elif response.status_code == 401:
-                    error_message = f"API认证失败 (401): {response.text}"
-                
-                raise Exception(error_message)
+        Args:
+            chunk (str): 文本块
+            translations (list): 各段落的翻译，未合并时为None
+            report (ReuseReport): 记录翻译记忆复用情况
             
-            return response.json()
-        except requests.RequestException as e:
-            raise Exception(f"网络请求错误: {str(e)}")
+        Returns:
+            str: 翻译文本，未合并时为None（调用方改为单独请求）
+        """
+        if translations is None:
+            return None
+        report.add(self._count_sentences(chunk), 0, 0)
+        return "\n\n".join(translations)
     
-    def _extract_translation(self, response):
+    def _parse_translation_response(self, response):
         """
-        从API响应中提取翻译内容
+        从翻译请求的响应中取出翻译（子类可以重写以解析特定的响应格式）
         
         Args:
             response (dict): API响应
@@ -104,14 +1649,23 @@ class TranslationModel:
         Returns:
             str: 翻译文本
         """
-        try:
-            return response["choices"][0]["message"]["content"]
-        except (KeyError, IndexError) as e:
-            raise Exception(f"无法从API响应中提取翻译: {e}")
+        return self._extract_translation(response)
     
     def extract_vocabulary(self, text):
         """
-        从文本中提取词汇（通用方法，子类可以重写）
+        从文本中提取词汇（在共享的后台事件循环上运行 extract_vocabulary_async）
+        
+        Args:
+            text (str): 要提取词汇的文本
+            
+        Returns:
+            str: 提取的词汇
+        """
+        return run_sync(self.extract_vocabulary_async(text))
+    
+    async def extract_vocabulary_async(self, text):
+        """
+        从文本中提取词汇（异步版本）
         
         Args:
             text (str): 要提取词汇的文本
@@ -121,42 +1675,329 @@ class TranslationModel:
         """
         # 分割文本为小块
         chunks = self._split_text(text)
-        vocabulary_sections = []
         
         try:
             print(f"[DEBUG] {self.name}: 开始提取词汇, 共分割为 {len(chunks)} 个块")
             
-            for i, chunk in enumerate(chunks):
-                print(f"[DEBUG] {self.name}: 处理第 {i+1}/{len(chunks)} 个块")
-                prompt = self._create_vocabulary_prompt(chunk)
-                print(f"[DEBUG] {self.name}: 创建提示词完成，准备调用API")
+            # 并发提取各块词汇，结果按原顺序返回
+            return self._join_vocabulary(await self._process_chunks_async(
+                chunks, lambda model, chunk, index, stream: model._extract_chunk_vocabulary_async(chunk)
+            ))
+        except Exception as e:
+            print(f"[DEBUG] {self.name}: 词汇提取过程中发生错误: {str(e)}")
+            raise
+    
+    def _join_vocabulary(self, vocabularies):
+        """
+        合并各块的词汇
+        
+        Args:
+            vocabularies (list): 按原顺序排列的各块词汇
+            
+        Returns:
+            str: 合并后的词汇
+        """
+        vocabulary_sections = [vocabulary for vocabulary in vocabularies if vocabulary]
+        
+        # 合并所有词汇部分
+        if vocabulary_sections:
+            print(f"[DEBUG] {self.name}: 成功提取 {len(vocabulary_sections)} 个词汇部分")
+            return "\n\n".join(vocabulary_sections)
+        else:
+            print(f"[DEBUG] {self.name}: 未能提取任何词汇部分")
+            return "未找到词汇解析部分。"
+    
+    async def _extract_chunk_vocabulary_async(self, chunk):
+        """
+        提取单个文本块的词汇（异步版本）
+        
+        Args:
+            chunk (str): 文本块
+            
+        Returns:
+            str: 提取的词汇，未找到时为空字符串
+        """
+        vocabulary = self._recall('vocabulary', chunk)
+        if vocabulary is None:
+            prompt = self._create_vocabulary_prompt(chunk)
+            response = await self._call_api_async(prompt, stage='vocabulary')
+            vocabulary = self._parse_vocabulary_response(response)
+            if self._finish_reason(response) != 'length':
+                self._remember('vocabulary', chunk, vocabulary)
+        return vocabulary
+    
+    def _parse_vocabulary_response(self, response):
+        """
+        从词汇请求的响应中取出词汇（子类可以重写以解析特定的响应格式）
+        
+        Args:
+            response (dict): API响应
+            
+        Returns:
+            str: 提取的词汇，未找到时为空字符串
+        """
+        return self._extract_formatted_vocabulary(response)
+    
+    def _recall(self, task, chunk):
+        """
+        从翻译记忆中查找块的结果
+        
+        Args:
+            task (str): "translation" 或 "vocabulary"
+            chunk (str): 文本块
+            
+        Returns:
+            str: 已保存的结果，未命中或未启用翻译记忆时为None
+        """
+        if self.memory is None:
+            return None
+        return self.memory.get(task, self.model_name, self.PROMPT_VERSION, self.temperature, chunk)
+    
+    def _remember(self, task, chunk, result):
+        """
+        把块的结果保存到翻译记忆
+        
+        Args:
+            task (str): "translation" 或 "vocabulary"
+            chunk (str): 文本块
+            result (str): 处理结果
+        """
+        if self.memory is not None:
+            self.memory.put(task, self.model_name, self.PROMPT_VERSION, self.temperature, chunk, result)
+    
+    async def _process_chunks_async(self, chunks, process_chunk, schedule=None, streams=None, prepare_chunk=None):
+        """
+        在当前事件循环中并发处理文本块，并按原顺序返回结果
+        
+        同一服务商的并发请求数受所有翻译器共享的信号量限制。失败的块会按指数
+        退避单独重试，不影响其他块。
+        
+        Args:
+            chunks (list): 文本块列表
+            process_chunk (callable): process_chunk(model, chunk, index, stream)，用指定模型处理单个块的协程函数；
+                                      没有时间预算时model就是当前模型
+            schedule (DeadlineSchedule): 可选，本次处理的时间预算
+            streams (list): 可选，各块的输出队列（_ChunkStream），用于流式输出
+            prepare_chunk (callable): 可选，prepare_chunk(chunk)，在占用并发名额之前调用的协程函数；
+                                      返回结果时不再调用 process_chunk，返回None时照常处理
+            
+        Returns:
+            list: 与chunks顺序一致的结果列表
+            
+        Raises:
+            ChunkTranslationError: 有块在重试后仍然失败
+        """
+        semaphore = _get_provider_async_semaphore(self.api_url)
+        outcomes = await asyncio.gather(*[
+            self._process_chunk_with_retry_async(
+                process_chunk, chunk, i, len(chunks), semaphore, schedule,
+                streams[i] if streams is not None else None, prepare_chunk
+            )
+            for i, chunk in enumerate(chunks)
+        ], return_exceptions=True)
+        
+        results = [None] * len(chunks)
+        errors = {}
+        for i, outcome in enumerate(outcomes):
+            if isinstance(outcome, BaseException):
+                errors[i] = outcome
+            else:
+                results[i] = outcome
+        
+        self._raise_chunk_errors(results, errors)
+        return results
+    
+    def _raise_chunk_errors(self, results, errors):
+        """
+        有块处理失败时抛出包含已成功结果的异常
+        
+        Args:
+            results (list): 按原顺序排列的各块结果
+            errors (dict): 失败块的序号到异常的映射
+        """
+        if errors:
+            details = "; ".join(f"第 {i+1} 块: {str(e)}" for i, e in sorted(errors.items()))
+            raise ChunkTranslationError(
+                f"{len(errors)}/{len(results)} 个块处理失败: {details}", results, errors
+            )
+    
+    async def _process_chunk_with_retry_async(self, process_chunk, chunk, index, total, semaphore, schedule=None,
+                                              stream=None, prepare_chunk=None):
+        """
+        处理单个文本块，失败时按指数退避重试；已经流式输出了部分译文的块不再重试
+        
+        Args:
+            process_chunk (callable): 处理单个块的协程函数，见 _process_chunks_async
+            chunk (str): 文本块
+            index (int): 块序号（从0开始）
+            total (int): 块总数
+            semaphore (asyncio.Semaphore): 服务商的并发信号量
+            schedule (DeadlineSchedule): 可选，本次处理的时间预算
+            stream (_ChunkStream): 可选，该块的输出队列，完成或失败时通知
+            prepare_chunk (callable): 可选，在占用并发名额之前调用的协程函数，见 _process_chunks_async
+            
+        Returns:
+            处理结果
+        """
+        for attempt in range(self.CHUNK_RETRIES + 1):
+            try:
+                result = None
+                if prepare_chunk is not None and \
+                        (schedule is None or schedule.assess(self.max_concurrency) != DeadlineSchedule.EXPIRED):
+                    result = await prepare_chunk(chunk)
+                    if result is not None and schedule is not None:
+                        schedule.finish(index)
                 
-                try:
-                    response = self._call_api(prompt)
-                    print(f"[DEBUG] {self.name}: API调用成功，分析返回内容")
-                    
-                    # 从响应中提取词汇部分
-                    vocabulary = self._extract_formatted_vocabulary(response)
-                    print(f"[DEBUG] {self.name}: 提取词汇内容完成，长度: {len(vocabulary) if vocabulary else 0}")
-                    
-                    if vocabulary:
-                        print(f"[DEBUG] {self.name}: 发现词汇")
-                        vocabulary_sections.append(vocabulary)
-                except Exception as e:
-                    print(f"[DEBUG] {self.name}: 处理块 {i+1} 时出错: {str(e)}")
+                if result is not None:
+                    pass
+                elif schedule is not None:
+                    result = await self._process_chunk_by_deadline_async(
+                        process_chunk, chunk, index, total, semaphore, schedule, stream
+                    )
+                else:
+                    # 只在请求期间占用并发名额，等待重试时释放
+                    async with semaphore:
+                        print(f"[DEBUG] {self.name}: 处理第 {index+1}/{total} 个块")
+                        result = await process_chunk(self, chunk, index, stream)
+            except Exception as e:
+                if attempt == self.CHUNK_RETRIES or (stream is not None and stream.emitted):
+                    print(f"[DEBUG] {self.name}: 处理块 {index+1} 时出错: {str(e)}")
+                    if stream is not None:
+                        stream.fail(e)
                     raise
+                delay = self.CHUNK_RETRY_DELAY * (2 ** attempt)
+                print(f"[DEBUG] {self.name}: 处理块 {index+1} 时出错，{delay:.0f}秒后重试: {str(e)}")
+                await asyncio.sleep(delay)
+                continue
+            
+            if stream is not None:
+                stream.finish(result)
+            return result
+    
+    async def _process_chunk_by_deadline_async(self, process_chunk, chunk, index, total, semaphore, schedule,
+                                               stream=None):
+        """
+        在时间预算内处理单个文本块
+        
+        预计会超出时间限制时，如果本服务商的并发名额已满，改用备用服务商上的同一模型
+        以增加并发数；取得名额后仍然预计超时则改用更快的模型，更快的模型在其他服务商上时
+        释放当前名额，改为占用该服务商的名额。超过时间限制后才轮到的块不再请求，保留原文。
+        
+        Args:
+            process_chunk (callable): 处理单个块的协程函数，见 _process_chunks_async
+            chunk (str): 文本块
+            index (int): 块序号（从0开始）
+            total (int): 块总数
+            semaphore (asyncio.Semaphore): 服务商的并发信号量
+            schedule (DeadlineSchedule): 本次处理的时间预算
+            stream (_ChunkStream): 可选，该块的输出队列
+            
+        Returns:
+            处理结果
+        """
+        model, semaphore = self._deadline_slot(semaphore, index, schedule, semaphore.locked())
+        async with semaphore:
+            model = self._degrade_for_deadline(model, chunk, index, schedule)
+            if model is None:
+                return self._untranslated_chunk(chunk)
             
-            # 合并所有词汇部分
-            if vocabulary_sections:
-                print(f"[DEBUG] {self.name}: 成功提取 {len(vocabulary_sections)} 个词汇部分")
-                result = "\n\n".join(vocabulary_sections)
+            model_semaphore = _get_provider_async_semaphore(model.api_url)
+            if model_semaphore is semaphore:
+                print(f"[DEBUG] {self.name}: 处理第 {index+1}/{total} 个块（{model.name}）")
+                result = await process_chunk(model, chunk, index, stream)
+                schedule.finish(index)
                 return result
-            else:
-                print(f"[DEBUG] {self.name}: 未能提取任何词汇部分")
-                return "未找到词汇解析部分。"
-        except Exception as e:
-            print(f"[DEBUG] {self.name}: 词汇提取过程中发生错误: {str(e)}")
-            raise
+        
+        # 更快的模型在其他服务商上，同样受该服务商的并发上限限制
+        async with model_semaphore:
+            print(f"[DEBUG] {self.name}: 处理第 {index+1}/{total} 个块（{model.name}）")
+            result = await process_chunk(model, chunk, index, stream)
+            schedule.finish(index)
+            return result
+    
+
+    def _deadline_slot(self, semaphore, index, schedule, saturated):
+        """
+        选择等待并发名额的服务商：本服务商的名额已满且预计超时时，改用备用服务商
+        
+        Args:
+            semaphore (asyncio.Semaphore): 本服务商的并发信号量
+            index (int): 块序号
+            schedule (DeadlineSchedule): 本次处理的时间预算
+            saturated (bool): 本服务商的并发名额是否已满
+            
+        Returns:
+            tuple: (处理该块的模型, 要占用的并发信号量)
+        """
+        if not saturated or schedule.assess(self.max_concurrency) != DeadlineSchedule.AT_RISK:
+            return self, semaphore
+        
+        partner = self._get_hedge_partner() if self.HEDGE_PROVIDER else None
+        if partner is None:
+            return self, semaphore
+        
+        schedule.degrade(index, DeadlineSchedule.EXTRA_PROVIDER, partner.name)
+        print(f"[DEBUG] {self.name}: 第 {index+1} 块预计超时，改用 {partner.name}")
+        return partner, _get_provider_async_semaphore(partner.api_url)
+    
+    def _degrade_for_deadline(self, model, chunk, index, schedule):
+        """
+        在取得并发名额、即将发送请求时重新评估时间预算
+        
+        Args:
+            model (TranslationModel): 当前选定的模型
+            chunk (str): 文本块
+            index (int): 块序号
+            schedule (DeadlineSchedule): 本次处理的时间预算
+            
+        Returns:
+            TranslationModel: 处理该块的模型；已经超过时间限制时为None
+        """
+        state = schedule.assess(self.max_concurrency)
+        if state == DeadlineSchedule.EXPIRED:
+            schedule.degrade(index, DeadlineSchedule.PARTIAL)
+            print(f"[DEBUG] {self.name}: 已超过时间限制，第 {index+1} 块保留原文")
+            return None
+        
+        if state == DeadlineSchedule.AT_RISK and model is self:
+            fast = self._get_fast_model(chunk)
+            if fast is not None:
+                schedule.degrade(index, DeadlineSchedule.FAST_MODEL, fast.name)
+                print(f"[DEBUG] {self.name}: 第 {index+1} 块预计超时，改用 {fast.name}")
+                return fast
+        return model
+    
+    def _get_fast_model(self, chunk):
+        """
+        获取预计超时时改用的更快模型，与当前模型共用用量账本
+        
+        Args:
+            chunk (str): 要处理的文本块
+            
+        Returns:
+            TranslationModel: 更快的模型，没有时为None
+        """
+        if self.FAST_MODEL_TYPE is None:
+            return None
+        if self._fast_model is None or self._fast_model.usage is not self.usage:
+            try:
+                self._fast_model = TranslatorFactory.create_translator(self.FAST_MODEL_TYPE, usage=self.usage)
+            except ValueError:
+                return None
+        return self._fast_model
+    
+    @staticmethod
+    def _untranslated_chunk(chunk):
+        """
+        超过时间限制而没有翻译的块，输出标记和原文
+        
+        Args:
+            chunk (str): 文本块
+            
+        Returns:
+            str: 带标记的原文
+        """
+        return f"[未翻译：超出时间限制]\n{chunk}"
     
     def _extract_formatted_vocabulary(self, response):
         """
@@ -216,42 +2057,102 @@ class TranslationModel:
 """}
         ]
     
-    def _split_text(self, text, max_chunk_size=3000):
+    def _chunk_token_budget(self):
+        """
+        计算每块原文允许的最大token数
+        
+        同时受输入预算（上下文窗口减去提示词和输出后的一部分）和输出预算
+        （max_tokens的一部分按输出膨胀比例折算）限制。
+        
+        Returns:
+            int: 每块原文的最大token数
+        """
+        input_budget = (self.CONTEXT_WINDOW - self.max_tokens - self.PROMPT_OVERHEAD_TOKENS) * self.chunk_input_share
+        output_budget = self.max_tokens * self.chunk_output_share / self.OUTPUT_EXPANSION_RATIO
+        return max(1, int(min(input_budget, output_budget)))
+    
+    def _split_text(self, text, max_chunk_tokens=None):
         """
-        将文本分割成小块，避免超出token限制
+        将文本分割成小块，在不超出模型限制的前提下尽量填满每块
         
         Args:
             text (str): 要分割的文本
-            max_chunk_size (int): 每块的最大大小
+            max_chunk_tokens (int): 每块的最大token数（默认按模型限制计算）
             
         Returns:
             list: 文本块列表
         """
-        if not text or len(text) <= max_chunk_size:
+        if max_chunk_tokens is None:
+            max_chunk_tokens = self._chunk_token_budget()
+        
+        if not text or estimate_tokens(text) <= max_chunk_tokens:
             return [text]
+        
+        # 按段落分割以保持上下文，超长段落在句子边界处拆开
+        pieces = []
+        for paragraph in text.split("\n\n"):
+            if estimate_tokens(paragraph) > max_chunk_tokens:
+                pieces.extend(self._split_paragraph(paragraph, max_chunk_tokens))
+            else:
+                pieces.append(paragraph)
+        
+        return self._pack_pieces(pieces, "\n\n", max_chunk_tokens)
+    
+    def _split_paragraph(self, paragraph, max_chunk_tokens):
+        """
+        在句子边界处拆分超长段落，单个超长句子再按单词拆分
+        
+        Args:
+            paragraph (str): 段落
+            max_chunk_tokens (int): 每块的最大token数
             
-        # 按段落分割以保持上下文
-        paragraphs = text.split("\n\n")
+        Returns:
+            list: 不超过限制的段落片段
+        """
+        pieces = []
+        for sentence in split_sentences(paragraph):
+            if estimate_tokens(sentence) > max_chunk_tokens:
+                pieces.extend(self._pack_pieces(sentence.split(" "), " ", max_chunk_tokens))
+            else:
+                pieces.append(sentence)
+        
+        return self._pack_pieces(pieces, " ", max_chunk_tokens)
+    
+    @staticmethod
+    def _pack_pieces(pieces, separator, max_chunk_tokens):
+        """
+        按顺序把片段合并成不超过限制的块
         
+        Args:
+            pieces (list): 文本片段
+            separator (str): 片段之间的分隔符
+            max_chunk_tokens (int): 每块的最大token数
+            
+        Returns:
+            list: 文本块列表
+        """
         chunks = []
-        current_chunk = ""
-        
-        for paragraph in paragraphs:
-            # 如果添加这个段落会超出最大大小，则开始一个新块
-            if len(current_chunk) + len(paragraph) > max_chunk_size:
-                if current_chunk:  # 只在非空时添加
-                    chunks.append(current_chunk)
-                current_chunk = paragraph
-            else:
-                if current_chunk:
-                    current_chunk += "\n\n" + paragraph
-                else:
-                    current_chunk = paragraph
+        current_pieces = []
+        current_tokens = 0
+        separator_tokens = estimate_tokens(separator)
         
-        # 添加最后一块（如果非空）
-        if current_chunk:
-            chunks.append(current_chunk)
+        for piece in pieces:
+            piece_tokens = estimate_tokens(piece)
+            # 如果添加这个片段会超出限制，则开始一个新块
+            if current_pieces and current_tokens + separator_tokens + piece_tokens > max_chunk_tokens:
+                chunks.append(separator.join(current_pieces))
+                current_pieces = []
+                current_tokens = 0
             
+            if current_pieces:
+                current_tokens += separator_tokens
+            current_pieces.append(piece)
+            current_tokens += piece_tokens
+        
+        # 添加最后一块（如果非空）
+        if current_pieces:
+            chunks.append(separator.join(current_pieces))
+        
         return chunks
 
 
@@ -259,6 +2160,22 @@ class DeepseekReasonerModel(TranslationModel):
     """
     使用Deepseek Reasoner模型的翻译器
     """
+    # 回复中除了翻译还包含重点词汇解析
+    OUTPUT_EXPANSION_RATIO = 2.0
+    
+    # 推理模型先输出思考过程，预计超时时改用聊天模型
+    FAST_MODEL_TYPE = "deepseek-chat"
+    
+    HEDGE_PROVIDER = {
+        "name": "OpenRouter",
+        "api_url": "https://openrouter.ai/api/v1/chat/completions",
+        "api_key_env": "OPENROUTER_API_KEY",
+        "model_name": "deepseek/deepseek-r1",
+        "headers": {
+            "HTTP-Referer": "https://pdf-reader-assistant.com",
+            "X-Title": "PDF Reader Assistant"
+        }
+    }
     
     def __init__(self):
         """
@@ -273,84 +2190,67 @@ class DeepseekReasonerModel(TranslationModel):
             max_tokens=4096
         )
     
-    def translate(self, text):
+    def _parse_translation_response(self, response):
         """
-        翻译英文文本为中文
+        从翻译请求的响应中取出翻译
         
         Args:
-            text (str): 要翻译的文本
+            response (dict): API响应
             
         Returns:
-            str: 翻译后的文本
+            str: 翻译文本
         """
-        # 分割文本为小块
-        chunks = self._split_text(text)
-        translations = []
+        # 提取翻译部分
+        return self._extract_formatted_translation(response)
+    
+    def translate_with_vocabulary(self, text, on_translation=None, deadline=None):
+        """
+        一次请求同时完成翻译和词汇解析
         
-        for chunk in chunks:
-            prompt = self._create_translation_prompt(chunk)
-            response = self._call_api(prompt)
+        翻译提示词本身就要求模型在翻译后给出重点词汇解析，这里把两部分都取出来，
+        不必再为词汇单独请求一遍相同的文本。
+        
+        Args:
+            text (str): 要翻译的文本
+            on_translation (callable): 可选，每收到一段译文时调用（在后台事件循环线程中调用）
+            deadline (float): 可选，翻译的时间限制（秒）；改用聊天模型或保留原文的块没有词汇解析
             
-            # 提取翻译部分
-            translation = self._extract_formatted_translation(response)
-            translations.append(translation)
+        Returns:
+            tuple: (翻译, 词汇解析)
+        """
+        return run_sync(self.translate_with_vocabulary_async(text, on_translation, deadline))
+    
+    async def translate_with_vocabulary_async(self, text, on_translation=None, deadline=None):
+        """
+        一次请求同时完成翻译和词汇解析（异步版本）
         
-        # 合并所有翻译
-        result = "\n\n".join(translations)
+        Args:
+            text (str): 要翻译的文本
+            on_translation (callable): 可选，每收到一段译文时调用
+            deadline (float): 可选，翻译的时间限制（秒）
+            
+        Returns:
+            tuple: (翻译, 词汇解析)
+        """
+        print(f"[DEBUG] {self.name}: 开始合并翻译和词汇解析")
         
-        # 确保结果以"翻译："开头
-        if not result.strip().startswith("翻译："):
-            result = "翻译：\n" + result
+        parts = []
+        vocabularies = []
+        async for delta in self._stream_translation(text, vocabularies, deadline):
+            parts.append(delta)
+            if on_translation is not None:
+                on_translation(delta)
         
-        return result
+        return "".join(parts), self._join_vocabulary(vocabularies)
     
-    def extract_vocabulary(self, text):
+    def _create_stream_filter(self):
         """
-        从文本中提取词汇
+        创建流式输出过滤器，只输出翻译标记之间的内容
         
-        Args:
-            text (str): 要提取词汇的文本
-            
         Returns:
-            str: 提取的词汇
+            _SectionFilter: 过滤器
         """
-        # 分割文本为小块
-        chunks = self._split_text(text)
-        vocabulary_sections = []
-        
-        try:
-            print(f"[DEBUG] {self.name}: 开始提取词汇, 共分割为 {len(chunks)} 个块")
-            
-            for i, chunk in enumerate(chunks):
-                print(f"[DEBUG] {self.name}: 处理第 {i+1}/{len(chunks)} 个块")
-                # 使用专门的词汇提取提示词
-                prompt = self._create_vocabulary_prompt(chunk)
-                print(f"[DEBUG] {self.name}: 创建提示词完成，准备调用API")
-                
-                try:
-                    response = self._call_api(prompt)
-                    print(f"[DEBUG] {self.name}: API调用成功，分析返回内容")
-                    
-                    # 提取词汇部分
-                    vocabulary = self._extract_formatted_vocabulary(response)
-                    print(f"[DEBUG] {self.name}: 提取词汇内容完成，长度: {len(vocabulary) if vocabulary else 0}")
-                    
-                    if vocabulary:
-                        vocabulary_sections.append(vocabulary)
-                except Exception as e:
-                    print(f"[DEBUG] {self.name}: 处理块 {i+1} 时出错: {str(e)}")
-                    raise
-            
-            # 合并所有词汇部分
-            if vocabulary_sections:
-                print(f"[DEBUG] {self.name}: 成功提取 {len(vocabulary_sections)} 个词汇部分")
-                return "\n\n".join(vocabulary_sections)
-            else:
-                print(f"[DEBUG] {self.name}: 未能提取任何词汇部分")
-                return "未找到词汇解析部分。"
-        except Exception as e:
-            print(f"[DEBUG] {self.name}: 词汇提取过程中发生错误: {str(e)}")
-            raise
+        return _SectionFilter("===开始翻译===", "===结束翻译===")
     
     def _create_translation_prompt(self, text):
         """
@@ -446,6 +2346,16 @@ class DeepseekChatModel(TranslationModel):
     """
     使用Deepseek Chat模型的翻译器
     """
+    HEDGE_PROVIDER = {
+        "name": "OpenRouter",
+        "api_url": "https://openrouter.ai/api/v1/chat/completions",
+        "api_key_env": "OPENROUTER_API_KEY",
+        "model_name": "deepseek/deepseek-chat",
+        "headers": {
+            "HTTP-Referer": "https://pdf-reader-assistant.com",
+            "X-Title": "PDF Reader Assistant"
+        }
+    }
     
     def __init__(self):
         """
@@ -460,35 +2370,6 @@ class DeepseekChatModel(TranslationModel):
             max_tokens=4096
         )
     
-    def translate(self, text):
-        """
-        翻译英文文本为中文
-        
-        Args:
-            text (str): 要翻译的文本
-            
-        Returns:
-            str: 翻译后的文本
-        """
-        # 分割文本为小块
-        chunks = self._split_text(text)
-        translations = []
-        
-        for chunk in chunks:
-            prompt = self._create_translation_prompt(chunk)
-            response = self._call_api(prompt)
-            translation = self._extract_translation(response)
-            translations.append(translation)
-        
-        # 合并所有翻译
-        result = "\n\n".join(translations)
-        
-        # 确保结果以"翻译："开头
-        if not result.strip().startswith("翻译："):
-            result = "翻译：\n" + result
-        
-        return result
-    
     def _create_translation_prompt(self, text):
         """
         创建翻译提示词
@@ -504,56 +2385,23 @@ class DeepseekChatModel(TranslationModel):
             {"role": "user", "content": f"请将以下英文文本翻译成中文，保持专业、准确的翻译质量：\n\n{text}"}
         ]
     
-    def extract_vocabulary(self, text):
+    def _parse_vocabulary_response(self, response):
         """
-        从文本中提取词汇
+        从词汇请求的响应中取出词汇
         
         Args:
-            text (str): 要提取词汇的文本
+            response (dict): API响应
             
         Returns:
-            str: 提取的词汇
+            str: 提取的词汇，未找到时为空字符串
         """
-        # 分割文本为小块
-        chunks = self._split_text(text)
-        vocabulary_sections = []
+        # 直接使用返回内容
+        vocabulary = self._extract_translation(response)
+        if vocabulary and "重点词汇解析" not in vocabulary:
+            print(f"[DEBUG] {self.name}: 未找到词汇标记，添加标准前缀")
+            vocabulary = "重点词汇解析：\n" + vocabulary
         
-        try:
-            print(f"[DEBUG] {self.name}: 开始提取词汇, 共分割为 {len(chunks)} 个块")
-            
-            for i, chunk in enumerate(chunks):
-                print(f"[DEBUG] {self.name}: 处理第 {i+1}/{len(chunks)} 个块")
-                prompt = self._create_vocabulary_prompt(chunk)
-                print(f"[DEBUG] {self.name}: 创建提示词完成，准备调用API")
-                
-                try:
-                    response = self._call_api(prompt)
-                    print(f"[DEBUG] {self.name}: API调用成功，分析返回内容")
-                    
-                    # 直接使用返回内容
-                    vocabulary = self._extract_translation(response)
-                    print(f"[DEBUG] {self.name}: 提取词汇内容完成，长度: {len(vocabulary) if vocabulary else 0}")
-                    
-                    if vocabulary and "重点词汇解析" in vocabulary:
-                        print(f"[DEBUG] {self.name}: 发现词汇标记")
-                        vocabulary_sections.append(vocabulary)
-                    elif vocabulary:
-                        print(f"[DEBUG] {self.name}: 未找到词汇标记，添加标准前缀")
-                        vocabulary_sections.append("重点词汇解析：\n" + vocabulary)
-                except Exception as e:
-                    print(f"[DEBUG] {self.name}: 处理块 {i+1} 时出错: {str(e)}")
-                    raise
-            
-            # 合并所有词汇部分
-            if vocabulary_sections:
-                print(f"[DEBUG] {self.name}: 成功提取 {len(vocabulary_sections)} 个词汇部分")
-                return "\n\n".join(vocabulary_sections)
-            else:
-                print(f"[DEBUG] {self.name}: 未能提取任何词汇部分")
-                return "未找到词汇解析部分。"
-        except Exception as e:
-            print(f"[DEBUG] {self.name}: 词汇提取过程中发生错误: {str(e)}")
-            raise
+        return vocabulary
     
     def _create_vocabulary_prompt(self, text):
         """
@@ -594,6 +2442,12 @@ class OpenRouterDeepseekModel(TranslationModel):
     """
     通过OpenRouter API使用Deepseek模型的翻译器
     """
+    HEDGE_PROVIDER = {
+        "name": "DeepSeek",
+        "api_url": "https://api.deepseek.com/v1/chat/completions",
+        "api_key_env": "DEEPSEEK_API_KEY",
+        "model_name": "deepseek-chat"
+    }
     
     def __init__(self):
         """
@@ -614,35 +2468,6 @@ class OpenRouterDeepseekModel(TranslationModel):
             "X-Title": "PDF Reader Assistant"
         })
     
-    def translate(self, text):
-        """
-        翻译英文文本为中文
-        
-        Args:
-            text (str): 要翻译的文本
-            
-        Returns:
-            str: 翻译后的文本
-        """
-        # 分割文本为小块
-        chunks = self._split_text(text)
-        translations = []
-        
-        for chunk in chunks:
-            prompt = self._create_translation_prompt(chunk)
-            response = self._call_api(prompt)
-            translation = self._extract_translation(response)
-            translations.append(translation)
-        
-        # 合并所有翻译
-        result = "\n\n".join(translations)
-        
-        # 确保结果以"翻译："开头
-        if not result.strip().startswith("翻译："):
-            result = "翻译：\n" + result
-        
-        return result
-    
     def _create_translation_prompt(self, text):
         """
         创建翻译提示词
@@ -658,56 +2483,23 @@ class OpenRouterDeepseekModel(TranslationModel):
             {"role": "user", "content": f"请将以下英文文本翻译成中文，保持专业、准确的翻译质量：\n\n{text}"}
         ]
     
-    def extract_vocabulary(self, text):
+    def _parse_vocabulary_response(self, response):
         """
-        从文本中提取词汇
+        从词汇请求的响应中取出词汇
         
         Args:
-            text (str): 要提取词汇的文本
+            response (dict): API响应
             
         Returns:
-            str: 提取的词汇
+            str: 提取的词汇，未找到时为空字符串
         """
-        # 分割文本为小块
-        chunks = self._split_text(text)
-        vocabulary_sections = []
+        # 直接使用返回内容
+        vocabulary = self._extract_translation(response)
+        if vocabulary and "重点词汇解析" not in vocabulary:
+            print(f"[DEBUG] {self.name}: 未找到词汇标记，添加标准前缀")
+            vocabulary = "重点词汇解析：\n" + vocabulary
         
-        try:
-            print(f"[DEBUG] {self.name}: 开始提取词汇, 共分割为 {len(chunks)} 个块")
-            
-            for i, chunk in enumerate(chunks):
-                print(f"[DEBUG] {self.name}: 处理第 {i+1}/{len(chunks)} 个块")
-                prompt = self._create_vocabulary_prompt(chunk)
-                print(f"[DEBUG] {self.name}: 创建提示词完成，准备调用API")
-                
-                try:
-                    response = self._call_api(prompt)
-                    print(f"[DEBUG] {self.name}: API调用成功，分析返回内容")
-                    
-                    # 直接使用返回内容
-                    vocabulary = self._extract_translation(response)
-                    print(f"[DEBUG] {self.name}: 提取词汇内容完成，长度: {len(vocabulary) if vocabulary else 0}")
-                    
-                    if vocabulary and "重点词汇解析" in vocabulary:
-                        print(f"[DEBUG] {self.name}: 发现词汇标记")
-                        vocabulary_sections.append(vocabulary)
-                    elif vocabulary:
-                        print(f"[DEBUG] {self.name}: 未找到词汇标记，添加标准前缀")
-                        vocabulary_sections.append("重点词汇解析：\n" + vocabulary)
-                except Exception as e:
-                    print(f"[DEBUG] {self.name}: 处理块 {i+1} 时出错: {str(e)}")
-                    raise
-            
-            # 合并所有词汇部分
-            if vocabulary_sections:
-                print(f"[DEBUG] {self.name}: 成功提取 {len(vocabulary_sections)} 个词汇部分")
-                return "\n\n".join(vocabulary_sections)
-            else:
-                print(f"[DEBUG] {self.name}: 未能提取任何词汇部分")
-                return "未找到词汇解析部分。"
-        except Exception as e:
-            print(f"[DEBUG] {self.name}: 词汇提取过程中发生错误: {str(e)}")
-            raise
+        return vocabulary
     
     def _create_vocabulary_prompt(self, text):
         """
@@ -744,6 +2536,376 @@ class OpenRouterDeepseekModel(TranslationModel):
         ]
 
 
+class _FailoverAborted(Exception):
+    """
+    后端失败，但已经输出了部分结果，不能再换到其他后端重试
+    """
+    def __init__(self, error):
+        super().__init__(str(error))
+        self.error = error
+
+
+class FailoverTranslator(TranslationModel):
+    """
+    自动故障转移的组合翻译器，每个块都交给当前最健康的后端翻译
+    
+    每个后端的错误率和延迟由进程内共享的熔断器跟踪。某个块在一个后端失败后
+    立即换到下一个后端重试，已经完成的块不受影响，不需要从头开始翻译整个文档。
+    """
+    
+    def __init__(self, backends):
+        """
+        初始化组合翻译器
+        
+        不调用基类的初始化方法：API密钥、请求头等都由各后端自己管理。
+        
+        Args:
+            backends (list): 按优先级排列的翻译模型，健康状况相同时优先使用靠前的
+        """
+        self.backends = backends
+        self.name = "Auto"
+        self.api_url = "auto://failover"
+        self.model_name = "auto"
+        self.max_concurrency = max(backend.max_concurrency for backend in backends)
+        
+        # 翻译记忆由所有后端共享，这里只用于统计显示
+        self.memory = backends[0].memory
+        self.sentence_memory = backends[0].sentence_memory
+        self.batcher = backends[0].batcher
+        self.hedger = next((backend.hedger for backend in backends if backend.hedger is not None), None)
+        self._hedge_partner = None
+        self._fast_model = None
+        
+        self.last_reuse_report = None
+        self.last_stream_metrics = None
+        self.last_deadline_report = None
+        self.last_translation_units = None
+        self.usage = UsageLedger()
+    
+    def use_usage_ledger(self, ledger):
+        """
+        把之后的API调用记录到指定的用量账本
+        
+        各后端换成浅拷贝，以免与其他任务的翻译器共用账本。
+        
+        Args:
+            ledger (UsageLedger): 用量账本
+        """
+        self.usage = ledger
+        self.backends = [copy.copy(backend) for backend in self.backends]
+        for backend in self.backends:
+            backend.use_usage_ledger(ledger)
+    
+    def _get_fast_model(self, chunk):
+        """
+        获取预计超时时改用的更快模型：只在没有更快模型的后端（聊天模型）之间故障转移
+        
+        Args:
+            chunk (str): 要处理的文本块
+            
+        Returns:
+            TranslationModel: 更快的模型，所有后端都是更快的模型或都不是时为None
+        """
+        fast = [backend for backend in self.backends if backend.FAST_MODEL_TYPE is None]
+        if not fast or len(fast) == len(self.backends):
+            return None
+        if self._fast_model is None or self._fast_model.usage is not self.usage:
+            if len(fast) == 1:
+                self._fast_model = fast[0]
+            else:
+                self._fast_model = FailoverTranslator(fast)
+                self._fast_model.name = f"{self.name} ({', '.join(backend.name for backend in fast)})"
+                self._fast_model.usage = self.usage
+        return self._fast_model
+    
+    def get_health(self):
+        """
+        获取各后端的健康状况
+        
+        Returns:
+            dict: 后端名称到状态、错误率和平均延迟的映射
+        """
+        return {backend.name: get_backend_health(backend.name).get_stats() for backend in self.backends}
+    
+    def _chunk_token_budget(self):
+        """
+        计算每块原文允许的最大token数，取所有后端中最小的，保证任何后端都能处理任意一块
+        
+        Returns:
+            int: 每块原文的最大token数
+        """
+        return min(backend._chunk_token_budget() for backend in self.backends)
+    
+    def _choose_backend(self, tried):
+        """
+        选择还没有尝试过的最健康的后端
+        
+        熔断器打开的后端排在最后，平均延迟超过上限的慢后端排在正常后端之后，
+        其次按最近的错误率和优先级排序。所有后端的
+        熔断器都打开时，第一次选择仍会使用错误率最低的后端，避免直接失败。
+        
+        Args:
+            tried (list): 这一块已经尝试过的后端
+            
+        Returns:
+            TranslationModel: 选中的后端，没有可用后端时为None
+        """
+        candidates = [backend for backend in self.backends if backend not in tried]
+        health = {backend.name: get_backend_health(backend.name) for backend in candidates}
+        candidates.sort(key=lambda backend: (
+            health[backend.name].state == BackendHealth.OPEN,
+            health[backend.name].is_slow(),
+            health[backend.name].error_rate(),
+            self.backends.index(backend)
+        ))
+        
+        for backend in candidates:
+            if health[backend.name].try_acquire():
+                return backend
+        
+        if candidates and not tried:
+            return candidates[0]
+        return None
+    
+    async def _run_with_failover_async(self, call):
+        """
+        在最健康的后端上执行调用，失败时换到下一个后端；调用期间占用该后端服务商的并发信号量
+        
+        Args:
+            call (callable): 接收后端并返回协程的函数
+            
+        Returns:
+            调用结果
+        """
+        tried = []
+        while True:
+            backend = self._choose_backend(tried)
+            if backend is None:
+                raise last_error
+            tried.append(backend)
+            health = get_backend_health(backend.name)
+            
+            start_time = time.monotonic()
+            try:
+                async with _get_provider_async_semaphore(backend.api_url):
+                    result = await call(backend)
+            except _FailoverAborted as e:
+                health.record_failure(time.monotonic() - start_time)
+                raise e.error
+            except Exception as e:
+                health.record_failure(time.monotonic() - start_time)
+                print(f"[DEBUG] {self.name}: {backend.name} 处理失败，切换到其他后端: {str(e)}")
+                last_error = e
+                continue
+            except BaseException:
+                health.release()
+                raise
+            
+            health.record_success(time.monotonic() - start_time)
+            return result
+    
+    async def _translate_chunk_without_slot_async(self, chunk, report):
+        """
+        在最健康的后端上尝试不整块请求地翻译单个文本块
+        
+        只使用熔断器关闭的后端；失败时记录到该后端的健康状况并返回None，
+        由调用方占用名额后整块请求并故障转移。
+        """
+        backend = next((backend for backend in self.backends
+                        if get_backend_health(backend.name).state == BackendHealth.CLOSED), None)
+        if backend is None:
+            return None
+        
+        start_time = time.monotonic()
+        try:
+            return await backend._translate_chunk_without_slot_async(chunk, report)
+        except Exception as e:
+            get_backend_health(backend.name).record_failure(time.monotonic() - start_time)
+            print(f"[DEBUG] {self.name}: {backend.name} 合并请求失败，改为整块请求: {str(e)}")
+            return None
+    
+    async def _translate_chunk_async(self, chunk, report=None, stream=None, vocabularies=None, index=None,
+                                     prepared=False):
+        """
+        在最健康的后端上翻译单个文本块
+        
+        后端在输出任何内容之前失败时换到下一个后端；已经流式输出部分译文后失败则
+        把错误交给调用方。
+        """
+        async def translate_on(backend):
+            try:
+                return await backend._translate_chunk_async(chunk, report, stream, vocabularies, index, prepared)
+            except Exception as e:
+                if stream is not None and stream.emitted:
+                    raise _FailoverAborted(e)
+                raise
+        
+        return await self._run_with_failover_async(translate_on)
+    
+    async def _extract_chunk_vocabulary_async(self, chunk):
+        """
+        在最健康的后端上提取单个文本块的词汇
+        """
+        return await self._run_with_failover_async(lambda backend: backend._extract_chunk_vocabulary_async(chunk))
+
+
+class RoutingTranslator(TranslationModel):
+    """
+    按块选择模型的组合翻译器：简单的叙述性文本块交给快速的聊天模型，
+    句子很长、生僻词多或包含公式、表格的块交给推理模型
+    
+    每个文档分块后由 ChunkRouter 打分，得分最高的一部分块（比例可配置）使用推理模型，
+    每块的选择保存在 last_routing 中。
+    """
+    
+    def __init__(self, fast, strong, router=None):
+        """
+        初始化组合翻译器
+        
+        不调用基类的初始化方法：API密钥、请求头等都由各后端自己管理。
+        
+        Args:
+            fast (TranslationModel): 处理简单块的快速模型
+            strong (TranslationModel): 处理复杂块的推理模型
+            router (ChunkRouter): 块分类器（默认按环境变量配置）
+        """
+        self.fast = fast
+        self.strong = strong
+        self.router = router or ChunkRouter()
+        self.name = "Routed"
+        self.api_url = "router://mixed"
+        self.model_name = "router"
+        self.max_concurrency = max(fast.max_concurrency, strong.max_concurrency)
+        
+        # 按块路由时使用较小的块，使同一文档中的简单段落和复杂段落能分开处理
+        self.router_chunk_tokens = int(os.getenv('ROUTER_CHUNK_TOKENS', 600))
+        
+        # 翻译记忆由两个模型共享，这里只用于统计显示
+        self.memory = fast.memory
+        self.sentence_memory = fast.sentence_memory
+        self.batcher = fast.batcher
+        self.hedger = fast.hedger or strong.hedger
+        self._hedge_partner = None
+        self._fast_model = None
+        
+        self._routes = {}
+        self.last_routing = None
+        self.last_reuse_report = None
+        self.last_stream_metrics = None
+        self.last_deadline_report = None
+        self.last_translation_units = None
+        self.usage = UsageLedger()
+    
+    def use_usage_ledger(self, ledger):
+        """
+        把之后的API调用记录到指定的用量账本
+        
+        两个模型换成浅拷贝，以免与其他任务的翻译器共用账本。
+        
+        Args:
+            ledger (UsageLedger): 用量账本
+        """
+        self.usage = ledger
+        self.fast = copy.copy(self.fast)
+        self.strong = copy.copy(self.strong)
+        self.fast.use_usage_ledger(ledger)
+        self.strong.use_usage_ledger(ledger)
+        self._routes = {}
+    
+    def _get_fast_model(self, chunk):
+        """
+        预计超时时原本交给推理模型的块改用快速模型
+        
+        Args:
+            chunk (str): 要处理的文本块
+            
+        Returns:
+            TranslationModel: 快速模型，块本来就使用快速模型时为None
+        """
+        return self.fast if self._route(chunk) is self.strong else None
+    
+    def _chunk_token_budget(self):
+        """
+        计算每块原文允许的最大token数，取两个模型和路由块大小中最小的
+        
+        Returns:
+            int: 每块原文的最大token数
+        """
+        return min(self.fast._chunk_token_budget(), self.strong._chunk_token_budget(), self.router_chunk_tokens)
+    
+    def _split_text(self, text, max_chunk_tokens=None):
+        """
+        分割文本，并为每块选择模型
+        
+        Args:
+            text (str): 要分割的文本
+            max_chunk_tokens (int): 每块的最大token数（默认按模型限制计算）
+            
+        Returns:
+            list: 文本块列表
+        """
+        chunks = super()._split_text(text, max_chunk_tokens)
+        decisions = self.router.plan(chunks)
+        
+        routes = {}
+        for i, (chunk, decision) in enumerate(zip(chunks, decisions)):
+            backend = self.strong if decision['dense'] else self.fast
+            routes[chunk] = backend
+            decision.update(chunk=i + 1, model=backend.name, preview=chunk[:60])
+            print(f"[DEBUG] {self.name}: 第 {i+1}/{len(chunks)} 块复杂度 {decision['score']:.2f}，使用 {backend.name}")
+        self._routes = routes
+        
+        strong_chunks = sum(1 for decision in decisions if decision['dense'])
+        self.last_routing = {
+            'chunks': len(chunks),
+            'strong_chunks': strong_chunks,
+            'strong_share': strong_chunks / len(chunks) if chunks else 0.0,
+            'fast_model': self.fast.name,
+            'strong_model': self.strong.name,
+            'decisions': decisions,
+        }
+        return chunks
+    
+    def _route(self, chunk):
+        """
+        获取处理文本块的模型，没有分块记录的块单独打分
+        
+        Args:
+            chunk (str): 文本块
+            
+        Returns:
+            TranslationModel: 选中的模型
+        """
+        backend = self._routes.get(chunk)
+        if backend is None:
+            dense = self.router.score(self.router.features(chunk)) >= self.router.min_score
+            backend = self.strong if dense else self.fast
+        return backend
+    
+    async def _translate_chunk_without_slot_async(self, chunk, report):
+        """
+        用选中的模型尝试不整块请求地翻译单个文本块
+        """
+        return await self._route(chunk)._translate_chunk_without_slot_async(chunk, report)
+    
+    async def _translate_chunk_async(self, chunk, report=None, stream=None, vocabularies=None, index=None,
+                                     prepared=False):
+        """
+        用选中的模型翻译单个文本块，占用该模型服务商的并发信号量
+        """
+        backend = self._route(chunk)
+        async with _get_provider_async_semaphore(backend.api_url):
+            return await backend._translate_chunk_async(chunk, report, stream, vocabularies, index, prepared)
+    
+    async def _extract_chunk_vocabulary_async(self, chunk):
+        """
+        用选中的模型提取单个文本块的词汇
+        """
+        backend = self._route(chunk)
+        async with _get_provider_async_semaphore(backend.api_url):
+            return await backend._extract_chunk_vocabulary_async(chunk)
+
+
 class TranslatorFactory:
     """
     翻译器工厂类，用于创建不同的翻译模型实例
@@ -753,19 +2915,30 @@ class TranslatorFactory:
     MODEL_DEEPSEEK_CHAT = "deepseek-chat"
     MODEL_OPENROUTER_DEEPSEEK = "openrouter-deepseek"
     MODEL_AUTO = "auto"
+    MODEL_ROUTED = "routed"
     
     # 向后兼容的翻译器类型常量
     TRANSLATOR_DEEPSEEK = "deepseek"
     TRANSLATOR_OPENROUTER = "openrouter"
     TRANSLATOR_AUTO = "auto"
     
+    # 每种模型类型已初始化好的实例
+    _instances = {}
+    _instances_lock = threading.Lock()
+    
     @staticmethod
-    def create_translator(model_type=MODEL_AUTO):
+    def create_translator(model_type=MODEL_AUTO, usage=None):
         """
-        创建翻译器实例
+        获取翻译器实例
+        
+        每种模型类型只初始化一次，之后返回它的浅拷贝：连接池、翻译记忆、限流器等
+        都与缓存的实例共享，只有 last_reuse_report 等单次调用的结果属于各自的拷贝，
+        因此多个线程可以同时使用。.env文件被修改后会重新加载配置并重建实例。
         
         Args:
             model_type (str): 模型类型
+            usage (UsageLedger): 记录API用量的账本，同一任务的多个翻译器可以共用一个；
+                                 为None时创建新的账本
             
         Returns:
             TranslationModel: 翻译模型实例
@@ -776,6 +2949,39 @@ class TranslatorFactory:
         elif model_type == TranslatorFactory.TRANSLATOR_OPENROUTER:
             model_type = TranslatorFactory.MODEL_OPENROUTER_DEEPSEEK
         
+        with TranslatorFactory._instances_lock:
+            if load_environment():
+                TranslatorFactory._instances.clear()
+            
+            translator = TranslatorFactory._instances.get(model_type)
+            if translator is None:
+                translator = TranslatorFactory._build_translator(model_type)
+                TranslatorFactory._instances[model_type] = translator
+        
+        translator = copy.copy(translator)
+        translator.use_usage_ledger(usage if usage is not None else UsageLedger())
+        return translator
+    
+    @staticmethod
+    def reload_config():
+        """
+        重新读取.env文件，并丢弃已缓存的翻译器，之后创建的翻译器使用新的配置
+        """
+        with TranslatorFactory._instances_lock:
+            load_environment(force=True)
+            TranslatorFactory._instances.clear()
+    
+    @staticmethod
+    def _build_translator(model_type):
+        """
+        初始化指定类型的翻译模型
+        
+        Args:
+            model_type (str): 模型类型
+            
+        Returns:
+            TranslationModel: 翻译模型实例
+        """
         # 创建对应的模型实例
         if model_type == TranslatorFactory.MODEL_DEEPSEEK_REASONER:
             return DeepseekReasonerModel()
@@ -784,9 +2990,23 @@ class TranslatorFactory:
         elif model_type == TranslatorFactory.MODEL_OPENROUTER_DEEPSEEK:
             return OpenRouterDeepseekModel()
         elif model_type == TranslatorFactory.MODEL_AUTO:
-            # 为了保持简单，Auto现在直接返回Deepseek Reasoner
-            # 如果需要自动故障转移，应用程序可以自行处理异常并切换模型
-            return DeepseekReasonerModel()
+            # 按优先级组合所有配置了API密钥的模型，由组合翻译器在它们之间自动故障转移
+            backends = []
+            first_error = None
+            for model_class in (DeepseekReasonerModel, DeepseekChatModel, OpenRouterDeepseekModel):
+                try:
+                    backends.append(model_class())
+                except ValueError as e:
+                    first_error = first_error or e
+            
+            if not backends:
+                raise first_error
+            if len(backends) == 1:
+                return backends[0]
+            return FailoverTranslator(backends)
+        elif model_type == TranslatorFactory.MODEL_ROUTED:
+            # 简单的块使用聊天模型，复杂的块使用推理模型
+            return RoutingTranslator(DeepseekChatModel(), DeepseekReasonerModel())
         else:
             raise ValueError(f"未知的模型类型: {model_type}")
 
@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import csv
+import json
+import threading
+
+# 每百万token的价格（美元）：(缓存命中的输入, 未命中缓存的输入, 输出)，
+# 可以通过 TOKEN_PRICES 环境变量（JSON，格式相同）覆盖或补充
+MODEL_PRICES = {
+    'deepseek-chat': (0.07, 0.27, 1.10),
+    'deepseek-reasoner': (0.14, 0.55, 2.19),
+    'deepseek/deepseek-chat': (0.27, 0.27, 1.10),
+    'deepseek/deepseek-r1': (0.55, 0.55, 2.19),
+}
+
+# CSV和汇总中的统计字段
+USAGE_FIELDS = ['calls', 'prompt_tokens', 'cache_hit_tokens', 'cache_miss_tokens',
+                'completion_tokens', 'reasoning_tokens', 'estimated_calls', 'total_latency']
+
+def get_model_prices():
+    """
+    Get the token prices of all known models.
+
+    Returns:
+        dict: Model name to (cache hit input, cache miss input, output) USD per million tokens
+    """
+    prices = dict(MODEL_PRICES)
+    if os.getenv('TOKEN_PRICES'):
+        prices.update({model: tuple(price) for model, price in json.loads(os.getenv('TOKEN_PRICES')).items()})
+    return prices
+
+def normalize_usage(usage):
+    """
+    Convert the usage block of an API response into common fields.
+
+    DeepSeek reports prompt cache hits as prompt_cache_hit_tokens, OpenAI
+    compatible providers such as OpenRouter as prompt_tokens_details.cached_tokens.
+
+    Args:
+        usage (dict): usage block of the response
+
+    Returns:
+        dict: prompt_tokens, cache_hit_tokens, cache_miss_tokens, completion_tokens and reasoning_tokens
+    """
+    prompt_tokens = usage.get('prompt_tokens') or 0
+    cache_hit_tokens = usage.get('prompt_cache_hit_tokens')
+    if cache_hit_tokens is None:
+        cache_hit_tokens = (usage.get('prompt_tokens_details') or {}).get('cached_tokens') or 0
+    return {
+        'prompt_tokens': prompt_tokens,
+        'cache_hit_tokens': cache_hit_tokens,
+        'cache_miss_tokens': usage.get('prompt_cache_miss_tokens', prompt_tokens - cache_hit_tokens),
+        'completion_tokens': usage.get('completion_tokens') or 0,
+        'reasoning_tokens': (usage.get('completion_tokens_details') or {}).get('reasoning_tokens') or 0,
+    }
+
+def add_usage(usage, other):
+    """
+    Add up the usage blocks of two API responses, e.g. a truncated reply and its continuation.
+
+    Args:
+        usage (dict): usage block of the first response
+        other (dict): usage block of the second response
+
+    Returns:
+        dict: usage block with every numeric field summed, nested blocks included
+    """
+    total = dict(usage)
+    for field, value in other.items():
+        if isinstance(value, dict):
+            total[field] = add_usage(total.get(field) or {}, value)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            total[field] = (total.get(field) or 0) + value
+        else:
+            total.setdefault(field, value)
+    return total
+
+
+class UsageLedger:
+    """
+    Token usage, latency and cost of the API calls made for one task,
+    aggregated by model and stage.
+
+    A request shared with other tasks (coalesced identical requests) is
+    counted once, in the ledger of the task that sent it.
+    """
+
+    def __init__(self):
+        """
+        Initialize an empty ledger.
+        """
+        self.prices = get_model_prices()
+        self._rows = {}
+        self._lock = threading.Lock()
+
+    def record(self, model, stage, usage, latency, estimated=False):
+        """
+        Record one API call.
+
+        Args:
+            model (str): Model that answered, as reported by the response
+            stage (str): Pipeline stage, e.g. "translation" or "vocabulary"
+            usage (dict): Normalized usage, see normalize_usage
+            latency (float): Call time in seconds
+            estimated (bool): Whether the tokens were estimated because the response had no usage block
+        """
+        with self._lock:
+            row = self._rows.get((model, stage))
+            if row is None:
+                row = dict.fromkeys(USAGE_FIELDS, 0)
+                row['cost'] = 0.0 if model in self.prices else None
+                self._rows[(model, stage)] = row
+
+            row['calls'] += 1
+            row['total_latency'] += latency
+            if estimated:
+                row['estimated_calls'] += 1
+            for field, value in usage.items():
+                row[field] += value
+            if row['cost'] is not None:
+                hit_price, miss_price, output_price = self.prices[model]
+                row['cost'] += (usage['cache_hit_tokens'] * hit_price + usage['cache_miss_tokens'] * miss_price +
+                                usage['completion_tokens'] * output_price) / 1_000_000
+
+    def rows(self):
+        """
+        Get the usage aggregated by model and stage.
+
+        Returns:
+            list: One dict per model and stage, with mean_latency and cost
+                  (None when the model's price is unknown)
+        """
+        with self._lock:
+            rows = [dict(row, model=model, stage=stage) for (model, stage), row in sorted(self._rows.items())]
+        for row in rows:
+            row['mean_latency'] = row['total_latency'] / row['calls']
+        return rows
+
+    def totals(self):
+        """
+        Get the usage of all calls.
+
+        Returns:
+            dict: Summed fields; cost covers the models with a known price
+        """
+        rows = self.rows()
+        total = {field: sum(row[field] for row in rows) for field in USAGE_FIELDS}
+        total['cost'] = sum(row['cost'] for row in rows if row['cost'] is not None)
+        total['mean_latency'] = total['total_latency'] / total['calls'] if total['calls'] else 0.0
+        total['cache_hit_rate'] = total['cache_hit_tokens'] / total['prompt_tokens'] if total['prompt_tokens'] else 0.0
+        return total
+
+    def as_dict(self):
+        """
+        Get the ledger as JSON-serializable data.
+
+        Returns:
+            dict: rows by model and stage, and the total
+        """
+        return {'rows': self.rows(), 'total': self.totals()}
+
+    def write_csv(self, path):
+        """
+        Export the usage by model and stage, followed by a total row, as CSV.
+
+        Args:
+            path (str): CSV file path
+        """
+        columns = ['model', 'stage'] + USAGE_FIELDS + ['mean_latency', 'cost']
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=columns, extrasaction='ignore')
+            writer.writeheader()
+            for row in self.rows() + [dict(self.totals(), model='total', stage='')]:
+                writer.writerow({key: round(value, 6) if isinstance(value, float) else value
+                                 for key, value in row.items()})
@@ -7,6 +7,9 @@ import json
 import requests
 from dotenv import load_dotenv
 
+from .http_pool import get_session, resolve_api_url
+from .rate_limiter import request_with_rate_limit
+
 class VocabularyExtractor:
     """
     Class for extracting important vocabulary from text.
@@ -18,11 +21,12 @@ class VocabularyExtractor:
         Loads necessary API keys from environment variables.
         """
         load_dotenv()
-        self.api_key = os.getenv("DEEPSEEK_API_KEY")
+        # Any placeholder key is accepted by the local mock server
+        self.api_key = os.getenv("DEEPSEEK_API_KEY") or ("mock" if os.getenv("MOCK_LLM_URL") else None)
         if not self.api_key:
             raise ValueError("Deepseek API key not found in environment variables.")
         
-        self.api_url = "https://api.deepseek.com/v1/chat/completions"
+        self.api_url = resolve_api_url("https://api.deepseek.com/v1/chat/completions")
         self.headers = {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {self.api_key}"
@@ -135,10 +139,15 @@ class VocabularyExtractor:
             "max_tokens": 4096
         }
         
-        response = requests.post(
+        # Shares the provider's rate limiter with the translators and retries on 429
+        response = request_with_rate_limit(
+            lambda: get_session(self.api_url).post(
+                self.api_url,
+                headers=self.headers,
+                data=json.dumps(payload)
+            ),
             self.api_url,
-            headers=self.headers,
-            data=json.dumps(payload)
+            self.api_key
         )
         
         if response.status_code != 200:
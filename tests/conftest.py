@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import asyncio
+import tempfile
+
+import pytest
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 各类缓存和翻译记忆写入临时目录，不读写用户目录下的数据
+_DATA_DIR = tempfile.mkdtemp(prefix="pdf_assistant_tests_")
+os.environ.update({
+    'EXTRACTION_CACHE_PATH': os.path.join(_DATA_DIR, 'extraction_cache.db'),
+    'TRANSLATION_MEMORY_PATH': os.path.join(_DATA_DIR, 'translation_memory.db'),
+    'SENTENCE_MEMORY_PATH': os.path.join(_DATA_DIR, 'sentence_memory.db'),
+    'OUTPUT_RATIO_FILE': os.path.join(_DATA_DIR, 'output_ratios.json'),
+    'DOCUMENT_HISTORY_DIR': os.path.join(_DATA_DIR, 'documents'),
+    'EXTRACTION_PAGE_TIMEOUT': '0',
+})
+
+
+def write_pdf(path, pages):
+    """
+    生成每页一段英文文本的PDF
+
+    Args:
+        path (str): 输出路径
+        pages (list): 各页的文本
+
+    Returns:
+        str: 输出路径
+    """
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.pagesizes import letter
+
+    pdf = canvas.Canvas(str(path), pagesize=letter)
+    for text in pages:
+        pdf.drawString(72, 700, text)
+        pdf.showPage()
+    pdf.save()
+    return str(path)
+
+
+@pytest.fixture
+def sample_pdf(tmp_path):
+    """
+    十页的PDF，第n页的文本为 "Page n says hello."
+    """
+    return write_pdf(tmp_path / "sample.pdf", [f"Page {i} says hello." for i in range(1, 11)])
+
+
+class FakeAPI:
+    """
+    代替服务商API的本地回复，回复内容与 mock_llm_server 按提示词格式生成的模拟回复相同
+
+    记录每个请求，并统计同时进行的请求数。
+    """
+
+    def __init__(self):
+        from mock_llm_server import synthesize_content
+
+        self.requests = []
+        self.active = 0
+        self.max_active = 0
+        # 每个请求的等待时间（秒），或根据请求的消息返回等待时间的函数
+        self.delay = 0
+        # 依次抛出的错误，为空时正常回复
+        self.errors = []
+        # 请求总是失败的模型标识符
+        self.failing_models = set()
+        self.reply = synthesize_content
+
+    async def respond(self, model, messages, max_tokens, stream):
+        """
+        生成一个请求的回复
+
+        Returns:
+            tuple: (回复内容, finish_reason, usage)
+        """
+        from mock_llm_server import truncate, usage
+
+        self.requests.append({'model': model.model_name, 'messages': messages, 'stream': stream})
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay(messages) if callable(self.delay) else self.delay)
+            if self.errors:
+                raise self.errors.pop(0)
+            if model.model_name in self.failing_models:
+                raise Exception(f"{model.model_name} is unavailable")
+            content, finish_reason = truncate(self.reply(messages), max_tokens)
+            return content, finish_reason, usage({'messages': messages}, content)
+        finally:
+            self.active -= 1
+
+    def user_messages(self):
+        """
+        获取所有请求的最后一条用户消息
+        """
+        return [request['messages'][-1]['content'] for request in self.requests]
+
+
+@pytest.fixture
+def fake_api(monkeypatch):
+    """
+    让所有翻译模型的请求（包括流式请求）都由 FakeAPI 回复，并关闭翻译记忆、批量合并、
+    对冲和动态max_tokens，需要这些功能的测试单独开启
+    """
+    from mock_llm_server import split_deltas
+    from src.utils.translator_factory import TranslationModel
+
+    for name, value in {
+        'DEEPSEEK_API_KEY': 'test', 'OPENROUTER_API_KEY': 'test',
+        'TRANSLATION_MEMORY_ENABLED': 'False', 'SENTENCE_MEMORY_ENABLED': 'False', 'BATCH_ENABLED': 'False',
+        'HEDGE_ENABLED': 'False', 'DYNAMIC_MAX_TOKENS_ENABLED': 'False',
+    }.items():
+        monkeypatch.setenv(name, value)
+    monkeypatch.delenv('MOCK_LLM_URL', raising=False)
+
+    api = FakeAPI()
+
+    async def request_api(model, messages, max_tokens):
+        content, finish_reason, usage = await api.respond(model, messages, max_tokens, False)
+        return {
+            "model": model.model_name,
+            "requested_model": model.model_name,
+            "choices": [{"message": {"role": "assistant", "content": content}, "finish_reason": finish_reason}],
+            "usage": usage,
+        }
+
+    async def call_api_stream(model, messages, max_tokens):
+        content, finish_reason, usage = await api.respond(model, messages, max_tokens, True)
+        for delta in split_deltas(content):
+            yield delta
+        yield {"model": model.model_name, "requested_model": model.model_name,
+               "usage": usage, "finish_reason": finish_reason}
+
+    monkeypatch.setattr(TranslationModel, '_request_api_async', request_api)
+    monkeypatch.setattr(TranslationModel, '_call_api_stream_async', call_api_stream)
+    return api
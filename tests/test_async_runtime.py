@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+
+import pytest
+
+from src.utils.async_runtime import get_event_loop, run_sync, iterate_sync
+
+
+def test_run_sync_runs_on_the_shared_loop():
+    async def current_loop():
+        return asyncio.get_running_loop()
+
+    assert run_sync(current_loop()) is get_event_loop()
+
+
+def test_run_sync_refuses_to_block_the_shared_loop():
+    async def nested():
+        inner = asyncio.sleep(0)
+        with pytest.raises(RuntimeError):
+            run_sync(inner)
+        return True
+
+    assert run_sync(nested())
+
+
+def test_iterate_sync_closes_an_abandoned_generator():
+    closed = []
+
+    async def numbers():
+        try:
+            for i in range(10):
+                yield i
+        finally:
+            closed.append(True)
+
+    for number in iterate_sync(numbers()):
+        if number == 2:
+            break
+    assert closed == [True]
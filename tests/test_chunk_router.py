@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from src.utils.chunk_router import ChunkRouter
+from src.utils.translator_factory import DeepseekChatModel, DeepseekReasonerModel, RoutingTranslator
+
+PLAIN = "The cat sat on the mat. It was a sunny day. We went for a walk."
+DENSE = ("The heteroskedasticity-consistent covariance estimator substantially outperforms conventional "
+         "specifications when σ² ≈ 0.35 and ∑ λ_i ≤ 1.25, notwithstanding considerable multicollinearity "
+         "among the instrumental variables characterizing the counterfactual distribution.")
+TABLE = "Model\tAccuracy\tLatency\nbaseline\t0.81\t120\nrouted\t0.84\t95"
+
+
+def test_dense_text_scores_higher_than_plain_narrative():
+    router = ChunkRouter()
+    plain, dense, table = (router.score(router.features(chunk)) for chunk in (PLAIN, DENSE, TABLE))
+
+    assert plain < 0.1 < table
+    assert dense >= router.min_score
+    assert router.features(TABLE)['table_ratio'] == 1.0
+
+
+def test_plan_sends_at_most_the_configured_share_to_the_reasoner():
+    router = ChunkRouter(reasoner_share=0.25, min_score=0.4)
+    decisions = router.plan([PLAIN, DENSE, TABLE, PLAIN])
+
+    # 4块的25%是1块，只选得分最高的一块
+    assert sum(decision['dense'] for decision in decisions) == 1
+    assert not decisions[0]['dense'] and not decisions[3]['dense']
+
+    # 得分低于下限的块即使在配额内也不使用推理模型
+    assert not any(decision['dense'] for decision in ChunkRouter(reasoner_share=1.0).plan([PLAIN, PLAIN]))
+
+
+def test_routing_translator_sends_each_chunk_to_its_model(fake_api):
+    translator = RoutingTranslator(DeepseekChatModel(), DeepseekReasonerModel(),
+                                   ChunkRouter(reasoner_share=0.5, min_score=0.4))
+    translator.router_chunk_tokens = 80
+
+    translation = translator.translate(PLAIN + "\n\n" + DENSE)
+
+    assert translation.count("【模拟译文】") == 2
+    assert sorted(request['model'] for request in fake_api.requests) == ['deepseek-chat', 'deepseek-reasoner']
+    assert translator.last_routing['strong_chunks'] == 1
+    assert [decision['model'] for decision in translator.last_routing['decisions']] == \
+        [translator.fast.name, translator.strong.name]
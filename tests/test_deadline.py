@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+
+import pytest
+
+from src.utils.deadline import DeadlineSchedule
+from src.utils.translator_factory import (
+    DeepseekChatModel, DeepseekReasonerModel, TranslatorFactory, _get_provider_async_semaphore
+)
+
+PARAGRAPHS = [f"Paragraph {i} describes a different part of the experiment in some detail." for i in range(6)]
+
+
+def small_chunks(model, tokens=30):
+    """
+    让模型按较小的token预算分块，使每个段落成为单独的块
+    """
+    model._chunk_token_budget = lambda: tokens
+    return model
+
+
+def test_schedule_assessment_and_report():
+    chunks = ["word " * 40] * 4
+    assert DeadlineSchedule(60, chunks, tokens_per_second=100).assess(1) == DeadlineSchedule.ON_TRACK
+    assert DeadlineSchedule(60, chunks, tokens_per_second=0.1).assess(1) == DeadlineSchedule.AT_RISK
+    # 并发数越大，预计用时越短
+    assert DeadlineSchedule(60, chunks, tokens_per_second=1).assess(8) == DeadlineSchedule.ON_TRACK
+    assert DeadlineSchedule(0, chunks).assess(1) == DeadlineSchedule.EXPIRED
+
+    schedule = DeadlineSchedule(60, chunks, tokens_per_second=0.1)
+    for index in range(4):
+        schedule.finish(index)
+    assert schedule.estimate(1) == 0 and schedule.assess(1) == DeadlineSchedule.ON_TRACK
+
+    schedule.degrade(2, DeadlineSchedule.PARTIAL)
+    schedule.degrade(0, DeadlineSchedule.EXTRA_PROVIDER, 'partner')
+    schedule.degrade(0, DeadlineSchedule.FAST_MODEL, 'fast')
+    report = schedule.report()
+    assert report['met'] and report['chunks'] == 4
+    assert report['degraded_chunks'] == 2 and report['partial_chunks'] == 1
+    assert report['degraded'][0] == dict(report['degraded'][0], chunk=1, model='fast',
+                                         actions=['extra_provider', 'fast_model'])
+
+
+def test_chunks_at_risk_switch_to_the_fast_model(fake_api, monkeypatch):
+    monkeypatch.setenv('DEADLINE_SAFETY_FACTOR', '1000')
+    monkeypatch.setattr(TranslatorFactory, '_instances', {})
+    model = small_chunks(DeepseekReasonerModel())
+    model.HEDGE_PROVIDER = None
+
+    translation = model.translate("\n\n".join(PARAGRAPHS[:3]), deadline=60)
+
+    assert translation.count("【模拟译文】") == 3
+    assert {request['model'] for request in fake_api.requests} == {'deepseek-chat'}
+    report = model.last_deadline_report
+    assert report['degraded_chunks'] == 3 and report['partial_chunks'] == 0
+    assert all(entry['actions'] == ['fast_model'] for entry in report['degraded'])
+
+
+def test_fast_model_waits_for_its_own_provider_limit(fake_api, monkeypatch):
+    monkeypatch.setenv('DEADLINE_SAFETY_FACTOR', '1000')
+    fake_api.delay = 0.02
+    model = small_chunks(DeepseekReasonerModel())
+    model.HEDGE_PROVIDER = None
+    fast = DeepseekChatModel()
+    fast.api_url = "https://fast.example.com/v1/chat/completions"
+    model._get_fast_model = lambda chunk: fast
+
+    async def main():
+        # 快速模型的服务商只允许一个并发请求，推理模型的服务商允许三个
+        monkeypatch.setenv('TRANSLATION_CONCURRENCY', '1')
+        _get_provider_async_semaphore(fast.api_url)
+        monkeypatch.setenv('TRANSLATION_CONCURRENCY', '3')
+        return await model.translate_async("\n\n".join(PARAGRAPHS), deadline=60)
+
+    assert asyncio.run(main()).count("【模拟译文】") == len(PARAGRAPHS)
+    assert fake_api.max_active == 1
+
+
+def test_chunks_after_the_deadline_keep_the_source_text(fake_api, monkeypatch):
+    monkeypatch.setenv('TRANSLATION_CONCURRENCY', '1')
+    fake_api.delay = 0.1
+    model = small_chunks(DeepseekChatModel())
+
+    translation = asyncio.run(model.translate_async("\n\n".join(PARAGRAPHS[:3]), deadline=0.05))
+
+    assert len(fake_api.requests) == 1
+    assert translation.count("[未翻译：超出时间限制]") == 2
+    assert model.last_deadline_report['partial_chunks'] == 2
+    assert not model.last_deadline_report['met']
+
+
+@pytest.mark.parametrize('deadline', [-1, 'soon', 'inf', 'nan'])
+def test_web_rejects_invalid_deadlines(deadline):
+    from src.web.app import app
+
+    response = app.test_client().post('/api/process', json={'task_id': 'missing', 'deadline': deadline})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == '时间限制必须是不小于0的秒数'
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from src.utils.document_diff import (DocumentDiff, DocumentStore, chunk_units, normalize_paragraph,
+                                    rebuild_vocabulary)
+from src.utils.translator_factory import DeepseekChatModel
+
+OLD = [
+    "The first paragraph introduces the study.",
+    "The second paragraph describes the method in detail.",
+    "The third paragraph reports the results.",
+    "The fourth paragraph concludes.",
+]
+
+
+def translated(paragraphs):
+    return "\n\n".join(f"译：{paragraph}" for paragraph in paragraphs)
+
+
+def test_extraction_differences_are_ignored():
+    assert normalize_paragraph("The “method” is well-\nknown  and ﬁne") == 'the "method" is wellknown and fine'
+
+
+def test_only_changed_and_added_paragraphs_need_translation():
+    units = chunk_units("\n\n".join(OLD), ["\n\n".join(OLD)], ["翻译：\n" + translated(OLD)])
+    assert len(units) == len(OLD)
+
+    new = [OLD[0], "The second paragraph describes the new method in detail.", OLD[2],
+           "An added paragraph about something else entirely.", OLD[3]]
+    diff = DocumentDiff(units, "\n\n".join(new).replace(OLD[0], OLD[0].replace(" ", "\n", 1)))
+
+    assert diff.changed_runs() == [[new[1]], [new[3]]]
+    report = diff.report()
+    assert (report['unchanged'], report['changed'], report['added'], report['removed']) == (3, 1, 1, 0)
+    assert report['reused_paragraphs'] == 3
+
+    translation, new_units = diff.splice([[new[1]], [new[3]]], [["译：修改后的第二段"], ["译：新增段落"]])
+    assert translation.split("\n\n") == [f"译：{OLD[0]}", "译：修改后的第二段", f"译：{OLD[2]}", "译：新增段落",
+                                         f"译：{OLD[3]}"]
+    assert len(new_units) == len(new)
+
+
+def test_units_are_paired_per_chunk():
+    long = "A long paragraph starts here. It goes on for a while. It finally ends here."
+    paragraphs = OLD[:2] + [long] + OLD[2:]
+    chunks = ["\n\n".join(OLD[:2]), "A long paragraph starts here. It goes on for a while.", "It finally ends here.",
+              "\n\n".join(OLD[2:])]
+    # 第一块的译文段落数与原文不同，只影响这一块
+    translations = ["译：前两段合并", "译：长段落前半", "译：长段落后半", translated(OLD[2:])]
+
+    units = chunk_units("\n\n".join(paragraphs), chunks, translations)
+    assert units == [
+        {'paragraphs': OLD[:2], 'translation': "译：前两段合并"},
+        {'paragraphs': [long], 'translation': "译：长段落前半\n\n译：长段落后半"},
+        {'paragraphs': [OLD[2]], 'translation': f"译：{OLD[2]}"},
+        {'paragraphs': [OLD[3]], 'translation': f"译：{OLD[3]}"},
+    ]
+
+
+def test_vocabulary_of_deleted_paragraphs_is_dropped():
+    previous = "重点词汇解析：\n1. method：方法 - 例句\n2. conclude：总结 - 例句\n   补充说明"
+    added = "重点词汇解析：\n1. remark：评论 - 例句\n2. method：方法 - 例句"
+    text = "The new version describes the method and adds a remark."
+
+    assert rebuild_vocabulary(previous, text, added) == "重点词汇解析：\n1. method：方法 - 例句\n2. remark：评论 - 例句"
+
+
+def test_store_keeps_one_version_per_document_and_model(tmp_path):
+    store = DocumentStore(str(tmp_path))
+    units = chunk_units(OLD[0], [OLD[0]], [translated(OLD[:1])])
+
+    assert store.load("paper.pdf", "deepseek-chat", 2) is None
+    store.save("paper.pdf", "deepseek-chat", 2, units, "词汇")
+    assert store.load("paper.pdf", "deepseek-chat", 2)['units'] == units
+    assert store.load("paper.pdf", "deepseek-chat", 1) is None
+    assert store.load("paper.pdf", "deepseek-reasoner", 2) is None
+
+
+def test_revision_translates_only_the_changed_runs(fake_api):
+    model = DeepseekChatModel()
+    text = "\n\n".join(OLD)
+    model.translate(text)
+    units = model.last_translation_units
+    fake_api.requests.clear()
+
+    new = OLD[:3] + ["The fourth paragraph concludes with a new remark."]
+    translation = model.translate_revision(DocumentDiff(units, "\n\n".join(new)))
+
+    assert fake_api.user_messages() and all(OLD[0] not in message for message in fake_api.user_messages())
+    assert translation == "翻译：\n" + "\n\n".join(f"【模拟译文】{paragraph}" for paragraph in new)
+    assert [unit['paragraphs'] for unit in model.last_translation_units] == [[paragraph] for paragraph in new]
@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from src.utils.pdf_processor import PDFProcessor, _PAGE_ITERATORS
+from src.utils.extraction_cache import ExtractionCache
+
+
+def test_pages_are_keyed_by_method_and_normalizer_version(tmp_path):
+    cache = ExtractionCache(str(tmp_path / "cache.db"))
+    cache.set_page_count("abc", 2)
+    cache.put_pages("abc", "pdfminer", 1, {0: ("first", "pdfminer"), 1: ("second", "pypdf2")})
+
+    assert cache.get_page_count("abc") == 2
+    assert cache.get_pages("abc", "pdfminer", 1) == {0: ("first", "pdfminer"), 1: ("second", "pypdf2")}
+    assert cache.get_pages("abc", "pdfplumber", 1) == {}
+    assert cache.get_pages("abc", "pdfminer", 2) == {}
+
+    cache.clear()
+    assert cache.get_page_count("abc") is None
+
+
+def test_cached_pages_are_not_extracted_again(sample_pdf, tmp_path, monkeypatch):
+    method = PDFProcessor.EXTRACT_METHOD_PDFMINER
+    cache = ExtractionCache(str(tmp_path / "cache.db"))
+    extracted = []
+
+    def counting_iterator(pdf_path, page_indices, iterator=_PAGE_ITERATORS[method]):
+        extracted.extend(page_indices)
+        yield from iterator(pdf_path, page_indices)
+
+    monkeypatch.setitem(_PAGE_ITERATORS, method, counting_iterator)
+    first = PDFProcessor(sample_pdf, max_workers=1, cache=cache).extract_text(method)
+    second = PDFProcessor(sample_pdf, max_workers=1, cache=cache).extract_text(method)
+
+    assert second == first
+    assert extracted == list(range(10))
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+
+import pytest
+
+from src.utils.hedging import Hedger, LatencyTracker
+from src.utils.translator_factory import DeepseekChatModel, _get_provider_async_semaphore
+
+
+def test_latency_percentile_needs_enough_samples():
+    tracker = LatencyTracker(min_samples=3)
+    tracker.record(1.0)
+    tracker.record(2.0)
+    assert tracker.percentile(95) is None
+
+    tracker.record(3.0)
+    assert tracker.percentile(50) == 2.0
+    assert tracker.percentile(95) == 3.0
+
+
+def test_slow_primary_is_hedged_and_cancelled():
+    hedger = Hedger(budget=1, initial_delay=0.05)
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return "primary"
+
+    async def fast():
+        await asyncio.sleep(0.01)
+        return "alternate"
+
+    assert asyncio.run(hedger.run("primary", slow, "alternate", fast)) == "alternate"
+    assert cancelled == [True]
+    assert hedger.get_stats()['hedge_wins'] == 1
+
+
+def test_fast_primary_is_not_hedged():
+    hedger = Hedger(budget=1, initial_delay=1)
+
+    async def answer():
+        return "primary"
+
+    async def unexpected():
+        raise AssertionError("alternate should not be called")
+
+    assert asyncio.run(hedger.run("primary", answer, "alternate", unexpected)) == "primary"
+    assert hedger.get_stats()['hedged'] == 0
+
+
+def test_hedges_stay_within_the_budget():
+    hedger = Hedger(budget=0.5, initial_delay=0.01)
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return "primary"
+
+    async def slower():
+        await asyncio.sleep(1)
+        return "alternate"
+
+    async def run_all():
+        return [await hedger.run("primary", slow, "alternate", slower) for _ in range(4)]
+
+    assert asyncio.run(run_all()) == ["primary"] * 4
+    stats = hedger.get_stats()
+    assert stats['hedged'] == 2 and stats['budget_denied'] == 2
+
+
+def test_primary_error_is_raised_when_every_request_fails():
+    hedger = Hedger(budget=1, initial_delay=0.01)
+
+    async def failing():
+        await asyncio.sleep(0.02)
+        raise ValueError("primary failed")
+
+    async def also_failing():
+        raise RuntimeError("alternate failed")
+
+    with pytest.raises(ValueError):
+        asyncio.run(hedger.run("primary", failing, "alternate", also_failing))
+
+
+def test_losing_primary_is_recorded_as_a_lower_bound():
+    hedger = Hedger(budget=1, initial_delay=0.05)
+
+    async def slow():
+        await asyncio.sleep(10)
+
+    async def fast():
+        await asyncio.sleep(0.01)
+        return "alternate"
+
+    asyncio.run(hedger.run("primary", slow, "alternate", fast))
+
+    primary = hedger._tracker("primary")
+    primary.min_samples = 1
+    assert primary.percentile(50) >= 0.05
+
+
+def test_no_hedge_while_the_alternate_provider_is_busy():
+    hedger = Hedger(budget=1, initial_delay=0.01)
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return "primary"
+
+    async def unexpected():
+        raise AssertionError("alternate should not be called")
+
+    assert asyncio.run(hedger.run("primary", slow, "alternate", unexpected, alternate_ready=lambda: False)) == \
+        "primary"
+    stats = hedger.get_stats()
+    assert stats['hedged'] == 0 and stats['alternate_busy'] == 1
+
+
+def test_translator_does_not_hedge_to_a_saturated_provider(fake_api, monkeypatch):
+    monkeypatch.setenv('TRANSLATION_CONCURRENCY', '1')
+    fake_api.delay = 0.1
+    model = DeepseekChatModel()
+    model.hedger = Hedger(budget=1, min_delay=0.01, initial_delay=0.01)
+    partner = model._get_hedge_partner()
+
+    async def main():
+        # 备用服务商唯一的并发名额被其他任务占用
+        async with _get_provider_async_semaphore(partner.api_url):
+            return await model.translate_async("A paragraph that is slow to translate.")
+
+    assert asyncio.run(main()).count("【模拟译文】") == 1
+    assert {request['model'] for request in fake_api.requests} == {model.model_name}
+    assert model.hedger.get_stats()['alternate_busy'] == 1
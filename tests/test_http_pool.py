@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+import threading
+
+from src.utils.http_pool import HTTPSessionPool
+
+
+def test_sessions_share_one_adapter_per_provider():
+    pool = HTTPSessionPool(pool_size=2)
+    session = pool.get_session("https://api.deepseek.com/v1/chat/completions")
+
+    assert pool.get_session("https://api.deepseek.com/other") is session
+    assert pool.get_session("https://openrouter.ai/api/v1/chat/completions") is not session
+
+    other_thread = []
+    thread = threading.Thread(target=lambda: other_thread.append(pool.get_session("https://api.deepseek.com/")))
+    thread.start()
+    thread.join()
+    assert other_thread[0] is not session
+    assert other_thread[0].get_adapter("https://api.deepseek.com/") is session.get_adapter("https://api.deepseek.com/")
+
+
+def test_async_sessions_are_per_event_loop_and_provider():
+    pool = HTTPSessionPool()
+
+    async def sessions():
+        first = pool.get_async_session("https://api.deepseek.com/a")
+        same = pool.get_async_session("https://api.deepseek.com/b")
+        other = pool.get_async_session("https://openrouter.ai/a")
+        await pool.close_async()
+        return first, same, other
+
+    first, same, other = asyncio.run(sessions())
+    assert first is same and first is not other
+    assert first.closed and other.closed
+
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+
+from src.utils.micro_batch import MicroBatcher
+from src.utils.translator_factory import DeepseekChatModel
+
+
+def translate_all(segments):
+    return [f"译：{segment}" for segment in segments]
+
+
+def test_concurrent_callers_share_one_request():
+    batcher = MicroBatcher(window=0.05)
+    sent = []
+
+    async def send(segments):
+        sent.append(segments)
+        return translate_all(segments)
+
+    async def main():
+        return await asyncio.gather(
+            batcher.call_async('chat', ["a", "b"], 2, send),
+            batcher.call_async('chat', ["c"], 1, send),
+            batcher.call_async('chat', ["d"], 1, send),
+        )
+
+    assert asyncio.run(main()) == [["译：a", "译：b"], ["译：c"], ["译：d"]]
+    assert sent == [["a", "b", "c", "d"]]
+    assert batcher.get_stats()['round_trips_saved'] == 2
+
+
+def test_single_request_and_unsplittable_batches_fall_back():
+    batcher = MicroBatcher(window=0.01)
+
+    async def send(segments):
+        return None
+
+    async def main():
+        alone = await batcher.call_async('chat', ["a"], 1, send)
+        together = await asyncio.gather(batcher.call_async('chat', ["a"], 1, send),
+                                        batcher.call_async('chat', ["b"], 1, send))
+        return alone, together
+
+    assert asyncio.run(main()) == (None, [None, None])
+    assert batcher.get_stats()['fallbacks'] == 1
+
+
+def test_full_batches_are_sent_without_waiting_for_the_window():
+    batcher = MicroBatcher(window=10, max_segments=2)
+    sent = []
+
+    async def send(segments):
+        sent.append(segments)
+        return translate_all(segments)
+
+    async def main():
+        return await asyncio.wait_for(asyncio.gather(batcher.call_async('chat', ["0"], 1, send),
+                                                     batcher.call_async('chat', ["1"], 1, send)), 5)
+
+    assert asyncio.run(main()) == [["译：0"], ["译：1"]]
+    assert sent == [["0", "1"]]
+
+
+def test_short_chunks_of_different_documents_are_batched(fake_api):
+    model = DeepseekChatModel()
+    model.batcher = MicroBatcher(window=0.05)
+
+    async def main():
+        return await asyncio.gather(model.translate_async("First short document."),
+                                    model.translate_async("Second short document."))
+
+    assert asyncio.run(main()) == ["翻译：\n【模拟译文】First short document.",
+                                   "翻译：\n【模拟译文】Second short document."]
+    assert len(fake_api.requests) == 1
+    assert "以下是按顺序编号的英文片段" in fake_api.user_messages()[0]
+
+
+def test_batching_does_not_wait_for_a_provider_slot(fake_api, monkeypatch):
+    monkeypatch.setenv('TRANSLATION_CONCURRENCY', '1')
+    model = DeepseekChatModel()
+    model.batcher = MicroBatcher(window=0.05)
+    documents = [f"Short document number {i}." for i in range(3)]
+
+    async def main():
+        return await asyncio.gather(*(model.translate_async(document) for document in documents))
+
+    assert asyncio.run(main()) == [f"翻译：\n【模拟译文】{document}" for document in documents]
+    assert len(fake_api.requests) == 1
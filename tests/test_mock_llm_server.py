@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+
+import pytest
+
+import mock_llm_server
+from mock_llm_server import synthesize_content, truncate, parse_distribution
+from src.utils.http_pool import resolve_api_url
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """
+    没有延迟、不注入错误的模拟服务器
+    """
+    monkeypatch.setattr(mock_llm_server, 'config', dict(mock_llm_server.config, latency=lambda: 0.0,
+                                                        tokens_per_second=0.0, rate_429=0.0, rate_5xx=0.0,
+                                                        upstream=None))
+    monkeypatch.setattr(mock_llm_server, 'recordings', {})
+    return mock_llm_server.app.test_client()
+
+
+def chat(content):
+    return [{"role": "system", "content": "你是翻译助手"}, {"role": "user", "content": content}]
+
+
+def test_replies_follow_the_prompt_format():
+    plain = synthesize_content(chat("原文：\n\nFirst paragraph here.\n\nSecond paragraph here."))
+    assert plain == "【模拟译文】First paragraph here.\n\n【模拟译文】Second paragraph here."
+
+    numbered = synthesize_content(chat("以下是按顺序编号的英文片段：\n[1] One line.\n[2] Two lines.\n"
+                                       "请严格按照以下格式回复"))
+    assert numbered == "[1] 【模拟译文】One line.\n[2] 【模拟译文】Two lines."
+
+    formatted = synthesize_content(chat("原文：\n\nRemarkable vocabulary appears.\n\n===开始翻译==="))
+    assert formatted.startswith("===开始翻译===\n【模拟译文】Remarkable vocabulary appears.\n===结束翻译===")
+    assert "1. remarkable：模拟释义" in formatted
+
+
+def test_continuation_returns_the_rest_of_a_truncated_reply():
+    messages = chat("原文：\n\n" + "A fairly long paragraph that will not fit. " * 5)
+    full = synthesize_content(messages)
+    partial, finish_reason = truncate(full, 10)
+    assert finish_reason == 'length' and full.startswith(partial) and partial != full
+
+    rest = synthesize_content(messages + [{"role": "assistant", "content": partial},
+                                          {"role": "user", "content": "继续"}])
+    assert partial + rest == full
+
+
+def test_latency_distributions():
+    assert parse_distribution("fixed:0.5")() == 0.5
+    assert 0.2 <= parse_distribution("uniform:0.2,1.0")() <= 1.0
+    with pytest.raises(ValueError):
+        parse_distribution("bimodal:1,2")
+
+
+def test_streamed_and_plain_completions(client):
+    payload = {"model": "deepseek-chat", "messages": chat("原文：\n\nHello there, world.")}
+
+    reply = client.post('/v1/chat/completions', json=payload).get_json()
+    assert reply['choices'][0]['message']['content'] == "【模拟译文】Hello there, world."
+    assert reply['choices'][0]['finish_reason'] == 'stop'
+
+    response = client.post('/v1/chat/completions',
+                           json=dict(payload, stream=True, stream_options={"include_usage": True}))
+    events = [json.loads(line[len("data: "):]) for line in response.get_data(as_text=True).splitlines()
+              if line.startswith("data: {")]
+    content = "".join(event['choices'][0]['delta'].get('content', '') for event in events if event['choices'])
+    assert content == "【模拟译文】Hello there, world."
+    assert events[-1]['usage']['completion_tokens'] > 0
+
+
+def test_mock_url_redirects_every_provider(monkeypatch):
+    monkeypatch.setenv('MOCK_LLM_URL', 'http://127.0.0.1:5002/')
+    assert resolve_api_url("https://api.deepseek.com/v1/chat/completions") == \
+        "http://127.0.0.1:5002/v1/chat/completions"
+
+    monkeypatch.delenv('MOCK_LLM_URL')
+    assert resolve_api_url("https://api.deepseek.com/v1/chat/completions") == \
+        "https://api.deepseek.com/v1/chat/completions"
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+import os
+
+from src.utils.hedging import Hedger
+from src.utils.output_budget import OutputBudget
+from src.utils.sentence_memory import SentenceMemory
+from src.utils.translation_memory import TranslationMemory
+from src.utils.translator_factory import DeepseekChatModel
+
+
+def test_budget_follows_the_learned_ratio(tmp_path):
+    budget = OutputBudget(str(tmp_path / "ratios.json"), deviations=2, margin=10, min_tokens=50)
+    assert budget.max_tokens('deepseek-chat', 'translation', 1000, 8000) == 8000
+
+    budget.record('deepseek-chat', 'translation', 1000, 1000)
+    # 第一个样本：比例1.0，偏差0.5
+    assert budget.max_tokens('deepseek-chat', 'translation', 1000, 8000) == 2010
+    assert budget.max_tokens('deepseek-chat', 'translation', 1000, 1500) == 1500
+    assert budget.max_tokens('deepseek-chat', 'translation', 10, 8000) == 50
+    assert budget.max_tokens('deepseek-chat', 'vocabulary', 1000, 8000) == 8000
+
+    budget.record('deepseek-chat', 'translation', 1000, 1000)
+    ratio = budget.ratios()['deepseek-chat translation']
+    assert ratio['ratio'] == 1.0 and ratio['deviation'] < 0.5 and ratio['samples'] == 2
+
+
+def test_ratios_are_saved_periodically_and_on_request(tmp_path, monkeypatch):
+    path = str(tmp_path / "ratios.json")
+    budget = OutputBudget(path)
+    budget.record('deepseek-chat', 'translation', 100, 150)
+    assert not os.path.exists(path)
+
+    budget.save()
+    assert OutputBudget(path).ratios() == budget.ratios()
+
+    monkeypatch.setattr(OutputBudget, 'SAVE_INTERVAL', 0)
+    budget.record('deepseek-chat', 'vocabulary', 100, 30)
+    assert 'deepseek-chat vocabulary' in OutputBudget(path).ratios()
+
+
+def test_truncated_replies_are_continued(fake_api, tmp_path):
+    model = DeepseekChatModel()
+    model.output_budget = OutputBudget(str(tmp_path / "ratios.json"), margin=0, min_tokens=1)
+    model.output_budget.record('deepseek-chat', 'translation', 1000, 10)
+    text = "A paragraph whose translation does not fit in the learned output budget at all."
+
+    assert model.translate(text) == f"翻译：\n【模拟译文】{text}"
+    assert len(fake_api.requests) == 2
+    assert fake_api.requests[1]['messages'][-2]['role'] == 'assistant'
+
+
+def test_replies_truncated_after_every_continuation_are_not_remembered(fake_api, tmp_path):
+    model = DeepseekChatModel()
+    model.max_continuations = 1
+    model.memory = TranslationMemory(str(tmp_path / "memory.db"))
+    model.sentence_memory = SentenceMemory(str(tmp_path / "sentences.db"))
+    text = "A paragraph whose translation does not fit even after one continuation request."
+    respond = fake_api.respond
+
+    async def always_truncated(api_model, messages, max_tokens, stream):
+        content, finish_reason, usage = await respond(api_model, messages, max_tokens, stream)
+        return content, 'length', usage
+
+    fake_api.respond = always_truncated
+
+    for stream in (False, True):
+        if stream:
+            "".join(model.translate_stream(text))
+        else:
+            model.translate(text)
+        assert model.last_reuse_report['truncated_chunks'] == 1
+    assert len(fake_api.requests) == 4
+    assert model.memory.get_stats()['entries'] == 0
+    assert model.sentence_memory.lookup(model.model_name, model.PROMPT_VERSION, text) is None
+
+
+def test_ratio_is_learned_for_the_model_that_replied(fake_api, tmp_path):
+    model = DeepseekChatModel()
+    model.output_budget = OutputBudget(str(tmp_path / "ratios.json"))
+    model.hedger = Hedger(budget=1, min_delay=0.01, initial_delay=0.01)
+    partner = model._get_hedge_partner()
+
+    respond = fake_api.respond
+
+    async def slow_primary(api_model, messages, max_tokens, stream):
+        if api_model.model_name == model.model_name:
+            await asyncio.sleep(0.5)
+        return await respond(api_model, messages, max_tokens, stream)
+
+    fake_api.respond = slow_primary
+    model.translate("A paragraph that the alternate provider answers first.")
+
+    assert set(model.output_budget.ratios()) == {f"{partner.model_name} translation"}
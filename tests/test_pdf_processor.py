@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import mmap
+import time
+
+from src.utils.pdf_processor import PDFProcessor, _PAGE_ITERATORS, _open_pdf
+from src.utils.extraction_cache import ExtractionCache
+
+
+def test_parallel_extraction_keeps_page_order(sample_pdf, tmp_path):
+    processor = PDFProcessor(sample_pdf, max_workers=3, cache=ExtractionCache(str(tmp_path / "cache.db")))
+    text = processor.extract_text(PDFProcessor.EXTRACT_METHOD_PDFMINER)
+
+    assert [line for line in text.split("\n\n") if line] == [f"Page {i} says hello." for i in range(1, 11)]
+    assert processor.get_page_method_summary() == {PDFProcessor.EXTRACT_METHOD_PDFMINER: list(range(1, 11))}
+
+
+def test_partition_pages_is_contiguous_and_balanced():
+    processor = PDFProcessor.__new__(PDFProcessor)
+    batches = processor._partition_pages(list(range(10)), 1)
+
+    assert [index for batch in batches for index in batch] == list(range(10))
+    assert max(len(batch) for batch in batches) - min(len(batch) for batch in batches) <= 1
+
+
+def _stuck_on_second_page(pdf_path, page_indices):
+    for index in page_indices:
+        if index == 1:
+            time.sleep(60)
+        yield index, f"Page {index + 1} text.", None
+
+
+def test_page_watchdog_is_on_by_default(sample_pdf, monkeypatch):
+    monkeypatch.delenv('EXTRACTION_PAGE_TIMEOUT')
+    assert PDFProcessor(sample_pdf).page_timeout == PDFProcessor.DEFAULT_PAGE_TIMEOUT
+
+    monkeypatch.setenv('EXTRACTION_PAGE_TIMEOUT', '0')
+    assert PDFProcessor(sample_pdf).page_timeout is None
+    assert PDFProcessor(sample_pdf, page_timeout=0).page_timeout is None
+
+
+def test_timed_out_page_is_degraded_and_not_cached(sample_pdf, tmp_path, monkeypatch):
+    method = PDFProcessor.EXTRACT_METHOD_PDFMINER
+    monkeypatch.setitem(_PAGE_ITERATORS, method, _stuck_on_second_page)
+    cache = ExtractionCache(str(tmp_path / "cache.db"))
+    processor = PDFProcessor(sample_pdf, max_workers=2, cache=cache, page_timeout=0.5)
+
+    text = processor.extract_text(method)
+
+    assert "Page 2 says hello." in text
+    assert processor.get_timed_out_pages() == [{'page': 2, 'method': PDFProcessor.EXTRACT_METHOD_PYPDF2,
+                                                'timed_out': True}]
+    assert sorted(cache.get_pages(processor._get_pdf_hash(), method, PDFProcessor.NORMALIZER_VERSION)) == \
+        [index for index in range(10) if index != 1]
+
+
+def _failing_on_first_page(iterator):
+    def pages(pdf_path, page_indices):
+        for index, text, error in iterator(pdf_path, page_indices):
+            yield (index, None, "broken page") if index == 0 else (index, text, error)
+    return pages
+
+
+def test_failed_pages_fall_back_one_page_at_a_time(sample_pdf, monkeypatch):
+    method = PDFProcessor.EXTRACT_METHOD_PDFMINER
+    monkeypatch.setitem(_PAGE_ITERATORS, method, _failing_on_first_page(_PAGE_ITERATORS[method]))
+    processor = PDFProcessor(sample_pdf, max_workers=1, use_cache=False)
+
+    text = processor.extract_text(method)
+
+    assert text.startswith("Page 1 says hello.")
+    assert processor.get_page_method_summary() == {
+        PDFProcessor.EXTRACT_METHOD_PDFPLUMBER: [1],
+        method: list(range(2, 11)),
+    }
+
+
+def test_pages_every_method_failed_on_use_the_failed_key(sample_pdf, monkeypatch):
+    for method in (PDFProcessor.EXTRACT_METHOD_PDFMINER, PDFProcessor.EXTRACT_METHOD_PDFPLUMBER,
+                   PDFProcessor.EXTRACT_METHOD_PYPDF2):
+        monkeypatch.setitem(_PAGE_ITERATORS, method, _failing_on_first_page(_PAGE_ITERATORS[method]))
+    processor = PDFProcessor(sample_pdf, max_workers=1, use_cache=False)
+
+    processor.extract_text(PDFProcessor.EXTRACT_METHOD_PDFMINER)
+
+    assert processor.get_page_method_summary()[PDFProcessor.PAGE_METHOD_FAILED] == [1]
+
+
+def test_large_pdfs_are_memory_mapped(sample_pdf, monkeypatch):
+    with _open_pdf(sample_pdf) as stream:
+        assert not isinstance(stream, mmap.mmap)
+
+    monkeypatch.setattr(PDFProcessor, 'MMAP_THRESHOLD_BYTES', 1)
+    with _open_pdf(sample_pdf) as stream:
+        assert isinstance(stream, mmap.mmap)
+
+    processor = PDFProcessor(sample_pdf, max_workers=1, use_cache=False)
+    assert processor.extract_text(PDFProcessor.EXTRACT_METHOD_PDFPLUMBER).startswith("Page 1 says hello.")
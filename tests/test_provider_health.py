@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+
+import pytest
+
+from src.utils import provider_health
+from src.utils.provider_health import BackendHealth, get_backend_health
+from src.utils.translator_factory import DeepseekChatModel, DeepseekReasonerModel, FailoverTranslator
+
+
+def test_breaker_opens_after_consecutive_failures_and_probes_after_cooldown():
+    health = BackendHealth("backend", consecutive_failures=2, cooldown=0.05)
+    health.record_failure(0.1)
+    assert health.state == BackendHealth.CLOSED
+
+    health.record_failure(0.1)
+    assert health.state == BackendHealth.OPEN
+    assert not health.try_acquire()
+
+    time.sleep(0.06)
+    assert health.state == BackendHealth.HALF_OPEN
+    assert health.try_acquire()
+    assert not health.try_acquire()
+
+    health.record_success(0.1)
+    assert health.state == BackendHealth.CLOSED
+    assert health.error_rate() == 0.0
+
+
+def test_failed_probe_reopens_the_breaker():
+    health = BackendHealth("backend", consecutive_failures=1, cooldown=0.01)
+    health.record_failure(0.1)
+    time.sleep(0.02)
+    assert health.try_acquire()
+
+    health.record_failure(0.1)
+    assert health.state == BackendHealth.OPEN
+
+
+@pytest.fixture
+def failover(fake_api, monkeypatch):
+    monkeypatch.setattr(provider_health, '_backends', {})
+    return FailoverTranslator([DeepseekReasonerModel(), DeepseekChatModel()])
+
+
+def test_failover_moves_chunks_to_the_next_backend(fake_api, failover):
+    fake_api.failing_models = {"deepseek-reasoner"}
+
+    translation = failover.translate("The reasoner is down today.")
+
+    assert translation == "翻译：\n【模拟译文】The reasoner is down today."
+    assert [request['model'] for request in fake_api.requests] == ["deepseek-reasoner", "deepseek-chat"]
+    assert get_backend_health("Deepseek Reasoner").error_rate() == 1.0
+
+
+def test_unhealthy_backend_is_skipped(fake_api, failover, monkeypatch):
+    monkeypatch.setenv('FAILOVER_CONSECUTIVE_FAILURES', '1')
+    monkeypatch.setattr(provider_health, '_backends', {})
+    fake_api.failing_models = {"deepseek-reasoner"}
+    failover.translate("The first request finds the outage.")
+
+    fake_api.requests.clear()
+    failover.translate("The second request goes straight to the chat model.")
+
+    assert [request['model'] for request in fake_api.requests] == ["deepseek-chat"]
+
+
+def test_slow_backend_is_tried_after_the_others(fake_api, failover, monkeypatch):
+    monkeypatch.setenv('FAILOVER_LATENCY_LIMIT', '5')
+    monkeypatch.setattr(provider_health, '_backends', {})
+    get_backend_health("Deepseek Reasoner").record_success(20)
+    assert get_backend_health("Deepseek Reasoner").is_slow()
+
+    failover.translate("The reasoner has been answering very slowly.")
+
+    assert [request['model'] for request in fake_api.requests] == ["deepseek-chat"]
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+
+from src.utils import rate_limiter
+from src.utils.rate_limiter import RateLimiter, get_rate_limiter, parse_retry_after, request_with_rate_limit
+
+
+class FakeResponse:
+    def __init__(self, status_code, retry_after=None):
+        self.status_code = status_code
+        self.headers = {'Retry-After': retry_after} if retry_after is not None else {}
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_clustered_429s_halve_the_rate_and_successes_recover_it():
+    limiter = RateLimiter(rate=10, burst=1)
+    limiter.on_throttled(0, retry_after=0)
+    assert limiter.rate == 10
+
+    limiter.on_throttled(1, retry_after=0)
+    assert limiter.rate == 5
+
+    for _ in range(200):
+        limiter.on_success()
+    assert limiter.rate == 10
+
+
+def test_retry_after_pauses_every_caller():
+    limiter = RateLimiter(rate=1000, burst=10)
+    assert limiter.on_throttled(0, retry_after=0.2) == 0.2
+
+    start = time.monotonic()
+    limiter.acquire()
+    assert time.monotonic() - start >= 0.15
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
+
+def test_throttled_responses_are_closed_and_only_2xx_recovers_the_rate(monkeypatch):
+    monkeypatch.setattr(rate_limiter.time, 'sleep', lambda seconds: None)
+    limiter = get_rate_limiter("https://throttled.example.com/v1", "key")
+    limiter.rate = limiter.base_rate / 2
+
+    responses = [FakeResponse(429, "0"), FakeResponse(500)]
+    result = request_with_rate_limit(lambda: responses.pop(0) if responses else FakeResponse(200),
+                                     "https://throttled.example.com/v1", "key")
+    assert result.status_code == 500
+    assert limiter.throttled == 1 and limiter.rate == limiter.base_rate / 2
+
+    first = FakeResponse(429, "0")
+    responses = [first, FakeResponse(200)]
+    assert request_with_rate_limit(lambda: responses.pop(0), "https://throttled.example.com/v1", "key").status_code == 200
+    assert first.closed
+    # 第二次429使速率再次减半，成功的响应再恢复一点
+    assert limiter.rate == limiter.base_rate / 4 + limiter.base_rate * RateLimiter.RECOVERY_FACTOR
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+import sqlite3
+
+from src.utils.sentence_memory import SentenceMemory
+from src.utils.text_utils import split_sentences, split_chinese_sentences
+from src.utils.translator_factory import DeepseekChatModel
+
+SENTENCE = "The committee reviewed the proposal carefully and approved the budget for the coming year."
+NUMBERED_PROMPT = "以下是按顺序编号的英文片段"
+
+
+def test_similar_sentences_reuse_the_stored_translation(tmp_path):
+    memory = SentenceMemory(str(tmp_path / "sentences.db"), threshold=0.9)
+    memory.store("deepseek-chat", 1, [(SENTENCE, "委员会仔细审查了提案。")])
+
+    translation, similarity = memory.lookup("deepseek-chat", 1, SENTENCE.replace("year", "years"))
+    assert translation == "委员会仔细审查了提案。" and 0.9 <= similarity < 1
+    assert memory.lookup("deepseek-chat", 1, SENTENCE)[1] == 1.0
+    assert memory.lookup("deepseek-chat", 2, SENTENCE) is None
+    assert memory.lookup("deepseek-chat", 1, "Something else entirely was discussed at the meeting.") is None
+
+
+def test_sentences_with_different_numbers_or_negations_are_not_reused(tmp_path):
+    memory = SentenceMemory(str(tmp_path / "sentences.db"), threshold=0.5)
+    memory.store("m", 1, [("The budget grew by 15 percent in 2023.", "预算在2023年增长了15%。"),
+                          ("The committee did approve the proposal.", "委员会批准了提案。")])
+
+    assert memory.lookup("m", 1, "The budget grew by 51 percent in 2023.") is None
+    assert memory.lookup("m", 1, "The committee did not approve the proposal.") is None
+
+
+def test_reuse_times_are_written_in_batches(tmp_path):
+    path = str(tmp_path / "sentences.db")
+    memory = SentenceMemory(path)
+    memory.store("m", 1, [(SENTENCE, "委员会仔细审查了提案。")])
+
+    def last_used():
+        with sqlite3.connect(path) as connection:
+            return connection.execute("SELECT last_used FROM sentences").fetchone()[0]
+
+    stored = last_used()
+    assert memory.lookup_many("m", 1, [SENTENCE, "Unrelated text."])[1] is None
+    assert last_used() == stored
+
+    memory.flush()
+    assert last_used() > stored
+
+
+def test_sentence_splitting():
+    assert split_sentences("Dr. Smith arrived. He said \"Hello.\" Then he left!") == \
+        ["Dr. Smith arrived.", "He said \"Hello.\"", "Then he left!"]
+    assert split_chinese_sentences("他来了。“你好！”\n然后他走了") == ["他来了。", "“你好！”", "然后他走了"]
+
+
+def sentence_memory_model(tmp_path, segments_per_request=20):
+    model = DeepseekChatModel()
+    model.sentence_memory = SentenceMemory(str(tmp_path / "sentences.db"))
+    model.sentence_segments_per_request = segments_per_request
+    return model
+
+
+def test_numbered_prompt_is_only_used_when_sentences_are_reused(fake_api, tmp_path):
+    model = sentence_memory_model(tmp_path, segments_per_request=2)
+    first = [f"Sentence number {word} of the original report explains the method." for word in "ABCDEF"]
+    model.translate("\n\n".join(first))
+
+    # 第一次没有可复用的句子，使用模型自己的提示词
+    assert NUMBERED_PROMPT not in fake_api.user_messages()[0]
+
+    revised = first[:1] + [f"A completely new observation about topic {word} follows here." for word in "GHIJK"]
+    translation = model.translate("\n\n".join(revised))
+
+    numbered = fake_api.user_messages()[1:]
+    assert len(numbered) == 3 and all(NUMBERED_PROMPT in message for message in numbered)
+    assert first[0] not in "".join(numbered)
+    assert translation.split("\n\n")[0] == f"翻译：\n【模拟译文】{first[0]}"
+    assert model.last_reuse_report['reused_sentences'] == 1
+
+
+def test_unaligned_translations_are_not_stored(fake_api, tmp_path):
+    model = sentence_memory_model(tmp_path)
+    fake_api.reply = lambda messages: "只有一句译文。"
+    model.translate("First sentence of the paragraph. Second sentence of the paragraph.")
+
+    assert model.sentence_memory.lookup(model.model_name, model.PROMPT_VERSION,
+                                        "First sentence of the paragraph.") is None
+
+
+def test_streamed_chunks_reuse_sentences(fake_api, tmp_path):
+    model = sentence_memory_model(tmp_path)
+    first = [f"Sentence number {word} of the original report explains the method." for word in "AB"]
+    "".join(model.translate_stream("\n\n".join(first)))
+
+    revised = [first[0], "A completely new observation follows here."]
+    streamed = "".join(model.translate_stream("\n\n".join(revised)))
+
+    assert NUMBERED_PROMPT in fake_api.user_messages()[1]
+    assert first[0] not in fake_api.user_messages()[1]
+    assert streamed == f"翻译：\n【模拟译文】{first[0]}\n\n【模拟译文】{revised[1]}"
+
+
+def test_memory_is_queried_off_the_event_loop(fake_api, tmp_path):
+    model = sentence_memory_model(tmp_path)
+    on_loop = []
+    lookup_many = model.sentence_memory.lookup_many
+
+    def recording_lookup(*args):
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(True)
+        except RuntimeError:
+            on_loop.append(False)
+        return lookup_many(*args)
+
+    model.sentence_memory.lookup_many = recording_lookup
+    model.translate(SENTENCE)
+
+    assert on_loop == [False]
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+
+from src.utils.single_flight import SingleFlight
+
+
+def test_identical_requests_in_flight_are_sent_once():
+    single_flight = SingleFlight()
+    sent = []
+
+    async def request():
+        sent.append(True)
+        await asyncio.sleep(0.02)
+        return {"answer": 42}
+
+    async def run_all():
+        return await asyncio.gather(*[single_flight.call_async("key", request) for _ in range(5)])
+
+    results = asyncio.run(run_all())
+    assert len(sent) == 1
+    assert all(result is results[0] for result in results)
+    assert single_flight.get_stats()['coalesced'] == 4
+    assert single_flight.get_stats()['in_flight'] == 0
+
+
+def test_cancelling_one_waiter_keeps_the_request_for_the_others():
+    single_flight = SingleFlight()
+
+    async def request():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def run_all():
+        first = asyncio.ensure_future(single_flight.call_async("key", request))
+        second = asyncio.ensure_future(single_flight.call_async("key", request))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run_all()) == "done"
+
+
+def test_late_stream_subscribers_receive_every_item():
+    single_flight = SingleFlight()
+    opened = []
+
+    async def response():
+        opened.append(True)
+        for item in ["a", "b", "c"]:
+            await asyncio.sleep(0.01)
+            yield item
+
+    async def collect(delay):
+        await asyncio.sleep(delay)
+        return [item async for item in single_flight.stream("key", response)]
+
+    async def run_all():
+        return await asyncio.gather(collect(0), collect(0.015))
+
+    assert asyncio.run(run_all()) == [["a", "b", "c"], ["a", "b", "c"]]
+    assert len(opened) == 1
@@ -0,0 +1,11 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from src.utils.text_utils import estimate_tokens
+
+
+def test_estimate_tokens_weights_chinese_characters_higher():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("a" * 100) == 30
+    assert estimate_tokens("中" * 100) == 60
+    assert estimate_tokens("ab中文") == 2
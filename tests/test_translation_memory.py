@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+import sqlite3
+
+from src.utils.translation_memory import TranslationMemory
+from src.utils.translator_factory import DeepseekChatModel
+
+
+def test_results_are_keyed_by_task_model_prompt_and_temperature(tmp_path):
+    memory = TranslationMemory(str(tmp_path / "memory.db"))
+    memory.put("translation", "deepseek-chat", 1, 0.7, "Hello  world.\n", "你好，世界。")
+
+    assert memory.get("translation", "deepseek-chat", 1, 0.7, "Hello world.") == "你好，世界。"
+    assert memory.get("vocabulary", "deepseek-chat", 1, 0.7, "Hello world.") is None
+    assert memory.get("translation", "deepseek-reasoner", 1, 0.7, "Hello world.") is None
+    assert memory.get("translation", "deepseek-chat", 2, 0.7, "Hello world.") is None
+    assert memory.get("translation", "deepseek-chat", 1, 0.5, "Hello world.") is None
+    assert memory.get_stats()['hits'] == 1
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    monkeypatch.setattr(TranslationMemory, 'EVICTION_INTERVAL', 1)
+    memory = TranslationMemory(str(tmp_path / "memory.db"), max_entries=2)
+    memory.put("translation", "m", 1, 0.5, "first", "一")
+    time.sleep(0.01)
+    memory.put("translation", "m", 1, 0.5, "second", "二")
+    time.sleep(0.01)
+    memory.get("translation", "m", 1, 0.5, "first")
+    time.sleep(0.01)
+    memory.put("translation", "m", 1, 0.5, "third", "三")
+
+    assert memory.get("translation", "m", 1, 0.5, "second") is None
+    assert memory.get("translation", "m", 1, 0.5, "first") == "一"
+    assert memory.get_stats()['evictions'] == 1
+
+
+def test_hits_are_written_in_batches(tmp_path):
+    path = str(tmp_path / "memory.db")
+    memory = TranslationMemory(path)
+    memory.put("translation", "m", 1, 0.5, "first", "一")
+
+    def hit_count():
+        with sqlite3.connect(path) as connection:
+            return connection.execute("SELECT hit_count FROM entries").fetchone()[0]
+
+    for _ in range(3):
+        memory.get("translation", "m", 1, 0.5, "first")
+    assert hit_count() == 0
+
+    memory.flush()
+    assert hit_count() == 3
+
+
+def test_translator_answers_repeated_chunks_from_memory(fake_api, tmp_path):
+    model = DeepseekChatModel()
+    model.memory = TranslationMemory(str(tmp_path / "memory.db"))
+    text = "The experiment was repeated three times."
+
+    first = model.translate(text)
+    assert model.translate(text) == first
+    assert len(fake_api.requests) == 1
+    assert model.last_reuse_report['reused_sentences'] == 1
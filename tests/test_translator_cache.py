@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+
+import pytest
+
+from src.utils import translator_factory
+from src.utils.translator_factory import TranslatorFactory, load_environment
+
+
+@pytest.fixture
+def env_file(tmp_path, monkeypatch):
+    """
+    使用临时的.env文件，测试结束后恢复环境变量和已缓存的翻译器
+    """
+    path = tmp_path / ".env"
+    path.write_text("PDF_ASSISTANT_TEST_VALUE=1\n", encoding="utf-8")
+    monkeypatch.setenv('PDF_ASSISTANT_TEST_VALUE', '0')
+    monkeypatch.setattr(translator_factory, '_environment', {'loaded': False, 'path': str(path), 'mtime': None})
+    monkeypatch.setattr(TranslatorFactory, '_instances', {})
+    return path
+
+
+def touch_later(path):
+    """
+    修改文件内容并把修改时间推后，保证能被检测到
+    """
+    path.write_text("PDF_ASSISTANT_TEST_VALUE=2\n", encoding="utf-8")
+    mtime = os.path.getmtime(path) + 10
+    os.utime(path, (mtime, mtime))
+
+
+def test_env_file_is_only_read_again_after_it_changes(env_file):
+    assert load_environment()
+    assert os.environ['PDF_ASSISTANT_TEST_VALUE'] == '1'
+    assert not load_environment()
+
+    touch_later(env_file)
+    assert load_environment()
+    assert os.environ['PDF_ASSISTANT_TEST_VALUE'] == '2'
+
+
+def test_translators_are_copies_of_one_cached_instance(fake_api, env_file):
+    first = TranslatorFactory.create_translator(TranslatorFactory.MODEL_DEEPSEEK_CHAT)
+    second = TranslatorFactory.create_translator(TranslatorFactory.MODEL_DEEPSEEK_CHAT)
+    cached = TranslatorFactory._instances[TranslatorFactory.MODEL_DEEPSEEK_CHAT]
+
+    assert first is not second and first is not cached
+    assert first.usage is not second.usage
+    assert first.output_budget is second.output_budget
+
+    touch_later(env_file)
+    TranslatorFactory.create_translator(TranslatorFactory.MODEL_DEEPSEEK_CHAT)
+    assert TranslatorFactory._instances[TranslatorFactory.MODEL_DEEPSEEK_CHAT] is not cached
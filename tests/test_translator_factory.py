@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+
+import pytest
+
+from src.utils.text_utils import estimate_tokens
+from src.utils.translator_factory import (
+    DeepseekChatModel, DeepseekReasonerModel, ChunkTranslationError, _SectionFilter
+)
+
+PARAGRAPHS = [f"Paragraph {i} describes a different part of the experiment in some detail." for i in range(8)]
+
+
+def small_chunks(model, tokens=30):
+    """
+    让模型按较小的token预算分块，使每个段落成为单独的块
+    """
+    model._chunk_token_budget = lambda: tokens
+    return model
+
+
+def test_chunks_are_translated_concurrently_within_the_provider_limit(fake_api, monkeypatch):
+    monkeypatch.setenv('TRANSLATION_CONCURRENCY', '3')
+    fake_api.delay = 0.05
+    model = small_chunks(DeepseekChatModel())
+
+    # 新的事件循环使用按当前配置创建的服务商信号量
+    translation = asyncio.run(model.translate_async("\n\n".join(PARAGRAPHS)))
+
+    assert len(fake_api.requests) == len(PARAGRAPHS)
+    assert fake_api.max_active == 3
+    assert translation == "翻译：\n" + "\n\n".join(f"【模拟译文】{paragraph}" for paragraph in PARAGRAPHS)
+
+
+def test_failed_chunks_are_retried_and_reported(fake_api, monkeypatch):
+    monkeypatch.setattr(DeepseekChatModel, 'CHUNK_RETRY_DELAY', 0)
+    model = small_chunks(DeepseekChatModel())
+
+    fake_api.errors = [Exception("temporary error")]
+    assert model.translate("\n\n".join(PARAGRAPHS[:2])).count("【模拟译文】") == 2
+
+    fake_api.errors = [Exception("permanent error")] * (DeepseekChatModel.CHUNK_RETRIES + 1)
+    fake_api.delay = lambda messages: 0 if "Paragraph 0" in messages[-1]['content'] else 0.05
+    with pytest.raises(ChunkTranslationError) as error:
+        model.translate("\n\n".join(PARAGRAPHS[:2]))
+    assert list(error.value.errors) == [0]
+    assert error.value.results[1] == f"【模拟译文】{PARAGRAPHS[1]}"
+
+
+def test_sync_and_async_entry_points_agree(fake_api):
+    model = small_chunks(DeepseekChatModel())
+    text = "\n\n".join(PARAGRAPHS[:3])
+
+    assert model.translate(text) == asyncio.run(model.translate_async(text))
+    assert model.extract_vocabulary(text) == asyncio.run(model.extract_vocabulary_async(text))
+    assert model.extract_vocabulary(text).startswith("重点词汇解析：")
+
+
+def test_chunks_fill_the_token_budget_without_exceeding_it(fake_api):
+    model = DeepseekChatModel()
+    budget = model._chunk_token_budget()
+    assert budget == int(model.max_tokens * model.chunk_output_share / model.OUTPUT_EXPANSION_RATIO)
+
+    paragraphs = PARAGRAPHS * 40
+    chunks = model._split_text("\n\n".join(paragraphs))
+
+    assert "\n\n".join(chunks) == "\n\n".join(paragraphs)
+    assert all(estimate_tokens(chunk) <= budget for chunk in chunks)
+    # 320个段落共约7300 tokens，按预算装满只需要三块
+    assert len(chunks) == 3
+
+
+def test_long_paragraphs_are_split_at_sentence_boundaries(fake_api):
+    model = DeepseekChatModel()
+    sentences = [f"Sentence {i} is part of one very long paragraph." for i in range(10)]
+
+    chunks = model._split_text(" ".join(sentences), max_chunk_tokens=40)
+
+    assert len(chunks) > 1
+    assert " ".join(chunks) == " ".join(sentences)
+    assert all(chunk.endswith(".") for chunk in chunks)
+
+
+def test_streamed_translation_matches_the_plain_translation(fake_api):
+    model = small_chunks(DeepseekChatModel())
+    text = "\n\n".join(PARAGRAPHS[:4])
+
+    deltas = list(model.translate_stream(text))
+
+    assert len(deltas) > 4
+    assert all(request['stream'] for request in fake_api.requests)
+    assert "".join(deltas) == model.translate(text)
+    assert model.last_stream_metrics['time_to_first_token'] is not None
+
+
+def test_section_filter_only_emits_the_translation_section():
+    reply = "思考过程\n===开始翻译===\n第一段译文。\n\n第二段译文。\n===结束翻译===\n\n===开始词汇解析===\n词汇\n===结束词汇解析==="
+    section_filter = _SectionFilter("===开始翻译===", "===结束翻译===")
+
+    output = "".join(section_filter.feed(character) for character in reply) + section_filter.flush()
+
+    assert output == "第一段译文。\n\n第二段译文。"
+
+
+def test_reasoner_translates_and_extracts_vocabulary_in_one_request(fake_api):
+    model = small_chunks(DeepseekReasonerModel())
+    received = []
+
+    translation, vocabulary = model.translate_with_vocabulary("\n\n".join(PARAGRAPHS[:2]), received.append)
+
+    assert len(fake_api.requests) == 2
+    assert translation == "翻译：\n" + "\n\n".join(f"【模拟译文】{paragraph}" for paragraph in PARAGRAPHS[:2])
+    assert "".join(received) == translation
+    assert vocabulary.startswith("重点词汇解析：") and "paragraph" in vocabulary
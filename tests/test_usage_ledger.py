@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+import csv
+
+import pytest
+
+from src.utils.usage_ledger import UsageLedger, normalize_usage, add_usage, get_model_prices
+from src.utils.translator_factory import DeepseekChatModel
+
+
+def test_cache_hits_are_read_from_either_provider_format():
+    deepseek = normalize_usage({'prompt_tokens': 100, 'completion_tokens': 40,
+                                'prompt_cache_hit_tokens': 60, 'prompt_cache_miss_tokens': 40})
+    openrouter = normalize_usage({'prompt_tokens': 100, 'completion_tokens': 40,
+                                  'prompt_tokens_details': {'cached_tokens': 60},
+                                  'completion_tokens_details': {'reasoning_tokens': 10}})
+
+    assert deepseek == dict(openrouter, reasoning_tokens=0)
+    assert openrouter['cache_miss_tokens'] == 40 and openrouter['reasoning_tokens'] == 10
+
+
+def test_continuation_usage_is_summed_including_nested_blocks():
+    total = add_usage({'prompt_tokens': 10, 'completion_tokens_details': {'reasoning_tokens': 3}},
+                      {'prompt_tokens': 15, 'completion_tokens_details': {'reasoning_tokens': 2}, 'model': 'x'})
+    assert total == {'prompt_tokens': 25, 'completion_tokens_details': {'reasoning_tokens': 5}, 'model': 'x'}
+
+
+def test_costs_and_totals(tmp_path, monkeypatch):
+    monkeypatch.setenv('TOKEN_PRICES', '{"local-model": [0, 1, 2]}')
+    assert get_model_prices()['local-model'] == (0, 1, 2)
+
+    ledger = UsageLedger()
+    usage = normalize_usage({'prompt_tokens': 1_000_000, 'completion_tokens': 1_000_000,
+                             'prompt_cache_hit_tokens': 500_000})
+    ledger.record('deepseek-chat', 'translation', usage, 2.0)
+    ledger.record('deepseek-chat', 'translation', usage, 4.0)
+    ledger.record('unknown-model', 'vocabulary', usage, 1.0, estimated=True)
+
+    rows = {row['model']: row for row in ledger.rows()}
+    assert rows['deepseek-chat']['mean_latency'] == 3.0
+    assert rows['deepseek-chat']['cost'] == pytest.approx(2 * (0.5 * 0.07 + 0.5 * 0.27 + 1.10))
+    assert rows['unknown-model']['cost'] is None
+
+    total = ledger.totals()
+    assert total['calls'] == 3 and total['estimated_calls'] == 1
+    assert total['cost'] == pytest.approx(rows['deepseek-chat']['cost'])
+    assert total['cache_hit_rate'] == 0.5
+
+    path = tmp_path / "usage.csv"
+    ledger.write_csv(path)
+    with open(path, encoding='utf-8') as f:
+        written = list(csv.DictReader(f))
+    assert [row['model'] for row in written] == ['deepseek-chat', 'unknown-model', 'total']
+    assert written[-1]['calls'] == '3'
+
+
+def test_translation_usage_is_recorded_per_stage(fake_api):
+    model = DeepseekChatModel()
+    model.translate("A short paragraph to translate.")
+    model.extract_vocabulary("A short paragraph to translate.")
+
+    rows = {row['stage']: row for row in model.usage.as_dict()['rows']}
+    assert set(rows) == {'translation', 'vocabulary'}
+    assert rows['translation']['model'] == 'deepseek-chat'
+    assert rows['translation']['calls'] == 1 and rows['translation']['completion_tokens'] > 0
+
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_coalesced_requests_are_recorded_once(fake_api, stream):
+    fake_api.delay = 0.05
+    models = [DeepseekChatModel(), DeepseekChatModel()]
+
+    async def translate(model):
+        if not stream:
+            return await model.translate_async("A short paragraph to translate.")
+        return "".join([delta async for delta in model.translate_stream_async("A short paragraph to translate.")])
+
+    async def main():
+        return await asyncio.gather(*(translate(model) for model in models))
+
+    first, second = asyncio.run(main())
+    assert first == second
+    assert len(fake_api.requests) == 1
+    assert sum(model.usage.totals()['calls'] for model in models) == 1